@@ -0,0 +1,62 @@
+# bench_cleaning.py
+#
+# Compare the per-cell applymap cleaning with the column-aware cleaning engine
+# on a synthetic frame. Run from the benchmarks directory:
+#     python bench_cleaning.py --rows 1000000
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath('../script'))
+from cleaning import strip_string_columns, clamp_extreme_values
+
+
+def make_frame(rows, seed=42):
+    """Build a synthetic frame with padded strings, categories and extreme numbers."""
+    rng = np.random.default_rng(seed)
+    provinces = np.array(['Gauteng ', ' Western Cape', 'KwaZulu-Natal', 'Limpopo  '])
+    makes = np.array([' TOYOTA', 'VOLKSWAGEN ', 'FORD', 'MERCEDES-BENZ '])
+    premium = rng.gamma(2.0, 50.0, rows)
+    premium[rng.random(rows) < 0.001] = 1e12
+    return pd.DataFrame({
+        'Province': provinces[rng.integers(0, len(provinces), rows)],
+        'make': pd.Categorical(makes[rng.integers(0, len(makes), rows)]),
+        'Bank': np.where(rng.random(rows) < 0.2, None, ' First National Bank'),
+        'TotalPremium': premium,
+        'TotalClaims': np.where(rng.random(rows) < 0.99, 0.0, rng.exponential(20000.0, rows)),
+        'kilowatts': rng.integers(40, 200, rows).astype(float),
+    })
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    data = make_frame(args.rows)
+    numeric = data.select_dtypes(include='number')
+
+    _, strip_before = timed(lambda d: d.map(lambda x: x.strip() if isinstance(x, str) else x), data)
+    _, strip_after = timed(strip_string_columns, data)
+    _, clamp_before = timed(lambda d: d.map(lambda x: 0 if np.abs(x) > 1e10 else x), numeric)
+    _, clamp_after = timed(clamp_extreme_values, numeric)
+
+    print(f"rows: {args.rows:,}")
+    print(f"strip whitespace: applymap {strip_before:.2f}s, vectorized {strip_after:.2f}s "
+          f"({strip_before / strip_after:.1f}x)")
+    print(f"clamp > 1e10:     applymap {clamp_before:.2f}s, vectorized {clamp_after:.2f}s "
+          f"({clamp_before / clamp_after:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# bench_encoding.py
+#
+# Compare the previous prepare_data encoding (OneHotEncoder to a dense frame, concat,
+# apply(pd.to_numeric), applymap clamp) with FeatureEncoder on a synthetic frame.
+# Reports wall time and peak traced memory. Run from the benchmarks directory:
+#     python bench_encoding.py --rows 1000000
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder, OneHotEncoder
+
+sys.path.append(os.path.abspath('../script'))
+from feature_encoding import CATEGORICAL_FEATURES, FeatureEncoder
+
+
+def make_frame(rows, seed=42):
+    """Build a synthetic cleaned frame with numeric, text and categorical columns."""
+    rng = np.random.default_rng(seed)
+    data = {f"numeric_{i}": rng.normal(size=rows) for i in range(20)}
+    data.update({
+        'Province': rng.choice(['Gauteng', 'Western Cape', 'KwaZulu-Natal', 'Limpopo', 'Free State'], rows),
+        'PostalCode': rng.integers(1, 900, rows),
+        'Gender': rng.choice(['Male', 'Female', 'Not specified'], rows),
+        'make': rng.choice(['TOYOTA', 'VOLKSWAGEN', 'FORD'], rows),
+        'CapitalOutstanding': rng.integers(0, 100000, rows).astype(str),
+        'TotalPremium': rng.gamma(2.0, 50.0, rows),
+        'TotalClaims': np.where(rng.random(rows) < 0.99, 0.0, rng.exponential(20000.0, rows)),
+    })
+    return pd.DataFrame(data)
+
+
+def legacy_encode(data):
+    """The encoding steps prepare_data used before FeatureEncoder."""
+    data = data.copy()
+    data['ClaimsPerPremium'] = (data['TotalClaims'] / data['TotalPremium']).replace([np.inf, -np.inf], 0).fillna(0)
+    for feature in CATEGORICAL_FEATURES:
+        if data[feature].nunique() > 10:
+            data[feature] = LabelEncoder().fit_transform(data[feature])
+        else:
+            encoder = OneHotEncoder(sparse_output=False)
+            encoded = pd.DataFrame(encoder.fit_transform(data[[feature]]))
+            encoded.columns = encoder.get_feature_names_out([feature])
+            data = pd.concat([data.drop(feature, axis=1), encoded], axis=1)
+    data = data.apply(pd.to_numeric, errors='coerce')
+    data.replace([np.inf, -np.inf], 0, inplace=True)
+    data = data.map(lambda x: 0 if np.abs(x) > 1e10 else x)
+    data.fillna(0, inplace=True)
+    return data.drop(['TotalPremium', 'TotalClaims'], axis=1)
+
+
+def measure(func, *args):
+    """Time one untraced run, then trace a second run for its peak memory in MiB."""
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    data = make_frame(args.rows)
+    legacy_time, legacy_peak = measure(legacy_encode, data)
+    dense_time, dense_peak = measure(lambda d: FeatureEncoder().fit_transform(d), data)
+    sparse_time, sparse_peak = measure(lambda d: FeatureEncoder(sparse=True).fit_transform(d), data)
+
+    print(f"rows: {args.rows:,}")
+    print(f"legacy encoding:        {legacy_time:7.2f}s  peak {legacy_peak:8.1f} MiB")
+    print(f"FeatureEncoder (dense):  {dense_time:7.2f}s  peak {dense_peak:8.1f} MiB")
+    print(f"FeatureEncoder (sparse): {sparse_time:7.2f}s  peak {sparse_peak:8.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+# bench_parallel_tests.py
+#
+# Report how ABHypothesisTesting.run_parallel scales from 1 to N worker processes
+# on Fisher and permutation tests over PostalCode pairs. Run from the benchmarks directory:
+#     python bench_parallel_tests.py --rows 1000000 --tests 200
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath('../script'))
+from AB_hypothesis_testing import ABHypothesisTesting
+
+
+def make_frame(rows, postal_codes=800, seed=42):
+    """Build a synthetic frame with many postal codes and zero-inflated, heavy-tailed claims."""
+    rng = np.random.default_rng(seed)
+    claims = rng.lognormal(8.0, 1.5, rows)
+    claims[rng.random(rows) < 0.99] = 0.0
+    return pd.DataFrame({
+        'PostalCode': rng.zipf(1.3, rows) % postal_codes,
+        'TotalClaims': claims,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--tests', type=int, default=200)
+    parser.add_argument('--permutations', type=int, default=2000)
+    parser.add_argument('--max-jobs', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    analyzer = ABHypothesisTesting(make_frame(args.rows))
+    codes = analyzer.data['PostalCode'].value_counts().index
+    specs = [(test, 'PostalCode', (codes[i], codes[i + 1]), 'TotalClaims')
+             for i in range(args.tests // 2) for test in ('fisher', 'permutation')]
+
+    baseline, reference = None, None
+    n_jobs = 1
+    while n_jobs <= args.max_jobs:
+        start = time.perf_counter()
+        results = analyzer.run_parallel(specs, n_jobs=n_jobs, n_permutations=args.permutations)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        reference = results if reference is None else reference
+        identical = results.equals(reference)
+        print(f"n_jobs={n_jobs:3d}  {elapsed:8.2f}s  speedup {baseline / elapsed:5.2f}x  identical={identical}")
+        n_jobs *= 2
+
+
+if __name__ == '__main__':
+    main()
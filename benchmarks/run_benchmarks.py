@@ -0,0 +1,150 @@
+# run_benchmarks.py
+#
+# Time the analysis stages (load, cleaning, outlier statistics, batch hypothesis tests,
+# encoding, training, scoring) on synthetic MachineLearningRating data of several sizes
+# and save the results as JSON so runs can be compared. Run from the benchmarks directory:
+#     python run_benchmarks.py --sizes 10k 100k 1M
+#     python run_benchmarks.py --sizes 10k --compare results/<previous run>.json
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath('../script'))
+from AB_hypothesis_testing import ABHypothesisTesting
+from data_preprocessing import DataPreprocessor
+from feature_encoding import FeatureEncoder, target_values
+from instrumentation import peak_rss_mb
+from model_artifacts import load_artifacts, save_artifacts
+from outlier_stats import outlier_statistics
+from score_policies import score_file
+from synthetic_data import write_dataset
+from training import candidate_models, train_models
+
+STAGES = ['load', 'clean', 'outliers', 'hypothesis_tests', 'encode', 'train', 'score']
+
+
+def parse_size(text):
+    """Parse a row count such as '10k', '1M' or '2500'."""
+    multipliers = {'k': 1_000, 'm': 1_000_000}
+    suffix = text[-1].lower()
+    return int(float(text[:-1]) * multipliers[suffix]) if suffix in multipliers else int(text)
+
+
+def measure(results, stage, func):
+    """Run one stage, record its wall time, CPU time and peak RSS, and return its output."""
+    wall, cpu = time.perf_counter(), time.process_time()
+    output = func()
+    results[stage] = {'wall_seconds': time.perf_counter() - wall, 'cpu_seconds': time.process_time() - cpu,
+                      'peak_rss_mb': peak_rss_mb()}
+    print(f"  {stage:<17} {results[stage]['wall_seconds']:9.2f}s  {results[stage]['peak_rss_mb']:8.0f} MiB")
+    return output
+
+
+def run_size(path, stages, max_train_rows, work_dir):
+    """Run the stages on one dataset."""
+    results = {}
+    preprocessor = DataPreprocessor(path)
+    data = None
+    if 'load' in stages or 'clean' in stages:
+        measure(results, 'load', preprocessor.load_data)
+
+        def clean():
+            preprocessor.handle_missing_values()
+            preprocessor.remove_negative_values()
+            preprocessor.strip_whitespace()
+            return preprocessor.data
+        data = measure(results, 'clean', clean) if 'clean' in stages else preprocessor.data
+    if data is None:
+        return results
+
+    if 'outliers' in stages:
+        measure(results, 'outliers', lambda: outlier_statistics(data, ['TotalPremium', 'TotalClaims']))
+    if 'hypothesis_tests' in stages:
+        testing = ABHypothesisTesting(data.assign(HasClaim=data['TotalClaims'] > 0))
+        measure(results, 'hypothesis_tests', lambda: testing.run_batch(
+            chi_squared_specs=[(feature, 'HasClaim') for feature in ['Province', 'PostalCode', 'Gender']],
+            t_test_specs=[('Province', None, 'TotalClaims'), ('Gender', None, 'TotalClaims'),
+                          ('PostalCode', None, 'TotalPremium')]))
+
+    sample = data if len(data) <= max_train_rows else data.sample(max_train_rows, random_state=42)
+    encoder = FeatureEncoder()
+    if 'encode' in stages or 'train' in stages or 'score' in stages:
+        X = measure(results, 'encode', lambda: encoder.fit_transform(sample))
+        y = target_values(sample)
+    if 'train' in stages or 'score' in stages:
+        models, _ = measure(results, 'train', lambda: train_models(candidate_models(), X, y))
+        results['train']['rows'] = len(sample)
+    if 'score' in stages:
+        save_artifacts(encoder, {'XGBoost': models['XGBoost']}, os.path.join(work_dir, 'models'), version='bench')
+        scorer = load_artifacts(os.path.join(work_dir, 'models'))
+        summary = measure(results, 'score', lambda: score_file(scorer, path, os.path.join(work_dir, 'scores.parquet')))
+        results['score']['rows_per_second'] = summary['rows_per_second']
+    return results
+
+
+def environment():
+    """Describe the machine and the code the results were produced with."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {'commit': commit, 'python': platform.python_version(), 'platform': platform.platform(),
+            'cpu_count': os.cpu_count(), 'numpy': np.__version__, 'pandas': pd.__version__}
+
+
+def compare(current, previous_path):
+    """Print the wall-time ratio of every stage against a previous run."""
+    with open(previous_path) as f:
+        previous = json.load(f)
+    print(f"\nWall time vs {previous_path} (ratio < 1 is faster):")
+    for size, stages in current['results'].items():
+        for stage, metrics in stages.items():
+            before = previous['results'].get(size, {}).get(stage)
+            if before:
+                print(f"  {size:>10} {stage:<17} {before['wall_seconds']:9.2f}s -> {metrics['wall_seconds']:9.2f}s "
+                      f"({metrics['wall_seconds'] / before['wall_seconds']:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the analysis stages on synthetic data.')
+    parser.add_argument('--sizes', nargs='+', default=['10k', '100k', '1M', '10M'])
+    parser.add_argument('--stages', nargs='+', default=STAGES, choices=STAGES)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', default='data', help='Directory of the generated datasets, reused across runs.')
+    parser.add_argument('--output-dir', default='results')
+    parser.add_argument('--max-train-rows', type=int, default=1_000_000,
+                        help='Encoding and training use a sample of at most this many rows.')
+    parser.add_argument('--compare', help='Previous results file to compare against.')
+    args = parser.parse_args()
+
+    run = {'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'environment': environment(), 'seed': args.seed,
+           'max_train_rows': args.max_train_rows, 'results': {}}
+    for size in args.sizes:
+        rows = parse_size(size)
+        path = os.path.join(args.data_dir, f"synthetic_{rows}_seed{args.seed}.txt")
+        if not os.path.exists(path):
+            print(f"Generating {rows:,} rows -> {path}")
+            write_dataset(path, rows, seed=args.seed)
+        print(f"{rows:,} rows")
+        with tempfile.TemporaryDirectory() as work_dir:
+            run['results'][str(rows)] = run_size(path, args.stages, args.max_train_rows, work_dir)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_path = os.path.join(args.output_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{run['environment']['commit']}.json")
+    with open(output_path, 'w') as f:
+        json.dump(run, f, indent=2)
+    print(f"Saved {output_path}")
+    if args.compare:
+        compare(run, args.compare)
+
+
+if __name__ == '__main__':
+    main()
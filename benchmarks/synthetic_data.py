@@ -0,0 +1,195 @@
+# synthetic_data.py
+#
+# Generate synthetic pipe-delimited datasets with the 52-column MachineLearningRating
+# schema: skewed PostalCode/make/Model cardinalities, zero-inflated TotalClaims, premium
+# reversals and the missing-value patterns of the real data. Run from the benchmarks directory:
+#     python synthetic_data.py --rows 1000000 --output ../src/data/synthetic_1m.txt
+
+import argparse
+import os
+import numpy as np
+import pandas as pd
+
+COLUMNS = [
+    'UnderwrittenCoverID', 'PolicyID', 'TransactionMonth', 'IsVATRegistered', 'Citizenship', 'LegalType',
+    'Title', 'Language', 'Bank', 'AccountType', 'MaritalStatus', 'Gender', 'Country', 'Province', 'PostalCode',
+    'MainCrestaZone', 'SubCrestaZone', 'ItemType', 'mmcode', 'VehicleType', 'RegistrationYear', 'make', 'Model',
+    'Cylinders', 'cubiccapacity', 'kilowatts', 'bodytype', 'NumberOfDoors', 'VehicleIntroDate',
+    'CustomValueEstimate', 'AlarmImmobiliser', 'TrackingDevice', 'CapitalOutstanding', 'NewVehicle', 'WrittenOff',
+    'Rebuilt', 'Converted', 'CrossBorder', 'NumberOfVehiclesInFleet', 'SumInsured', 'TermFrequency',
+    'CalculatedPremiumPerTerm', 'ExcessSelected', 'CoverCategory', 'CoverType', 'CoverGroup', 'Section', 'Product',
+    'StatutoryClass', 'StatutoryRiskType', 'TotalPremium', 'TotalClaims',
+]
+
+PROVINCES = {'Gauteng': 0.39, 'Western Cape': 0.17, 'KwaZulu-Natal': 0.17, 'North West': 0.14,
+             'Mpumalanga': 0.05, 'Eastern Cape': 0.03, 'Limpopo': 0.025, 'Free State': 0.008,
+             'Northern Cape': 0.007}
+MAKES = ['TOYOTA', 'MERCEDES-BENZ', 'VOLKSWAGEN', 'NISSAN/DATSUN', 'FORD', 'ISUZU', 'HYUNDAI', 'AUDI', 'BMW',
+         'CHEVROLET', 'KIA', 'RENAULT', 'MAZDA', 'HONDA', 'SUZUKI', 'MITSUBISHI', 'OPEL', 'PEUGEOT', 'LAND ROVER',
+         'JEEP', 'VOLVO', 'MINI', 'FIAT', 'CITROEN', 'LEXUS', 'SUBARU', 'JAGUAR', 'PORSCHE', 'DAIHATSU', 'CHERY',
+         'GWM', 'MAHINDRA', 'TATA', 'JMC', 'FOTON', 'IVECO', 'MAN', 'SCANIA', 'HINO', 'FUSO', 'UD TRUCKS', 'DAF',
+         'POLARSUN', 'GONOW', 'BAW', 'JINBEI']
+COVER_TYPES = ['Own Damage', 'Passenger Liability', 'Windscreen', 'Third Party', 'Keys and Alarms',
+               'Signage and Vehicle Wraps', 'Emergency Charges', 'Cleaning and Removal of Accident Debris',
+               'Income Protector', 'Accidental Death', 'Fire and Theft', 'Baggage/Luggage']
+# The same 888 postal codes in every slice, the most common first
+POSTAL_CODES = np.random.default_rng(888).choice(np.arange(1, 9900), 888, replace=False)
+BODY_TYPES = ['S/D', 'H/B', 'D/C', 'B/S', 'S/C', 'MPV', 'SUV', 'P/V', 'C/C', 'CAB', 'LDV', 'BUS', 'TRUCK']
+
+
+def _zipf_choice(rng, values, rows, exponent=1.1):
+    """Draw values with Zipf-like frequencies, the first value being the most common."""
+    weights = 1.0 / np.arange(1, len(values) + 1) ** exponent
+    return np.asarray(values, dtype=object)[rng.choice(len(values), rows, p=weights / weights.sum())]
+
+
+def _with_missing(rng, values, share):
+    """Replace a random share of the values by missing values."""
+    values = pd.Series(values, dtype=object)
+    values[rng.random(len(values)) < share] = None
+    return values
+
+
+def generate_policies(rows, seed=0, first_id=0):
+    """
+    Generate a synthetic slice of MachineLearningRating rows.
+
+    Parameters:
+    rows (int): Number of rows.
+    seed (int or np.random.SeedSequence): Seed of the slice.
+    first_id (int): Identifier of the first row, so slices of one dataset do not overlap.
+
+    Returns:
+    pd.DataFrame: The rows, with the columns of ``COLUMNS``.
+    """
+    rng = np.random.default_rng(seed)
+    policy_id = first_id // 3 + np.arange(rows) // 3
+    province = rng.choice(list(PROVINCES), rows, p=np.array(list(PROVINCES.values())) / sum(PROVINCES.values()))
+    make = _zipf_choice(rng, MAKES, rows)
+    # About 410 models: every make has its own skewed list of model names
+    model_number = np.minimum(rng.zipf(1.6, rows), 9)
+    models = pd.Series(make).str.slice(0, 4) + ' MODEL ' + pd.Series(model_number).astype(str)
+    months = pd.date_range('2013-10-01', '2015-08-01', freq='MS').strftime('%Y-%m-%d %H:%M:%S')
+    intro_year = rng.integers(1987, 2015, rows)
+    vehicle = {
+        'mmcode': rng.integers(4_000_000, 65_000_000, rows).astype(float),
+        'VehicleType': _zipf_choice(rng, ['Passenger Vehicle', 'Medium Commercial', 'Heavy Commercial',
+                                          'Light Commercial', 'Bus'], rows, 3),
+        'RegistrationYear': np.minimum(intro_year + rng.integers(0, 6, rows), 2015),
+        'make': make,
+        'Model': models.to_numpy(dtype=object),
+        'Cylinders': rng.choice([4.0, 6.0, 8.0, 5.0], rows, p=[0.85, 0.1, 0.03, 0.02]),
+        'cubiccapacity': rng.choice([1300.0, 1600.0, 2000.0, 2500.0, 2700.0, 3000.0, 4000.0], rows),
+        'kilowatts': np.round(rng.gamma(9.0, 12.0, rows)),
+        'bodytype': _zipf_choice(rng, BODY_TYPES, rows),
+        'NumberOfDoors': rng.choice([4.0, 2.0, 5.0, 3.0, 0.0], rows, p=[0.72, 0.15, 0.1, 0.02, 0.01]),
+        'VehicleIntroDate': [f"{m}/{y}" for m, y in zip(rng.integers(1, 13, rows), intro_year)],
+        'CapitalOutstanding': np.where(rng.random(rows) < 0.5, 0, rng.integers(1_000, 700_000, rows)).astype(str),
+    }
+
+    sum_insured = np.round(rng.lognormal(11.5, 1.4, rows), 2)
+    premium = rng.lognormal(3.5, 1.3, rows) * (rng.random(rows) > 0.45)
+    # A few reversals produce negative premiums, which the cleaning removes
+    premium[rng.random(rows) < 0.001] *= -1
+    claims = np.where(rng.random(rows) < 0.0028, rng.lognormal(9.5, 1.3, rows), 0.0)
+    claims[rng.random(rows) < 0.00005] *= -1
+
+    data = {
+        'UnderwrittenCoverID': first_id + np.arange(rows),
+        'PolicyID': policy_id,
+        'TransactionMonth': rng.choice(months, rows),
+        'IsVATRegistered': rng.random(rows) < 0.01,
+        'Citizenship': rng.choice(['  ', 'ZA', 'AF', 'ZW'], rows, p=[0.9, 0.08, 0.01, 0.01]),
+        'LegalType': _zipf_choice(rng, ['Individual', 'Private company', 'Public company', 'Close Corporation',
+                                        'Partnership', 'Trust'], rows, 4),
+        'Title': _zipf_choice(rng, ['Mr', 'Mrs', 'Ms', 'Miss', 'Dr'], rows, 3),
+        'Language': 'English',
+        'Bank': _with_missing(rng, _zipf_choice(rng, ['First National Bank', 'Standard Bank', 'ABSA Bank', 'Nedbank',
+                                                      'Capitec Bank', 'Investec Bank', 'RMB Private Bank'], rows), 0.15),
+        'AccountType': _with_missing(rng, _zipf_choice(rng, ['Current account', 'Savings account',
+                                                             'Transmission account'], rows, 2), 0.04),
+        'MaritalStatus': _with_missing(rng, rng.choice(['Not specified', 'Single', 'Married'], rows,
+                                                       p=[0.99, 0.007, 0.003]), 0.008),
+        'Gender': _with_missing(rng, rng.choice(['Not specified', 'Male', 'Female'], rows,
+                                                p=[0.95, 0.042, 0.008]), 0.01),
+        'Country': 'South Africa',
+        'Province': province,
+        'PostalCode': _zipf_choice(rng, POSTAL_CODES, rows, 1.2),
+        'MainCrestaZone': province,
+        'SubCrestaZone': province,
+        'ItemType': 'Mobility - Motor',
+        **vehicle,
+        'CustomValueEstimate': _with_missing(rng, np.round(rng.lognormal(12.0, 0.8, rows)), 0.78),
+        'AlarmImmobiliser': rng.choice(['Yes', 'No'], rows, p=[0.99, 0.01]),
+        'TrackingDevice': rng.choice(['Yes', 'No'], rows, p=[0.3, 0.7]),
+        'NewVehicle': _with_missing(rng, rng.choice(['More than 6 months', 'Less than 6 months'], rows,
+                                                    p=[0.998, 0.002]), 0.15),
+        'WrittenOff': None, 'Rebuilt': None, 'Converted': None,
+        'CrossBorder': _with_missing(rng, np.full(rows, 'No', dtype=object), 0.999),
+        'NumberOfVehiclesInFleet': np.nan,
+        'SumInsured': sum_insured,
+        'TermFrequency': rng.choice(['Monthly', 'Annual'], rows, p=[0.995, 0.005]),
+        'CalculatedPremiumPerTerm': np.round(np.abs(premium) * rng.uniform(1.0, 1.3, rows), 4),
+        'ExcessSelected': _zipf_choice(rng, ['Mobility - Windscreen', 'No excess', 'Mobility - Metered Taxis - R2000',
+                                             'Mobility - Metered Taxis - R3000', 'Mobility - Metered Taxis - R5000'],
+                                       rows, 1.5),
+        'CoverCategory': _zipf_choice(rng, COVER_TYPES, rows),
+        'CoverType': _zipf_choice(rng, COVER_TYPES, rows),
+        'CoverGroup': _zipf_choice(rng, ['Comprehensive - Taxi', 'Comprehensive - Retail', 'Motor Comprehensive',
+                                         'Income Protector', 'Standalone passenger liability'], rows, 2),
+        'Section': _zipf_choice(rng, ['Motor Comprehensive', 'Optional Extended Covers', 'Taxi Liability'], rows, 2),
+        'Product': _zipf_choice(rng, ['Mobility Metered Taxis: Monthly', 'Mobility Commercial Cover: Monthly',
+                                      'Standalone passenger liability'], rows, 2),
+        'StatutoryClass': 'Commercial',
+        'StatutoryRiskType': 'IFRS Constant',
+        'TotalPremium': premium,
+        'TotalClaims': claims,
+    }
+    frame = pd.DataFrame(data, columns=COLUMNS)
+
+    # WrittenOff/Rebuilt/Converted are filled on the same ~36% of rows
+    flagged = rng.random(rows) < 0.36
+    for column in ['WrittenOff', 'Rebuilt', 'Converted']:
+        frame.loc[flagged, column] = 'No'
+    # The vehicle details go missing together on a few rows
+    frame.loc[rng.random(rows) < 0.0005, list(vehicle)] = None
+    # Text fields occasionally carry the padding of the source system
+    padded = rng.random(rows) < 0.2
+    frame.loc[padded, 'make'] = frame.loc[padded, 'make'] + '  '
+    return frame
+
+
+def write_dataset(path, rows, seed=0, chunk_rows=500_000):
+    """
+    Write a synthetic dataset of ``rows`` rows to a pipe-delimited file, slice by slice.
+
+    Every slice has its own child seed, so the file content depends only on ``rows``,
+    ``seed`` and ``chunk_rows``, and memory is bounded by ``chunk_rows``.
+
+    Returns:
+    str: The path written.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    n_chunks = max(1, -(-rows // chunk_rows))
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    tmp_path = path + '.tmp'
+    for i, child in enumerate(seeds):
+        start = i * chunk_rows
+        frame = generate_policies(min(chunk_rows, rows - start), child, first_id=start)
+        frame.to_csv(tmp_path, sep='|', index=False, mode='w' if i == 0 else 'a', header=i == 0)
+    os.replace(tmp_path, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic MachineLearningRating dataset.')
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', required=True, help='Path of the pipe-delimited file.')
+    args = parser.parse_args()
+    write_dataset(args.output, args.rows, seed=args.seed)
+    print(f"Wrote {args.rows:,} rows to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
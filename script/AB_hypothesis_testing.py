@@ -1,8 +1,176 @@
 # AB_hypothesis_testing.py
 
+import itertools
+import numpy as np
 import pandas as pd
-import scipy.stats as stats
+import scipy
+from instrumentation import instrumented
+from parallel_testing import run_tests
 
+
+def adjust_pvalues(p_values, method='fdr_bh'):
+    """
+    Adjust p-values for multiple testing. NaN p-values are ignored.
+    
+    Parameters:
+    p_values (array-like): The unadjusted p-values.
+    method (str): 'bonferroni', 'holm', 'fdr_bh' (Benjamini-Hochberg) or None.
+    
+    Returns:
+    np.ndarray: The adjusted p-values.
+    """
+    p_values = np.asarray(p_values, dtype=float)
+    adjusted = p_values.copy()
+    valid = ~np.isnan(p_values)
+    p = p_values[valid]
+    m = len(p)
+    if method is None or m == 0:
+        return adjusted
+    order = np.argsort(p)
+    ranked = p[order]
+    if method == 'bonferroni':
+        result = np.minimum(p * m, 1)
+    elif method == 'holm':
+        result = np.empty(m)
+        result[order] = np.minimum(np.maximum.accumulate(ranked * (m - np.arange(m))), 1)
+    elif method == 'fdr_bh':
+        result = np.empty(m)
+        result[order] = np.minimum(np.minimum.accumulate((ranked * m / np.arange(1, m + 1))[::-1])[::-1], 1)
+    else:
+        raise ValueError(f"Unknown multiple-testing correction: {method}")
+    adjusted[valid] = result
+    return adjusted
+
+
+def ttest_from_moments(n_a, mean_a, var_a, n_b, mean_b, var_b, equal_var=True):
+    """
+    Compute two-sample t-tests from group counts, means and variances (vectorized).
+    
+    Parameters:
+    n_a, mean_a, var_a (array-like): Count, mean and sample variance of the first groups.
+    n_b, mean_b, var_b (array-like): Count, mean and sample variance of the second groups.
+    equal_var (bool): Use Student's pooled-variance test if True, Welch's test otherwise.
+    
+    Returns:
+    tuple: Arrays of t statistics, degrees of freedom and two-sided p-values.
+    Tests with fewer than two observations in a group yield NaN.
+    """
+    n_a, mean_a, var_a, n_b, mean_b, var_b = (np.asarray(x, dtype=float) for x in
+                                              (n_a, mean_a, var_a, n_b, mean_b, var_b))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if equal_var:
+            dof = n_a + n_b - 2
+            pooled = ((n_a - 1) * var_a + (n_b - 1) * var_b) / dof
+            se2 = pooled * (1 / n_a + 1 / n_b)
+        else:
+            se_a, se_b = var_a / n_a, var_b / n_b
+            se2 = se_a + se_b
+            dof = se2 ** 2 / (se_a ** 2 / (n_a - 1) + se_b ** 2 / (n_b - 1))
+        t_stat = (mean_a - mean_b) / np.sqrt(se2)
+        p_value = 2 * scipy.stats.t.sf(np.abs(t_stat), dof)
+    too_small = (n_a < 2) | (n_b < 2)
+    return (np.where(too_small, np.nan, t_stat), np.where(too_small, np.nan, dof),
+            np.where(too_small, np.nan, p_value))
+
+
+def chi2_statistic(table, correction=True):
+    """
+    Compute the chi-squared statistic of a contingency table, as ``scipy.stats.chi2_contingency`` does.
+    
+    Parameters:
+    table (array-like): Observed frequencies.
+    correction (bool): Apply Yates' continuity correction when there is one degree of freedom.
+    
+    Returns:
+    tuple: The chi-squared statistic and the degrees of freedom.
+    """
+    observed = np.asarray(table, dtype=float)
+    expected = np.outer(observed.sum(axis=1), observed.sum(axis=0)) / observed.sum()
+    dof = (observed.shape[0] - 1) * (observed.shape[1] - 1)
+    if dof == 1 and correction:
+        diff = expected - observed
+        observed = observed + np.sign(diff) * np.minimum(0.5, np.abs(diff))
+    if dof == 0:
+        return 0.0, 0
+    return float(np.sum((observed - expected) ** 2 / expected)), dof
+
+
+class GroupMoments:
+    def __init__(self, group_column, metric):
+        """
+        Accumulate per-group sufficient statistics of a metric over a stream of chunks.
+        
+        For each group the count, mean and sum of squared deviations are kept, which is
+        the numerically stable form of (n, sum, sum of squares); chunks are merged with
+        Chan's parallel update, so group subsets are never held in memory.
+        
+        Parameters:
+        group_column (str): The column defining the groups.
+        metric (str): The numeric column whose moments are accumulated.
+        """
+        self.group_column = group_column
+        self.metric = metric
+        self.moments = pd.DataFrame({'n': [], 'mean': [], 'm2': []})
+
+    def update(self, chunk):
+        """Add a chunk of rows to the statistics."""
+        grouped = chunk.groupby(self.group_column, observed=True)[self.metric]
+        counts = grouped.count()
+        moments = pd.DataFrame({'n': counts, 'mean': grouped.mean(), 'm2': grouped.var(ddof=0) * counts})
+        return self.merge_moments(moments[moments['n'] > 0])
+
+    def merge(self, other):
+        """Merge the statistics of another ``GroupMoments`` over the same column and metric."""
+        return self.merge_moments(other.moments)
+
+    def merge_moments(self, moments):
+        """Merge a frame of per-group 'n', 'mean' and 'm2' columns into the statistics."""
+        left, right = self.moments.align(moments, join='outer', fill_value=0)
+        n = left['n'] + right['n']
+        delta = right['mean'] - left['mean']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = (left['mean'] + delta * right['n'] / n).fillna(0)
+            m2 = left['m2'] + right['m2'] + (delta ** 2 * left['n'] * right['n'] / n).fillna(0)
+        self.moments = pd.DataFrame({'n': n, 'mean': mean, 'm2': m2})
+        return self
+
+    def summary(self):
+        """
+        Return the per-group statistics.
+        
+        Returns:
+        pd.DataFrame: Count, sum, sum of squares, mean and sample variance per group.
+        """
+        n, mean, m2 = self.moments['n'], self.moments['mean'], self.moments['m2']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variance = (m2 / (n - 1)).where(n > 1)
+        return pd.DataFrame({'n': n, 'sum': n * mean, 'sum_sq': m2 + n * mean ** 2, 'mean': mean, 'var': variance})
+
+    def t_test(self, group_a, group_b, equal_var=True):
+        """
+        Compare the metric's mean between two groups from the accumulated statistics.
+        
+        Returns:
+        tuple: The t statistic and the two-sided p-value (NaN if a group has fewer than two rows).
+        """
+        summary = self.summary().reindex([group_a, group_b])
+        n = summary['n'].fillna(0).to_numpy()
+        t_stat, _, p_value = ttest_from_moments(n[0], summary['mean'].iloc[0], summary['var'].iloc[0],
+                                                n[1], summary['mean'].iloc[1], summary['var'].iloc[1],
+                                                equal_var=equal_var)
+        return float(t_stat), float(p_value)
+
+
+def _masked_moments(values, mask):
+    """Count, mean and sample variance of the values selected by a boolean mask, without copying them."""
+    n = np.count_nonzero(mask)
+    if n < 2:
+        return n, np.nan, np.nan
+    mean = np.sum(values, where=mask) / n
+    return n, mean, np.sum((values - mean) ** 2, where=mask) / (n - 1)
+
+
+@instrumented
 class ABHypothesisTesting:
     def __init__(self, data):
         """
@@ -26,7 +194,7 @@ class ABHypothesisTesting:
         """
         try:
             contingency_table = pd.crosstab(self.data[feature], self.data[target])
-            chi2, p_value, _, _ = stats.chi2_contingency(contingency_table)
+            chi2, p_value, _, _ = scipy.stats.chi2_contingency(contingency_table)
             return p_value
         except Exception as e:
             print(f"Error performing chi-squared test for {feature} and {target}: {e}")
@@ -45,12 +213,172 @@ class ABHypothesisTesting:
         float: The p-value of the t-test.
         """
         try:
-            group_a_data = self.data[self.data[group_a] == 'A'][target]
-            group_b_data = self.data[self.data[group_b] == 'B'][target]
-            if len(group_a_data) < 2 or len(group_b_data) < 2:
+            values = self.data[target].to_numpy(dtype=float)
+            n_a, mean_a, var_a = _masked_moments(values, (self.data[group_a] == 'A').to_numpy())
+            n_b, mean_b, var_b = _masked_moments(values, (self.data[group_b] == 'B').to_numpy())
+            if n_a < 2 or n_b < 2:
                 raise ValueError("Sample size too small for t-test")
-            t_stat, p_value = stats.ttest_ind(group_a_data, group_b_data)
+            _, _, p_value = ttest_from_moments(n_a, mean_a, var_a, n_b, mean_b, var_b)
+            return float(p_value)
+        except Exception as e:
+            print(f"Error performing t-test for {group_a} and {group_b} on {target}: {e}")
+            return None
+
+    def t_test_from_chunks(self, chunks, group_column, group_a, group_b, target, equal_var=True):
+        """
+        Perform a t-test between two groups over data streamed in chunks.
+        
+        Only per-group sufficient statistics are kept (see ``GroupMoments``), so the data
+        can be larger than memory, e.g. ``DataPreprocessor.iter_chunks`` over a full file.
+        
+        Parameters:
+        chunks (iterable): DataFrames with the group and target columns.
+        group_column (str): The column defining the groups.
+        group_a (object): The value of ``group_column`` of the first group.
+        group_b (object): The value of ``group_column`` of the second group.
+        target (str): The name of the target variable.
+        equal_var (bool): Use Student's t-test if True, Welch's t-test otherwise.
+        
+        Returns:
+        float: The p-value of the t-test.
+        """
+        try:
+            moments = GroupMoments(group_column, target)
+            for chunk in chunks:
+                moments.update(chunk)
+            _, p_value = moments.t_test(group_a, group_b, equal_var=equal_var)
             return p_value
         except Exception as e:
             print(f"Error performing t-test for {group_a} and {group_b} on {target}: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    def run_batch(self, chi_squared_specs=(), t_test_specs=(), equal_var=True, correction='fdr_bh', alpha=0.05):
+        """
+        Run many chi-squared tests and t-tests at once, with multiple-testing correction.
+        
+        Each contingency table is built with one groupby, and the count, mean and variance
+        of every group of a segment column are computed in one groupby pass over all the
+        metrics tested on that column. The t statistics of all group pairs are then
+        derived from those moments in a single vectorized step.
+        
+        Parameters:
+        chi_squared_specs (list): (feature, target) pairs, as for ``chi_squared_test``.
+        t_test_specs (list): (segment_column, group_pairs, metric) triples comparing the mean
+            of ``metric`` between the groups ``(a, b)`` of ``segment_column``. ``group_pairs``
+            may be None to test every pair of groups.
+        equal_var (bool): Use Student's t-test if True, Welch's t-test otherwise.
+        correction (str): Multiple-testing correction passed to ``adjust_pvalues``.
+        alpha (float): Significance level applied to the adjusted p-values.
+        
+        Returns:
+        pd.DataFrame: One row per test with the test type, the tested columns and groups,
+        the statistic, degrees of freedom, p-value, adjusted p-value and rejection flag.
+        """
+        rows = []
+        chi2_values, chi2_dofs = [], []
+        for feature, target in chi_squared_specs:
+            table = self.data.groupby([feature, target], observed=True).size().unstack(fill_value=0)
+            chi2, dof = chi2_statistic(table.to_numpy())
+            chi2_values.append(chi2)
+            chi2_dofs.append(dof)
+            rows.append({'test': 'chi_squared', 'feature': feature, 'target': target,
+                         'group_a': None, 'group_b': None})
+        with np.errstate(invalid='ignore'):
+            p_values = list(np.where(np.asarray(chi2_dofs) > 0,
+                                     scipy.stats.chi2.sf(chi2_values, np.maximum(chi2_dofs, 1)), np.nan))
+        statistics, dofs = list(chi2_values), list(map(float, chi2_dofs))
+
+        specs_by_column = {}
+        for column, group_pairs, metric in t_test_specs:
+            specs_by_column.setdefault(column, []).append((group_pairs, metric))
+        for column, specs in specs_by_column.items():
+            metrics = list(dict.fromkeys(metric for _, metric in specs))
+            moments = self.data.groupby(column, observed=True)[metrics].agg(['count', 'mean', 'var'])
+            for group_pairs, metric in specs:
+                pairs = list(itertools.combinations(moments.index, 2) if group_pairs is None else group_pairs)
+                if not pairs:
+                    continue
+                group_a = moments[metric].reindex([a for a, _ in pairs])
+                group_b = moments[metric].reindex([b for _, b in pairs])
+                t_stat, dof, p_value = ttest_from_moments(
+                    group_a['count'].fillna(0), group_a['mean'], group_a['var'],
+                    group_b['count'].fillna(0), group_b['mean'], group_b['var'], equal_var=equal_var)
+                statistics.extend(t_stat)
+                dofs.extend(dof)
+                p_values.extend(p_value)
+                rows.extend({'test': 't_test', 'feature': column, 'target': metric, 'group_a': a, 'group_b': b}
+                            for a, b in pairs)
+
+        results = pd.DataFrame(rows, columns=['test', 'feature', 'target', 'group_a', 'group_b'])
+        results['statistic'] = statistics
+        results['dof'] = dofs
+        results['p_value'] = p_values
+        results['p_adjusted'] = adjust_pvalues(results['p_value'].to_numpy(), method=correction)
+        results['reject'] = results['p_adjusted'] < alpha
+        return results
+
+    def run_parallel(self, specs, n_jobs=None, seed=0, n_permutations=10000):
+        """
+        Run CPU-bound two-group tests across a pool of worker processes.
+        
+        The tested columns are shared with the workers as memory-mapped arrays rather
+        than pickling the DataFrame, and the results are deterministic and in spec order
+        whatever the number of workers. See ``parallel_testing.run_tests``.
+        
+        Parameters:
+        specs (list): (test, segment_column, (group_a, group_b), metric) tuples with test in
+            'student', 'welch', 'fisher' or 'permutation'.
+        n_jobs (int): Number of worker processes. None uses every CPU.
+        seed (int): Seed of the permutation tests.
+        n_permutations (int): Number of permutations per permutation test.
+        
+        Returns:
+        pd.DataFrame: One row per spec with the statistic and p-value.
+        """
+        return run_tests(self.data, specs, n_jobs=n_jobs, seed=seed, n_permutations=n_permutations)
+
+    def bootstrap_intervals(self, segment_column, statistic='loss_ratio', n_resamples=10000, confidence=0.95, seed=0):
+        """
+        Compute bootstrap confidence intervals of a claims statistic in every segment.
+        
+        All segments are resampled at once with Poisson(1) row weights in vectorized
+        batches, which suits the mostly-zero, heavy-tailed claims better than a t-test.
+        See ``resampling.bootstrap_segments``.
+        
+        Parameters:
+        segment_column (str or list): The column, or columns, defining the segments.
+        statistic (str): 'loss_ratio', 'severity' (mean claim amount) or 'frequency'.
+        n_resamples (int): Number of bootstrap resamples.
+        confidence (float): Confidence level of the intervals.
+        seed (int): Seed of the resampling.
+        
+        Returns:
+        pd.DataFrame: Per segment, the estimate, standard error and interval bounds.
+        """
+        from resampling import bootstrap_segments
+
+        return bootstrap_segments(self.data, segment_column, statistic=statistic, n_resamples=n_resamples,
+                                  confidence=confidence, seed=seed)
+
+    def permutation_tests(self, segment_column, statistic='loss_ratio', group_pairs=None, n_permutations=10000,
+                          seed=0, correction='fdr_bh', alpha=0.05):
+        """
+        Run permutation tests of a claims statistic between segments, with multiple-testing correction.
+        
+        Parameters:
+        segment_column (str): The column defining the segments.
+        statistic (str): 'loss_ratio', 'severity' (mean claim amount) or 'frequency'.
+        group_pairs (list): (a, b) pairs of segments. When None, every segment is compared
+            with the rest of the data. See ``resampling.permutation_segments``.
+        n_permutations (int): Number of permutations per test.
+        seed (int): Seed of the permutations.
+        correction (str): Multiple-testing correction passed to ``adjust_pvalues``.
+        alpha (float): Significance level applied to the adjusted p-values.
+        
+        Returns:
+        pd.DataFrame: One row per test, in the layout of ``run_batch``.
+        """
+        from resampling import permutation_segments
+
+        return permutation_segments(self.data, segment_column, statistic=statistic, group_pairs=group_pairs,
+                                    n_permutations=n_permutations, seed=seed, correction=correction, alpha=alpha)
@@ -0,0 +1,213 @@
+# aggregate_cube.py
+
+import logging
+import os
+import numpy as np
+import pandas as pd
+from AB_hypothesis_testing import GroupMoments
+from data_cache import read_columnar
+from data_preprocessing import DEFAULT_CHUNKSIZE, DataPreprocessor
+from incremental import (AGGREGATE_METRICS, AGGREGATE_SUFFIXES, aggregate_segments, combine_aggregates,
+                         moments_from_aggregates, tests_from_aggregates)
+
+CUBE_DIMENSIONS = ['Province', 'PostalCode', 'Gender', 'VehicleType', 'make', 'month']
+
+
+class AggregateCube:
+    def __init__(self, cells, dimensions, metrics):
+        """
+        Initialize a cube of mergeable aggregates over combinations of key dimensions.
+
+        Each cell holds the row count and, per metric, the number of non-missing values, the
+        sum, the sum of squared deviations from the cell mean and the number of positive values (see
+        ``incremental.aggregate_segments``). Every query combines cells with
+        ``incremental.combine_aggregates``, so roll-ups, drill-downs, loss ratios and the inputs of the
+        hypothesis tests are answered without touching row-level data.
+
+        Parameters:
+        cells (pd.DataFrame): One row per observed combination of the dimensions.
+        dimensions (list): The key columns of the cells.
+        metrics (list): The aggregated metrics.
+        """
+        self.cells = cells
+        self.dimensions = list(dimensions)
+        self.metrics = list(metrics)
+
+    @classmethod
+    def from_data(cls, data, dimensions=CUBE_DIMENSIONS, metrics=AGGREGATE_METRICS):
+        """
+        Build the cube from cleaned rows.
+
+        The 'month' dimension is derived from 'TransactionMonth' as 'YYYY-MM'.
+
+        Parameters:
+        data (pd.DataFrame): The cleaned data.
+        dimensions (list): The key columns of the cube.
+        metrics (list): The numeric columns to aggregate.
+
+        Returns:
+        AggregateCube: The cube.
+        """
+        return cls.from_chunks([data], dimensions, metrics)
+
+    @classmethod
+    def from_chunks(cls, chunks, dimensions=CUBE_DIMENSIONS, metrics=AGGREGATE_METRICS):
+        """
+        Build the cube from a stream of cleaned chunks, e.g. ``DataPreprocessor.iter_chunks``.
+
+        Only the partial aggregates of each chunk are kept, so the data can be larger than memory.
+
+        Returns:
+        AggregateCube: The cube.
+        """
+        partials = [aggregate_segments(cls._with_month(chunk, dimensions), dimensions, metrics) for chunk in chunks]
+        cells = pd.concat(partials, ignore_index=True)
+        if len(partials) > 1:
+            cells = combine_aggregates(cells, dimensions, metrics)
+        return cls(cls._compact(cells, dimensions), dimensions, metrics)
+
+    @classmethod
+    def from_file(cls, file_path, delimiter='|', chunksize=DEFAULT_CHUNKSIZE, dimensions=CUBE_DIMENSIONS,
+                  metrics=AGGREGATE_METRICS):
+        """
+        Build the cube from a raw delimited file, cleaning it chunk by chunk.
+
+        Returns:
+        AggregateCube: The cube.
+        """
+        preprocessor = DataPreprocessor(file_path, delimiter=delimiter)
+        cube = cls.from_chunks(preprocessor.iter_chunks(chunksize=chunksize), dimensions, metrics)
+        logging.info(f"Built an aggregate cube of {len(cube.cells)} cells from {file_path}")
+        return cube
+
+    def save(self, path):
+        """
+        Save the cells to a Parquet file; dimensions are dictionary-encoded, so the file stays small.
+
+        Parameters:
+        path (str): Destination path.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.cells.to_parquet(path + '.tmp', index=False)
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path, metrics=AGGREGATE_METRICS):
+        """
+        Load a cube saved by ``save``.
+
+        Parameters:
+        path (str): Path of the Parquet file.
+        metrics (list): The metrics the cube was built with.
+
+        Returns:
+        AggregateCube: The cube.
+        """
+        cells = read_columnar(path)
+        measures = {'count'} | {f"{metric}_{suffix}" for metric in metrics for suffix in AGGREGATE_SUFFIXES}
+        dimensions = [column for column in cells.columns if column not in measures]
+        return cls(cls._compact(cells, dimensions), dimensions, metrics)
+
+    def slice(self, **filters):
+        """
+        Restrict the cube to some values of its dimensions, e.g. ``cube.slice(Province='Gauteng')``.
+
+        Parameters:
+        filters (dict): Dimension to a value or a list of values.
+
+        Returns:
+        AggregateCube: The cube of the matching cells.
+        """
+        mask = np.ones(len(self.cells), dtype=bool)
+        for dimension, values in filters.items():
+            if dimension not in self.dimensions:
+                raise KeyError(f"Unknown dimension: {dimension}")
+            values = values if isinstance(values, (list, tuple, set)) else [values]
+            mask &= self.cells[dimension].isin(values).to_numpy()
+        return AggregateCube(self.cells[mask], self.dimensions, self.metrics)
+
+    def rollup(self, by=(), **filters):
+        """
+        Aggregate the cells to fewer dimensions; adding dimensions to ``by`` drills down.
+
+        Parameters:
+        by (list): Dimensions to group by. The grand total when empty.
+        filters (dict): Restrict the cells first, as for ``slice``.
+
+        Returns:
+        pd.DataFrame: Per group, the count, the sum, mean and sample variance of each metric
+        over its non-missing values, the share of positive values ('<metric>_rate'), and the
+        loss ratio when premium and claims are aggregated.
+        """
+        cube = self.slice(**filters) if filters else self
+        rolled = combine_aggregates(cube.cells, list(by), cube.metrics, dropna=True)
+        rolled = rolled.set_index(list(by)) if by else rolled.set_axis(['total'])
+        result = pd.DataFrame({'count': rolled['count']}, index=rolled.index)
+        for metric in cube.metrics:
+            _, mean, variance = moments_from_aggregates(rolled, metric)
+            result[metric] = rolled[f"{metric}_sum"]
+            result[f"{metric}_mean"] = mean
+            result[f"{metric}_var"] = variance
+            result[f"{metric}_rate"] = rolled[f"{metric}_positive"] / rolled['count']
+        if 'TotalPremium' in cube.metrics and 'TotalClaims' in cube.metrics:
+            result['LossRatio'] = result['TotalClaims'] / result['TotalPremium']
+        return result
+
+    def contingency_table(self, feature, metric='TotalClaims'):
+        """
+        Return the counts of positive and non-positive values of a metric per group.
+
+        This is the table ``ABHypothesisTesting.chi_squared_test`` builds on rows for a
+        target such as ``metric > 0``.
+
+        Returns:
+        pd.DataFrame: The 'positive' and 'non_positive' counts, indexed by the groups of ``feature``.
+        """
+        counts = self.cells.groupby(feature, observed=True)[['count', f"{metric}_positive"]].sum()
+        return pd.DataFrame({'positive': counts[f"{metric}_positive"],
+                             'non_positive': counts['count'] - counts[f"{metric}_positive"]})
+
+    def group_moments(self, feature, metric='TotalClaims'):
+        """
+        Return the per-group moments of a metric as a ``GroupMoments``, e.g. for its ``t_test``.
+
+        Returns:
+        GroupMoments: The statistics of every group of ``feature``.
+        """
+        rolled = combine_aggregates(self.cells, [feature], [metric], dropna=True).set_index(feature)
+        n, mean, _ = moments_from_aggregates(rolled, metric)
+        moments = GroupMoments(feature, metric)
+        moments.moments = pd.DataFrame({'n': n, 'mean': mean, 'm2': rolled[f"{metric}_m2"].to_numpy()},
+                                       index=rolled.index)
+        return moments
+
+    def hypothesis_results(self, chi_squared_features=('Province', 'PostalCode', 'Gender'),
+                           t_test_features=('Province', 'Gender'), metric='TotalClaims', correction='fdr_bh',
+                           alpha=0.05, **filters):
+        """
+        Run the risk-difference hypothesis tests from the cells (see ``incremental.tests_from_aggregates``).
+
+        Returns:
+        pd.DataFrame: One row per test, in the layout of ``ABHypothesisTesting.run_batch``.
+        """
+        cube = self.slice(**filters) if filters else self
+        return tests_from_aggregates(cube.cells, list(chi_squared_features), list(t_test_features), metric,
+                                     correction=correction, alpha=alpha)
+
+    @staticmethod
+    def _with_month(chunk, dimensions):
+        """Add the 'YYYY-MM' month key of each row when the cube has a 'month' dimension."""
+        if 'month' not in dimensions or 'month' in chunk.columns:
+            return chunk
+        return chunk.assign(month=pd.to_datetime(chunk['TransactionMonth']).dt.strftime('%Y-%m'))
+
+    @staticmethod
+    def _compact(cells, dimensions):
+        """Store the dimensions as categoricals and the counts as integers."""
+        cells = cells.copy()
+        for dimension in dimensions:
+            cells[dimension] = cells[dimension].astype('category')
+        for column in cells.columns:
+            if column == 'count' or column.endswith(('_n', '_positive')):
+                cells[column] = cells[column].astype('int64')
+        return cells
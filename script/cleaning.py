@@ -0,0 +1,72 @@
+# cleaning.py
+
+import numpy as np
+import pandas as pd
+
+
+def strip_string_columns(data):
+    """
+    Remove leading and trailing whitespace from the string columns of a DataFrame.
+
+    Only object, string and category columns are touched, and each distinct value is
+    stripped once: object columns are factorized and the stripped uniques broadcast back,
+    category columns have their categories renamed. Non-string values are left unchanged.
+
+    Parameters:
+    data (pd.DataFrame): The data to clean.
+
+    Returns:
+    pd.DataFrame: The data with stripped string columns.
+    """
+    data = data.copy(deep=False)
+    for column in data.select_dtypes(include=['object', 'string', 'category']).columns:
+        series = data[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            categories = series.cat.categories
+            if categories.dtype != object:
+                continue
+            stripped = categories.str.strip().where(categories.map(type) == str, categories)
+            if stripped.equals(categories):
+                continue
+            if stripped.is_unique:
+                data[column] = series.cat.rename_categories(stripped)
+            else:
+                # Stripping merged some categories, so the codes have to be remapped
+                data[column] = series.map(dict(zip(categories, stripped))).astype('category')
+        else:
+            # Strip each distinct value once and broadcast the result back with the codes
+            codes, uniques = pd.factorize(series)
+            if not len(uniques):
+                # Every value is missing, there is nothing to strip
+                continue
+            stripped = np.array([x.strip() if isinstance(x, str) else x for x in uniques], dtype=object)
+            values = stripped[codes]
+            missing = codes == -1
+            if missing.any():
+                values[missing] = series.to_numpy()[missing]
+            data[column] = pd.Series(values, index=series.index, dtype=series.dtype)
+    return data
+
+
+def clamp_extreme_values(data, limit=1e10, fill_value=0):
+    """
+    Replace infinite values and values whose magnitude exceeds ``limit`` in numeric columns.
+
+    Parameters:
+    data (pd.DataFrame): The data to clean.
+    limit (float): Largest allowed absolute value.
+    fill_value (float): Value written in place of the out-of-range values.
+
+    Returns:
+    pd.DataFrame: The data with clamped numeric columns. NaN values are left as they are.
+    """
+    data = data.copy(deep=False)
+    for column in data.select_dtypes(include='number').columns:
+        values = data[column].to_numpy()
+        with np.errstate(invalid='ignore'):
+            mask = np.abs(values) > limit
+        if mask.any():
+            values = values.copy()
+            values[mask] = fill_value
+            data[column] = values
+    return data
@@ -0,0 +1,132 @@
+# data_cache.py
+
+import hashlib
+import json
+import logging
+import os
+import pandas as pd
+
+
+def file_digest(file_path, block_size=1 << 20):
+    """
+    Compute the SHA-256 digest of a file's content, reading it block by block.
+
+    Parameters:
+    file_path (str): Path of the file to hash.
+    block_size (int): Number of bytes read per block.
+
+    Returns:
+    str: The hexadecimal digest.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_columnar(file_path, columns=None):
+    """
+    Read a Parquet or Feather file, loading only the requested columns.
+
+    Parquet files are memory-mapped; Feather files are memory-mapped when uncompressed.
+
+    Parameters:
+    file_path (str): Path of the ``.parquet`` or ``.feather`` file.
+    columns (list): Columns to read. All columns are read when None.
+
+    Returns:
+    pd.DataFrame: The loaded data.
+    """
+    if file_path.endswith('.feather'):
+        import pyarrow.feather as feather
+
+        return feather.read_table(file_path, columns=columns, memory_map=True).to_pandas()
+    import pyarrow.parquet as pq
+
+    return pq.read_table(file_path, columns=columns, memory_map=True).to_pandas()
+
+
+class DataCache:
+    def __init__(self, cache_dir):
+        """
+        Initialize a columnar on-disk cache of parsed datasets.
+
+        Entries are Parquet files named after a key derived from the source file's
+        content and the configuration used to produce them, so a changed source or
+        a changed preprocessing config never reuses a stale entry.
+
+        Parameters:
+        cache_dir (str): Directory holding the cached Parquet files.
+        """
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, source_path, config=None):
+        """
+        Build the cache key for a source file and a preprocessing config.
+
+        Parameters:
+        source_path (str): Path of the source file.
+        config (dict): JSON-serializable settings that affect the cached content.
+
+        Returns:
+        str: The cache key.
+        """
+        digest = hashlib.sha256(file_digest(source_path).encode())
+        digest.update(json.dumps(config or {}, sort_keys=True, default=str).encode())
+        return digest.hexdigest()[:32]
+
+    def path(self, key):
+        """Return the path of the Parquet file for a cache key."""
+        return os.path.join(self.cache_dir, f"{key}.parquet")
+
+    def exists(self, key):
+        """Return True if an entry exists for the cache key."""
+        return os.path.exists(self.path(key))
+
+    def load(self, key, columns=None):
+        """Load a cached entry, reading only the requested columns."""
+        return read_columnar(self.path(key), columns=columns)
+
+    def save(self, key, data):
+        """
+        Write a DataFrame to the cache.
+
+        Returns:
+        bool: True if the entry was written, False if the data could not be stored as Parquet.
+        """
+        import pyarrow as pa
+
+        path = self.path(key)
+        tmp_path = f"{path}.tmp"
+        try:
+            data.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+            return True
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+            logging.warning(f"Could not cache data as Parquet: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+    def get_or_create(self, source_path, loader, config=None, columns=None):
+        """
+        Load a dataset from the cache, or build and cache it on a miss.
+
+        Parameters:
+        source_path (str): Path of the source file the entry is derived from.
+        loader (callable): Zero-argument function returning the full DataFrame on a miss.
+        config (dict): Settings that affect the produced DataFrame.
+        columns (list): Columns to return. All columns are returned when None.
+
+        Returns:
+        pd.DataFrame: The (projected) dataset.
+        """
+        key = self.key(source_path, config)
+        if self.exists(key):
+            logging.info(f"Loaded {source_path} from cache {self.path(key)}")
+            return self.load(key, columns=columns)
+        data = loader()
+        self.save(key, data)
+        return data[columns] if columns is not None else data
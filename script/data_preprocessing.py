@@ -1,34 +1,179 @@
+import os
 import pandas as pd
 import numpy as np
 import logging
-import matplotlib.pyplot as plt
-
-# Configure logging to output to both file and console
-logging.basicConfig(
-    level=logging.INFO,  # Set the minimum logging level
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("../logs/data_preprocessing.log"),  # Save logs to the specified folder
-        logging.StreamHandler()                                          # Also output logs to the console
-    ]
-)
+from cleaning import strip_string_columns
+from data_cache import DataCache
+from deduplication import FingerprintIndex, drop_duplicate_chunks, row_fingerprints
+from instrumentation import instrumented
+from outlier_stats import OutlierStatsAccumulator, outlier_statistics
 
+# Default log file, resolved from this file's location rather than the working directory
+LOG_PATH = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'logs',
+                                         'data_preprocessing.log'))
+LOG_ENV_VARIABLE = 'DATA_PREPROCESSING_LOG'
+
+
+def configure_logging(log_path=None, level=logging.INFO, console=True):
+    """
+    Configure logging to output to both a file and the console.
+
+    Does nothing if the root logger already has handlers, so applications and test
+    runners keep their own logging setup.
+
+    Parameters:
+    log_path (str): Path of the log file. Defaults to the ``DATA_PREPROCESSING_LOG``
+        environment variable, then to ``logs/data_preprocessing.log`` in the repository.
+    level (int): The minimum logging level.
+    console (bool): Also output logs to the console.
+    """
+    if logging.getLogger().handlers:
+        return
+    log_path = log_path or os.environ.get(LOG_ENV_VARIABLE, LOG_PATH)
+    os.makedirs(os.path.dirname(log_path) or '.', exist_ok=True)
+    handlers = [logging.FileHandler(log_path)]
+    if console:
+        handlers.append(logging.StreamHandler())
+    logging.basicConfig(level=level, format="%(asctime)s - %(levelname)s - %(message)s", handlers=handlers)
+
+# Declared schema applied by the streaming loader
+CATEGORICAL_COLUMNS = ['Province', 'PostalCode', 'Gender', 'make', 'Model', 'bodytype']
+DATE_FORMATS = {'TransactionMonth': '%Y-%m-%d %H:%M:%S', 'VehicleIntroDate': '%m/%Y'}
+DEFAULT_CHUNKSIZE = 100_000
+# Amounts kept in float64: float32 keeps only about 7 significant digits
+MONETARY_COLUMNS = ['TotalPremium', 'TotalClaims', 'SumInsured', 'CalculatedPremiumPerTerm',
+                    'CustomValueEstimate', 'CapitalOutstanding']
+
+
+def apply_schema(chunk):
+    """Downcast numeric columns, (re)categorize and parse the declared columns of a chunk."""
+    for column in chunk.select_dtypes(include='integer').columns:
+        chunk[column] = pd.to_numeric(chunk[column], downcast='integer')
+    for column in chunk.select_dtypes(include='floating').columns:
+        if column not in MONETARY_COLUMNS:
+            chunk[column] = pd.to_numeric(chunk[column], downcast='float')
+    for column in CATEGORICAL_COLUMNS:
+        if column in chunk.columns:
+            chunk[column] = chunk[column].astype('category').cat.remove_unused_categories()
+    for column, date_format in DATE_FORMATS.items():
+        if column in chunk.columns:
+            chunk[column] = pd.to_datetime(chunk[column], format=date_format, errors='coerce')
+    return chunk
+
+
+def concat_chunks(chunks):
+    """Concatenate chunks, unifying categorical columns so they stay categorical."""
+    chunks = list(chunks)
+    if not chunks:
+        return pd.DataFrame()
+    for column in chunks[0].columns:
+        if all(isinstance(chunk[column].dtype, pd.CategoricalDtype) for chunk in chunks):
+            categories = pd.api.types.union_categoricals([chunk[column] for chunk in chunks]).categories
+            for chunk in chunks:
+                chunk[column] = chunk[column].cat.set_categories(categories)
+    return pd.concat(chunks, ignore_index=True)
+
+
+@instrumented
 class DataPreprocessor:
     def __init__(self, file_path, delimiter='|'):
         """Initialize the preprocessor with data file details."""
+        configure_logging()
         self.file_path = file_path
         self.delimiter = delimiter
         self.data = None
 
-    def load_data(self):
-        """Load the dataset."""
+    def load_data(self, chunksize=None, cache_dir=None, columns=None):
+        """
+        Load the dataset.
+
+        When ``chunksize`` is given the file is streamed in chunks of that many rows,
+        typed with the declared schema and cleaned chunk by chunk (see ``iter_chunks``),
+        so peak memory is bounded by the chunk size rather than the file size.
+
+        When ``cache_dir`` is given the parsed result is cached as Parquet, keyed by the
+        file content and the load settings, and repeat loads skip CSV parsing entirely
+        and read only ``columns`` (all columns when None).
+        """
         try:
-            self.data = pd.read_csv(self.file_path, delimiter=self.delimiter)
+            def parse():
+                if chunksize is None:
+                    return pd.read_csv(self.file_path, delimiter=self.delimiter)
+                return concat_chunks(self.iter_chunks(chunksize=chunksize))
+
+            if cache_dir is None:
+                self.data = parse()
+                if columns is not None:
+                    self.data = self.data[columns]
+            else:
+                self.data = DataCache(cache_dir).get_or_create(
+                    self.file_path, parse, config=self._cache_config(chunksize), columns=columns)
             logging.info("Data loaded successfully.")
         except Exception as e:
             logging.error(f"Error loading data: {e}")
             raise
 
+    def iter_chunks(self, chunksize=DEFAULT_CHUNKSIZE, clean=True, drop_duplicates=False, duplicate_subset=None,
+                    fingerprint_index=None):
+        """
+        Stream the dataset in chunks with the declared dtype schema applied.
+
+        Categorical columns are read as ``category``, numeric columns are downcast and
+        date columns are parsed. With ``clean=True`` each chunk also goes through
+        ``handle_missing_values``, ``remove_negative_values`` and ``strip_whitespace``;
+        the ``NewVehicle`` mode used for imputation is computed beforehand over the whole
+        file (see ``column_mode``), so every chunk is filled with the same value.
+
+        With ``drop_duplicates=True`` rows whose fingerprint (see ``deduplication``) was seen
+        in an earlier chunk, or is in ``fingerprint_index``, are dropped.
+        """
+        dtype = {column: 'category' for column in CATEGORICAL_COLUMNS}
+        fill_values = {'NewVehicle': self.column_mode('NewVehicle', chunksize)} if clean else None
+        reader = pd.read_csv(self.file_path, delimiter=self.delimiter, dtype=dtype,
+                             chunksize=chunksize, low_memory=False)
+        chunks = (apply_schema(self._clean_chunk(chunk, fill_values) if clean else chunk) for chunk in reader)
+        if drop_duplicates:
+            chunks = drop_duplicate_chunks(chunks, fingerprint_index, duplicate_subset, DATE_FORMATS)
+        yield from chunks
+
+    def _cache_config(self, chunksize):
+        """Settings that determine the content produced by ``load_data``."""
+        config = {'delimiter': self.delimiter, 'stage': 'raw'}
+        if chunksize is not None:
+            config.update(stage='cleaned', chunksize=chunksize, categorical_columns=CATEGORICAL_COLUMNS,
+                          date_formats=DATE_FORMATS, monetary_columns=MONETARY_COLUMNS)
+        return config
+
+    def column_mode(self, column, chunksize=DEFAULT_CHUNKSIZE):
+        """
+        Compute the most frequent value of a column over the whole file, reading only that column.
+
+        Ties are broken like ``pd.Series.mode``, by taking the smallest value.
+
+        Returns:
+        The mode, or None if the column has no values.
+        """
+        counts = None
+        for chunk in pd.read_csv(self.file_path, delimiter=self.delimiter, usecols=[column],
+                                 chunksize=chunksize, low_memory=False):
+            chunk_counts = chunk[column].value_counts()
+            counts = chunk_counts if counts is None else counts.add(chunk_counts, fill_value=0)
+        if counts is None or not len(counts):
+            return None
+        return counts[counts == counts.max()].sort_index().index[0]
+
+    def _clean_chunk(self, chunk, fill_values=None):
+        """Run the cleaning steps on a single chunk without touching the loaded data."""
+        loaded = self.data
+        try:
+            self.data = chunk
+            self.handle_missing_values(fill_values)
+            self.remove_negative_values()
+            self.strip_whitespace()
+            return self.data
+        finally:
+            self.data = loaded
+
     def summarize_data(self):
         """Provide a summary of the dataset."""
         if self.data is not None:
@@ -39,19 +184,50 @@ class DataPreprocessor:
         else:
             logging.warning("Data has not been loaded yet.")
 
-    def check_duplicates(self):
-        """Check for duplicated rows and columns."""
+    def check_duplicates(self, subset=None, drop=False, index_path=None):
+        """
+        Check for duplicated rows and columns, optionally dropping the duplicated rows.
+
+        Rows are compared by a 64-bit fingerprint of the ``subset`` columns (see
+        ``deduplication.row_fingerprints``); the first occurrence of each row is kept.
+        With ``index_path`` the rows are also checked against the fingerprints of previous
+        loads persisted in that file. The index is only updated with the new rows when they
+        are kept, i.e. with ``drop``, so a mere check can be repeated.
+
+        Parameters:
+        subset (list): Columns the rows are compared on, e.g. ``deduplication.TRANSACTION_KEYS``.
+            Every column when None.
+        drop (bool): Remove the duplicated rows from the data.
+        index_path (str): Path of the persisted ``FingerprintIndex``.
+
+        Returns:
+        int: The number of duplicated rows.
+        """
         if self.data is not None:
-            duplicate_rows = self.data.duplicated().sum()
+            index = FingerprintIndex(index_path)
+            keep = index.filter(row_fingerprints(self.data, subset, DATE_FORMATS))
+            duplicate_rows = int((~keep).sum())
             duplicate_columns = self.data.columns[self.data.columns.duplicated()].tolist()
             print(f"Duplicated rows: {duplicate_rows}")
             print(f"Duplicated columns: {duplicate_columns}")
             logging.info(f"Checked duplicates. Rows: {duplicate_rows}, Columns: {duplicate_columns}")
+            if drop:
+                self.data = self.data[keep]
+                logging.info(f"Removed {duplicate_rows} duplicated rows.")
+                if index_path is not None:
+                    index.save()
+            return duplicate_rows
         else:
             logging.warning("Data has not been loaded yet.")
 
-    def handle_missing_values(self):
-        """Handle missing values by removing or imputing."""
+    def handle_missing_values(self, fill_values=None):
+        """
+        Handle missing values by removing or imputing.
+
+        Parameters:
+        fill_values (dict): Precomputed fill values by column, e.g. the 'NewVehicle' mode of
+            the whole file when cleaning a chunk. Computed from the data when missing.
+        """
         if self.data is not None:
             # Remove columns with high missing percentages
             columns_to_remove = ['NumberOfVehiclesInFleet', 'CrossBorder', 'CustomValueEstimate',
@@ -59,7 +235,11 @@ class DataPreprocessor:
             self.data.drop(columns=columns_to_remove, inplace=True, errors='ignore')
             
             # Fill missing values
-            self.data['NewVehicle'].fillna(self.data['NewVehicle'].mode()[0], inplace=True)
+            new_vehicle = (fill_values or {}).get('NewVehicle')
+            if new_vehicle is None and self.data['NewVehicle'].notna().any():
+                new_vehicle = self.data['NewVehicle'].mode()[0]
+            if new_vehicle is not None:
+                self.data['NewVehicle'].fillna(new_vehicle, inplace=True)
             self.data['Bank'].fillna('Unknown', inplace=True)
             self.data['AccountType'].fillna('Unknown', inplace=True)
             
@@ -85,84 +265,73 @@ class DataPreprocessor:
     def strip_whitespace(self):
         """Remove leading and trailing whitespaces from string columns."""
         if self.data is not None:
-            self.data = self.data.applymap(lambda x: x.strip() if isinstance(x, str) else x)
+            self.data = strip_string_columns(self.data)
             logging.info("Leading and trailing whitespaces removed.")
         else:
             logging.warning("Data has not been loaded yet.")
 
-    def outlier_handling(self):
-        """Handle outliers for 'TotalPremium' and 'TotalClaims'."""
-        if self.data is not None:
-            # Create boxplots for visualization
-            def plot_selected_boxplots(data, columns):
-                data[columns].plot(kind='box', subplots=True, layout=(1, len(columns)), figsize=(15, 6), sharex=False, sharey=False)
-                plt.tight_layout()
-                plt.show()
+    def outlier_handling(self, plot=False, approximate=False, chunksize=None):
+        """
+        Handle outliers for 'TotalPremium' and 'TotalClaims'.
 
-            print("Boxplots for 'TotalPremium' and 'TotalClaims':")
-            plot_selected_boxplots(self.data, ['TotalPremium', 'TotalClaims'])
-
-            # Define quantile thresholds
-            lower_quantile = 0.01
-            upper_quantile = 0.99
-
-            # Calculate quantile values for 'TotalPremium' and 'TotalClaims'
-            total_premium_lower = self.data['TotalPremium'].quantile(lower_quantile)
-            total_premium_upper = self.data['TotalPremium'].quantile(upper_quantile)
-            total_claims_lower = self.data['TotalClaims'].quantile(lower_quantile)
-            total_claims_upper = self.data['TotalClaims'].quantile(upper_quantile)
-
-            # Count rows that would be removed
-            rows_to_remove = self.data[
-                (self.data['TotalPremium'] < total_premium_lower) | (self.data['TotalPremium'] > total_premium_upper) |
-                (self.data['TotalClaims'] < total_claims_lower) | (self.data['TotalClaims'] > total_claims_upper)
-            ].shape[0]
-
-            print(f"TotalPremium lower quantile (1%): {total_premium_lower}")
-            print(f"TotalPremium upper quantile (99%): {total_premium_upper}")
-            print(f"TotalClaims lower quantile (1%): {total_claims_lower}")
-            print(f"TotalClaims upper quantile (99%): {total_claims_upper}")
-            print(f"Number of rows that would be removed: {rows_to_remove}")
-
-            # Summary of 'TotalClaims'
-            print("\nSummary of 'TotalClaims':")
-            total_claims_summary = self.data['TotalClaims'].describe()
-            print(total_claims_summary)
-
-            # Calculate specific percentiles
-            total_claims_95th = self.data['TotalClaims'].quantile(0.95)
-            total_claims_99th = self.data['TotalClaims'].quantile(0.9972)
-            print(f"95th percentile of 'TotalClaims': {total_claims_95th}")
-            print(f"99.72th percentile of 'TotalClaims': {total_claims_99th}")
-
-            # Count the number of positive values in 'TotalClaims'
-            total_claims_greater_than_zero = self.data[self.data['TotalClaims'] > 0].shape[0]
-            print(f"Number of values greater than zero in 'TotalClaims': {total_claims_greater_than_zero}")
-
-            # Function to calculate IQR and count outliers
-            def count_outliers_iqr(data, column):
-                Q1 = data[column].quantile(0.25)
-                Q3 = data[column].quantile(0.75)
-                IQR = Q3 - Q1
-                lower_bound = Q1 - 1.5 * IQR
-                upper_bound = Q3 + 1.5 * IQR
-                outliers = data[(data[column] < lower_bound) | (data[column] > upper_bound)]
-                return outliers.shape[0]
-
-            # Count outliers for 'TotalPremium' and 'TotalClaims'
-            total_premium_outliers = count_outliers_iqr(self.data, 'TotalPremium')
-            total_claims_outliers = count_outliers_iqr(self.data, 'TotalClaims')
-
-            print(f"Number of outliers in 'TotalPremium': {total_premium_outliers}")
-            print(f"Number of outliers in 'TotalClaims': {total_claims_outliers}")
-            logging.info("Outlier handling completed.")
+        All quantiles, IQR bounds and outlier counts are computed in one pass by
+        ``outlier_statistics``. With ``approximate=True`` quantiles come from a mergeable
+        sketch; with ``chunksize`` the file is streamed chunk by chunk into that sketch
+        instead of using the loaded data. Boxplots are only drawn when ``plot=True``.
+
+        Returns:
+        dict: The statistics returned by ``outlier_statistics``, or None if no data is loaded.
+        """
+        columns = ['TotalPremium', 'TotalClaims']
+        if chunksize is not None:
+            accumulator = OutlierStatsAccumulator(columns)
+            for chunk in self.iter_chunks(chunksize=chunksize):
+                accumulator.update(chunk)
+            stats = accumulator.result()
+        elif self.data is not None:
+            stats = outlier_statistics(self.data, columns, approximate=approximate)
         else:
             logging.warning("Data has not been loaded yet.")
+            return None
+
+        if plot and self.data is not None:
+            import matplotlib.pyplot as plt
+
+            print("Boxplots for 'TotalPremium' and 'TotalClaims':")
+            self.data[columns].plot(kind='box', subplots=True, layout=(1, len(columns)), figsize=(15, 6),
+                                    sharex=False, sharey=False)
+            plt.tight_layout()
+            plt.show()
+
+        summary = stats['columns']
+        premium, claims = summary.loc['TotalPremium'], summary.loc['TotalClaims']
+        print(f"TotalPremium lower quantile (1%): {premium['range_lower']}")
+        print(f"TotalPremium upper quantile (99%): {premium['range_upper']}")
+        print(f"TotalClaims lower quantile (1%): {claims['range_lower']}")
+        print(f"TotalClaims upper quantile (99%): {claims['range_upper']}")
+        if stats['rows_outside_range'] is not None:
+            print(f"Number of rows that would be removed: {stats['rows_outside_range']}")
+
+        print("\nSummary of 'TotalClaims':")
+        print(claims[['count', 'mean', 'std', 'min', 'q0.25', 'q0.5', 'q0.75', 'max']])
+        print(f"95th percentile of 'TotalClaims': {claims['q0.95']}")
+        print(f"99.72th percentile of 'TotalClaims': {claims['q0.9972']}")
+        print(f"Number of values greater than zero in 'TotalClaims': {int(claims['n_positive'])}")
+
+        print(f"Number of outliers in 'TotalPremium': {premium['n_iqr_outliers']:.0f}")
+        print(f"Number of outliers in 'TotalClaims': {claims['n_iqr_outliers']:.0f}")
+        logging.info("Outlier handling completed.")
+        return stats
 
     def save_cleaned_data(self, save_path):
-        """Save the cleaned dataset."""
+        """Save the cleaned dataset as CSV, or as Parquet/Feather based on the file extension."""
         if self.data is not None:
-            self.data.to_csv(save_path, index=False)
+            if save_path.endswith('.parquet'):
+                self.data.to_parquet(save_path, index=False)
+            elif save_path.endswith('.feather'):
+                self.data.reset_index(drop=True).to_feather(save_path)
+            else:
+                self.data.to_csv(save_path, index=False)
             logging.info(f"Cleaned data saved to {save_path}")
             print(f"Cleaned data saved to {save_path}")
         else:
@@ -0,0 +1,136 @@
+# deduplication.py
+
+import os
+import numpy as np
+import pandas as pd
+
+# Columns identifying a policy transaction; pass them as ``subset`` to compare rows on
+# the keys only. Rows are compared on every column when ``subset`` is None.
+TRANSACTION_KEYS = ['UnderwrittenCoverID', 'PolicyID', 'TransactionMonth']
+
+
+def _normalize(series, date_format=None):
+    """Convert a column to a representation whose hash does not depend on how the chunk was typed."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories
+        numbers = pd.to_numeric(categories, errors='coerce') if categories.dtype == object else None
+        if numbers is not None and len(numbers) and not np.isnan(numbers).any():
+            # read_csv reads numeric columns declared as category (e.g. PostalCode) as text
+            codes = series.cat.codes.to_numpy()
+            series = pd.Series(np.where(codes >= 0, np.asarray(numbers, dtype=np.float64)[codes], np.nan),
+                               index=series.index)
+        else:
+            series = series.astype(categories.dtype)
+    if date_format is not None and series.dtype == object:
+        series = pd.to_datetime(series, format=date_format, errors='coerce')
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return pd.Series(series.to_numpy(dtype='datetime64[ns]').view(np.int64), index=series.index)
+    if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+        # apply_schema downcasts every chunk on its own, so a value can be float32 in one
+        # chunk and float64 in another; values within pandas' float32 downcast tolerance
+        # (5e-4) are hashed as their float32 rounding in both cases
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        single = values.astype(np.float32).astype(np.float64)
+        return pd.Series(np.where(np.abs(single - values) <= 5e-4, single, values), index=series.index)
+    return series
+
+
+def row_fingerprints(data, subset=None, date_formats=None):
+    """
+    Compute a 64-bit fingerprint of every row with ``pd.util.hash_pandas_object``.
+
+    Columns are normalized first, so a row gets the same fingerprint whether its chunk
+    holds a value as category or object, as int, float32 or float64, or a date as parsed
+    datetime or as text in its declared format. Distinct rows collide with a
+    probability of about n**2 / 2**65, which is negligible at this data's scale.
+
+    Parameters:
+    data (pd.DataFrame): The rows.
+    subset (list): Columns the rows are compared on. Every column when None.
+    date_formats (dict): Column to the format of dates stored as text, e.g. ``DATE_FORMATS``.
+
+    Returns:
+    np.ndarray: The uint64 fingerprints, in row order.
+    """
+    columns = data if subset is None else data[list(subset)]
+    normalized = pd.DataFrame({i: _normalize(columns.iloc[:, i], (date_formats or {}).get(name))
+                               for i, name in enumerate(columns.columns)}, index=columns.index)
+    return pd.util.hash_pandas_object(normalized, index=False).to_numpy(dtype=np.uint64)
+
+
+class FingerprintIndex:
+    def __init__(self, path=None):
+        """
+        Initialize a sorted set of row fingerprints, optionally persisted as a .npy file.
+
+        Only the 8-byte fingerprints are kept, so duplicates can be detected against the
+        full history of loads without holding its rows in memory.
+
+        Parameters:
+        path (str): File of the index. The index is in memory only when None.
+        """
+        self.path = path
+        if path is not None and os.path.exists(path):
+            self.fingerprints = np.load(path)
+        else:
+            self.fingerprints = np.empty(0, dtype=np.uint64)
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+    def contains(self, fingerprints):
+        """Return a boolean mask of the fingerprints already in the index."""
+        fingerprints = np.asarray(fingerprints, dtype=np.uint64)
+        if not len(self.fingerprints):
+            return np.zeros(len(fingerprints), dtype=bool)
+        positions = np.minimum(np.searchsorted(self.fingerprints, fingerprints), len(self.fingerprints) - 1)
+        return self.fingerprints[positions] == fingerprints
+
+    def add(self, fingerprints):
+        """Add fingerprints to the index, merging them into the sorted array."""
+        new = np.unique(np.asarray(fingerprints, dtype=np.uint64))
+        new = new[~self.contains(new)]
+        self.fingerprints = np.insert(self.fingerprints, np.searchsorted(self.fingerprints, new), new)
+        return self
+
+    def filter(self, fingerprints):
+        """
+        Flag the rows to keep: the first occurrence of each fingerprint not already indexed.
+
+        The fingerprints of the kept rows are added to the index.
+
+        Returns:
+        np.ndarray: Boolean mask of the rows to keep.
+        """
+        fingerprints = np.asarray(fingerprints, dtype=np.uint64)
+        keep = np.zeros(len(fingerprints), dtype=bool)
+        keep[np.unique(fingerprints, return_index=True)[1]] = True
+        keep &= ~self.contains(fingerprints)
+        self.add(fingerprints[keep])
+        return keep
+
+    def save(self):
+        """Write the index to its file, atomically."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path + '.tmp', 'wb') as f:
+            np.save(f, self.fingerprints)
+        os.replace(self.path + '.tmp', self.path)
+
+
+def drop_duplicate_chunks(chunks, index=None, subset=None, date_formats=None):
+    """
+    Drop the rows of a stream of chunks whose fingerprint was seen in an earlier chunk or in the index.
+
+    Parameters:
+    chunks (iterable): DataFrames, e.g. from ``DataPreprocessor.iter_chunks``.
+    index (FingerprintIndex): Fingerprints of previous loads; updated with the kept rows.
+        A new in-memory index when None.
+    subset (list): Columns the rows are compared on. Every column when None.
+    date_formats (dict): Column to the format of dates stored as text.
+
+    Yields:
+    pd.DataFrame: The chunks without their duplicated rows.
+    """
+    index = FingerprintIndex() if index is None else index
+    for chunk in chunks:
+        yield chunk[index.filter(row_fingerprints(chunk, subset, date_formats))]
@@ -0,0 +1,150 @@
+# evaluation.py
+
+import json
+import os
+import numpy as np
+import pandas as pd
+from data_cache import read_columnar
+from resampling import poisson_weighted_sums
+
+SEGMENT_COLUMNS = ['Province', 'Gender']
+
+
+class PredictionStore:
+    def __init__(self, y_true, segments=None):
+        """
+        Initialize a store of the test-set predictions of every model.
+
+        Each model predicts the test rows once; the predictions are kept as float32
+        arrays, so metrics, segment breakdowns and bootstrap intervals are all computed
+        from the store without predicting again. A model replaced under the same name
+        (e.g. after retraining) is predicted again; a model refit in place is not
+        detected, so its owner must discard the store.
+
+        Parameters:
+        y_true (array-like): The target values of the test rows.
+        segments (pd.DataFrame): Segment labels of the test rows, in the same order.
+        """
+        self.y_true = np.asarray(y_true, dtype=np.float64)
+        self.segments = None if segments is None else segments.reset_index(drop=True)
+        self.predictions = {}
+        self._models = {}
+
+    def predict(self, name, model, X):
+        """
+        Return the cached predictions of a model, predicting ``X`` if they are missing or stale.
+
+        Returns:
+        np.ndarray: The predictions of the test rows.
+        """
+        if name not in self.predictions or self._models.get(name) is not model:
+            self.predictions[name] = np.asarray(model.predict(X), dtype=np.float32).ravel()
+            self._models[name] = model
+        return self.predictions[name]
+
+    def _matrix(self, names):
+        return np.vstack([self.predictions[name] for name in names]).astype(np.float64)
+
+    def metrics(self, names=None):
+        """
+        Compute MSE, MAE and R2 of the models in one vectorized pass.
+
+        Returns:
+        pd.DataFrame: One row per model.
+        """
+        names = list(names or self.predictions)
+        errors = self._matrix(names) - self.y_true
+        total_sum_sq = ((self.y_true - self.y_true.mean()) ** 2).sum()
+        mse = (errors ** 2).mean(axis=1)
+        return pd.DataFrame({'MSE': mse, 'MAE': np.abs(errors).mean(axis=1),
+                             'R2': 1 - mse * len(self.y_true) / total_sum_sq}, index=pd.Index(names, name='model'))
+
+    def segment_metrics(self, columns=SEGMENT_COLUMNS, names=None):
+        """
+        Compute the metrics of every model within each group of the segment columns.
+
+        Per-group sums of errors and targets are accumulated with ``np.bincount``, so each
+        column takes one pass over the predictions of all models. The targets are centered
+        on their mean first, so the groups' sums of squares do not cancel for large targets.
+
+        Returns:
+        pd.DataFrame: One row per model, segment column and group, with the group's row
+        count and metrics.
+        """
+        names = list(names or self.predictions)
+        errors = self._matrix(names) - self.y_true
+        centered = self.y_true - self.y_true.mean()
+        frames = []
+        for column in columns:
+            codes, groups = pd.factorize(self.segments[column], sort=True)
+            valid = codes >= 0
+            codes = codes[valid]
+            y = centered[valid]
+            n = np.bincount(codes, minlength=len(groups))
+            y_sum = np.bincount(codes, weights=y, minlength=len(groups))
+            total_sum_sq = np.bincount(codes, weights=y ** 2, minlength=len(groups)) - y_sum ** 2 / np.maximum(n, 1)
+            for name, error in zip(names, errors[:, valid]):
+                squared = np.bincount(codes, weights=error ** 2, minlength=len(groups))
+                absolute = np.bincount(codes, weights=np.abs(error), minlength=len(groups))
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    frames.append(pd.DataFrame({'model': name, 'segment': column, 'group': groups, 'n': n,
+                                                'MSE': squared / n, 'MAE': absolute / n,
+                                                'R2': 1 - squared / total_sum_sq}))
+        return pd.concat(frames, ignore_index=True)
+
+    def bootstrap_intervals(self, names=None, n_resamples=1000, confidence=0.95, seed=0):
+        """
+        Compute percentile bootstrap confidence intervals of the metrics without predicting again.
+
+        The test rows are resampled with Poisson(1) weights (see
+        ``resampling.poisson_weighted_sums``); every metric is a function of weighted sums
+        of the targets (centered on their mean) and errors, so all models and resamples are
+        evaluated in one pass.
+
+        Returns:
+        pd.DataFrame: Per model, the lower and upper bound of every metric ('<metric>_ci_lower',
+        '<metric>_ci_upper').
+        """
+        names = list(names or self.predictions)
+        errors = self._matrix(names) - self.y_true
+        centered = self.y_true - self.y_true.mean()
+        columns = np.column_stack([np.ones_like(self.y_true), centered, centered ** 2,
+                                   (errors ** 2).T, np.abs(errors).T])
+        sums = poisson_weighted_sums(columns, n_resamples=n_resamples, seed=seed)
+        weight, y_sum, y_sum_sq = sums[:, :1], sums[:, 1:2], sums[:, 2:3]
+        squared, absolute = sums[:, 3:3 + len(names)], sums[:, 3 + len(names):]
+        resampled = {'MSE': squared / weight, 'MAE': absolute / weight,
+                     'R2': 1 - squared / (y_sum_sq - y_sum ** 2 / weight)}
+        tail = (1 - confidence) / 2
+        intervals = pd.DataFrame(index=pd.Index(names, name='model'))
+        for metric, values in resampled.items():
+            intervals[f"{metric}_ci_lower"], intervals[f"{metric}_ci_upper"] = np.quantile(
+                values, [tail, 1 - tail], axis=0)
+        return intervals
+
+    def save(self, directory):
+        """Save the targets, segment labels and predictions as .npy and Parquet files."""
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, 'y_true.npy'), self.y_true)
+        for i, name in enumerate(self.predictions):
+            np.save(os.path.join(directory, f"predictions_{i}.npy"), self.predictions[name])
+        if self.segments is not None:
+            self.segments.to_parquet(os.path.join(directory, 'segments.parquet'), index=False)
+        with open(os.path.join(directory, 'models.json'), 'w') as f:
+            json.dump(list(self.predictions), f)
+
+    @classmethod
+    def load(cls, directory):
+        """
+        Load a store saved by ``save``; the predictions are memory-mapped.
+
+        Returns:
+        PredictionStore: The store. Its models are unknown, so ``predict`` predicts again.
+        """
+        segments_path = os.path.join(directory, 'segments.parquet')
+        store = cls(np.load(os.path.join(directory, 'y_true.npy')),
+                    read_columnar(segments_path) if os.path.exists(segments_path) else None)
+        with open(os.path.join(directory, 'models.json')) as f:
+            for i, name in enumerate(json.load(f)):
+                store.predictions[name] = np.load(os.path.join(directory, f"predictions_{i}.npy"), mmap_mode='r')
+        return store
@@ -0,0 +1,201 @@
+# feature_encoding.py
+
+import numpy as np
+import pandas as pd
+
+CATEGORICAL_FEATURES = ['Province', 'PostalCode', 'Gender']
+TARGET_COLUMNS = ['TotalPremium', 'TotalClaims']
+NUMERIC_SAMPLE_SIZE = 10_000
+
+
+def add_engineered_features(data):
+    """
+    Add the engineered 'ClaimsPerPremium' ratio, with infinite and missing ratios set to 0.
+
+    Returns:
+    pd.DataFrame: A shallow copy of the data with the new column.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = data['TotalClaims'].to_numpy(dtype=float) / data['TotalPremium'].to_numpy(dtype=float)
+    ratio[~np.isfinite(ratio)] = 0
+    return data.assign(ClaimsPerPremium=ratio)
+
+
+def _numeric_values(series, clip_value):
+    """Convert a column to float64, replacing missing, infinite and out-of-range values by 0."""
+    if series.dtype == object or isinstance(series.dtype, pd.CategoricalDtype):
+        series = pd.to_numeric(series.astype(object), errors='coerce')
+    values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    with np.errstate(invalid='ignore'):
+        values = np.where(np.isnan(values) | (np.abs(values) > clip_value), 0.0, values)
+    return values
+
+
+def target_values(data, target='TotalPremium', clip_value=1e10):
+    """
+    Return the target column as float64, with missing, infinite and out-of-range values set to 0.
+    """
+    return pd.Series(_numeric_values(data[target], clip_value), index=data.index, name=target)
+
+
+def is_numeric_text(series):
+    """Tell whether a text column holds numbers, judged from its first ``NUMERIC_SAMPLE_SIZE`` values."""
+    return bool(pd.to_numeric(series.dropna().head(NUMERIC_SAMPLE_SIZE).astype(object), errors='coerce').notna().any())
+
+
+def value_kind(series):
+    """
+    Classify the values of a column as 'numeric', 'datetime' or 'text'.
+
+    A categorical column is classified by its categories, so PostalCode read as
+    categories of text and PostalCode read as integers are told apart.
+    """
+    dtype = series.cat.categories.dtype if isinstance(series.dtype, pd.CategoricalDtype) else series.dtype
+    if pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_bool_dtype(dtype):
+        return 'numeric'
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return 'datetime'
+    return 'text'
+
+
+class FeatureEncoder:
+    def __init__(self, categorical_features=CATEGORICAL_FEATURES, max_onehot_categories=10,
+                 exclude=TARGET_COLUMNS, sparse=False, dtype=np.float32, clip_value=1e10,
+                 target_features=True):
+        """
+        Initialize a reusable encoder producing the models' design matrix.
+
+        Categorical features with more than ``max_onehot_categories`` values are encoded
+        as ordinal codes, the others one-hot. Every other column is used as a numeric
+        feature, converting only the columns that are not numeric already; text columns
+        with no numeric value in their first 10,000 non-missing rows are dropped, judged
+        once on the first chunk holding values of the column. Missing, infinite and
+        out-of-range values become 0.
+
+        The input columns and the kind of their values at fitting are recorded in
+        ``input_columns_`` and ``input_dtypes_``. The targets are input columns only when
+        ``target_features`` is set, since 'ClaimsPerPremium' is computed from them; an
+        encoder without it can encode new policies whose premium and claims are unknown.
+
+        Parameters:
+        categorical_features (list): The categorical columns to encode.
+        max_onehot_categories (int): Largest number of categories encoded one-hot.
+        exclude (list): Columns left out of the features (the targets).
+        sparse (bool): Return a CSR matrix instead of a DataFrame.
+        dtype (np.dtype): The dtype of the design matrix.
+        clip_value (float): Values whose magnitude exceeds it are replaced by 0.
+        target_features (bool): Add the 'ClaimsPerPremium' feature engineered from the targets.
+        """
+        self.categorical_features = list(categorical_features)
+        self.max_onehot_categories = max_onehot_categories
+        self.exclude = list(exclude)
+        self.sparse = sparse
+        self.dtype = dtype
+        self.clip_value = clip_value
+        self.target_features = target_features
+        self.numeric_columns_ = None
+        self.categories_ = None
+        self.onehot_features_ = None
+        self.input_columns_ = None
+        self.input_dtypes_ = None
+        self.feature_names_ = None
+
+    def _engineer(self, data):
+        """Add the engineered features the encoder uses."""
+        return add_engineered_features(data) if self.target_features else data
+
+    def fit(self, data):
+        """Learn the numeric columns and the categories of the categorical features."""
+        self.categories_ = None
+        return self.partial_fit(data)
+
+    def partial_fit(self, data):
+        """
+        Update the learned columns and categories with another chunk of data.
+
+        Categories seen in any chunk are kept, and a categorical feature switches from
+        one-hot to ordinal encoding once it exceeds ``max_onehot_categories``, so fitting
+        chunk by chunk gives the same encoder as fitting the concatenated data. Whether a
+        text column is numeric is decided on the first chunk where it has values and
+        kept for the following chunks.
+        """
+        data = self._engineer(data)
+        if self.categories_ is None:
+            self.categories_ = {}
+            self._columns = []
+            self._numeric = set()
+            self._typed = set()
+            self.input_dtypes_ = {}
+        for column in data.columns:
+            series = data[column]
+            self.input_dtypes_.setdefault(column, value_kind(series))
+            if column in self.exclude:
+                continue
+            if column not in self._columns:
+                self._columns.append(column)
+            if column in self.categorical_features:
+                categories = pd.Index(series.dropna().unique())
+                if column in self.categories_:
+                    categories = self.categories_[column].append(categories).unique()
+                self.categories_[column] = categories.sort_values()
+            elif column in self._typed:
+                continue
+            elif pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_bool_dtype(series.dtype):
+                self._numeric.add(column)
+                self._typed.add(column)
+            elif series.notna().any():
+                if series.dtype == object and is_numeric_text(series):
+                    self._numeric.add(column)
+                self._typed.add(column)
+        self.onehot_features_ = [feature for feature in self.categorical_features if feature in self.categories_
+                                 and len(self.categories_[feature]) <= self.max_onehot_categories]
+        self.numeric_columns_ = [column for column in self._columns if column in self._numeric or
+                                 (column in self.categories_ and column not in self.onehot_features_)]
+        self.input_columns_ = [column for column in self.numeric_columns_ if column != 'ClaimsPerPremium'] + \
+            self.onehot_features_ + (TARGET_COLUMNS if self.target_features else [])
+        self.feature_names_ = list(self.numeric_columns_) + [
+            f"{feature}_{category}" for feature in self.onehot_features_ for category in self.categories_[feature]]
+        return self
+
+    def transform(self, data):
+        """
+        Encode data into the design matrix.
+
+        Unknown categories get the ordinal code -1 or an all-zero one-hot block.
+
+        Returns:
+        pd.DataFrame or scipy.sparse.csr_matrix: The design matrix with ``feature_names_`` columns.
+        """
+        data = self._engineer(data)
+        n_rows = len(data)
+        n_numeric = len(self.numeric_columns_)
+        onehot_rows, onehot_cols = [], []
+        offset = n_numeric
+        for feature in self.onehot_features_:
+            codes = self.categories_[feature].get_indexer(data[feature])
+            known = codes >= 0
+            onehot_rows.append(np.flatnonzero(known))
+            onehot_cols.append(codes[known] + offset)
+            offset += len(self.categories_[feature])
+        onehot_rows = np.concatenate(onehot_rows) if onehot_rows else np.empty(0, dtype=np.int64)
+        onehot_cols = np.concatenate(onehot_cols) if onehot_cols else np.empty(0, dtype=np.int64)
+
+        width = len(self.feature_names_) if not self.sparse else n_numeric
+        matrix = np.zeros((n_rows, width), dtype=self.dtype)
+        for j, column in enumerate(self.numeric_columns_):
+            if column in self.categories_:
+                matrix[:, j] = self.categories_[column].get_indexer(data[column])
+            else:
+                matrix[:, j] = _numeric_values(data[column], self.clip_value)
+        if self.sparse:
+            import scipy.sparse as sp
+
+            onehot = sp.csr_matrix((np.ones(len(onehot_rows), dtype=self.dtype), (onehot_rows, onehot_cols - n_numeric)),
+                                   shape=(n_rows, len(self.feature_names_) - n_numeric))
+            return sp.hstack([sp.csr_matrix(matrix), onehot], format='csr', dtype=self.dtype)
+        matrix[onehot_rows, onehot_cols] = 1
+        return pd.DataFrame(matrix, index=data.index, columns=self.feature_names_, copy=False)
+
+    def fit_transform(self, data):
+        """Fit the encoder and encode the data."""
+        return self.fit(data).transform(data)
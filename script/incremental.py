@@ -0,0 +1,339 @@
+# incremental.py
+
+import glob
+import logging
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import scipy.stats as stats
+from AB_hypothesis_testing import adjust_pvalues, chi2_statistic, ttest_from_moments
+from data_cache import read_columnar
+from data_preprocessing import DATE_FORMATS, DEFAULT_CHUNKSIZE, DataPreprocessor, concat_chunks
+from deduplication import FingerprintIndex, row_fingerprints
+
+SEGMENT_KEYS = ['Province', 'PostalCode', 'Gender']
+AGGREGATE_METRICS = ['TotalPremium', 'TotalClaims']
+AGGREGATE_SUFFIXES = ('n', 'sum', 'm2', 'positive')
+
+
+def aggregate_segments(data, keys, metrics):
+    """
+    Compute mergeable per-segment aggregates.
+
+    Counts, sums and positive counts add up across slices; the sum of squared deviations
+    from the segment mean is kept instead of the sum of squares, which loses most of its
+    precision to cancellation for large amounts. Missing values of a metric are left out
+    of its sum, mean and squared deviations, which is why every metric keeps its own count.
+    Aggregates of disjoint slices of data are combined, and rolled up to fewer keys, with
+    ``combine_aggregates``.
+
+    Parameters:
+    data (pd.DataFrame): The rows to aggregate.
+    keys (list): The segment columns.
+    metrics (list): The numeric columns to aggregate.
+
+    Returns:
+    pd.DataFrame: One row per segment with the keys, 'count' and, per metric, '<metric>_n'
+    (the number of non-missing values), '<metric>_sum', '<metric>_m2' (the sum of squared
+    deviations from the segment mean) and '<metric>_positive' (the number of positive values).
+    """
+    work = pd.DataFrame({key: data[key] for key in keys})
+    codes = work.groupby(keys, observed=True, dropna=False).ngroup().to_numpy()
+    work['count'] = 1
+    for metric in metrics:
+        values = data[metric].to_numpy(dtype=float)
+        present = ~np.isnan(values)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.bincount(codes, weights=np.where(present, values, 0)) / np.bincount(codes, weights=present)
+        work[f"{metric}_n"] = present.astype(int)
+        work[f"{metric}_sum"] = values
+        work[f"{metric}_m2"] = (values - mean[codes]) ** 2
+        work[f"{metric}_positive"] = (values > 0).astype(int)
+    return work.groupby(keys, observed=True, dropna=False).sum().reset_index()
+
+
+def combine_aggregates(aggregates, keys, metrics, dropna=False):
+    """
+    Combine the aggregate rows of each segment, e.g. of several slices or to roll up to fewer keys.
+
+    Counts and sums are added. The sums of squared deviations are merged with Chan et
+    al.'s parallel formula: each row contributes its own M2 plus ``n * (mean - segment mean)**2``,
+    where ``n`` is the row's number of non-missing values of the metric.
+
+    Parameters:
+    aggregates (pd.DataFrame): Aggregates in the layout of ``aggregate_segments``.
+    keys (list): The segment columns to keep. One total row when empty.
+    metrics (list): The aggregated metrics.
+    dropna (bool): Leave out the rows with a missing key.
+
+    Returns:
+    pd.DataFrame: One row per segment, in the layout of ``aggregate_segments``.
+    """
+    measures = ['count'] + [f"{metric}_{suffix}" for metric in metrics for suffix in AGGREGATE_SUFFIXES]
+    work = aggregates[list(keys) + measures].copy()
+    if keys:
+        codes = work.groupby(list(keys), observed=True, dropna=dropna).ngroup().to_numpy()
+        work = work[codes >= 0]
+        codes = codes[codes >= 0]
+    else:
+        codes = np.zeros(len(work), dtype=np.int64)
+    for metric in metrics:
+        n = work[f"{metric}_n"].to_numpy(dtype=float)
+        total = work[f"{metric}_sum"].to_numpy(dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            segment_mean = np.bincount(codes, weights=total)[codes] / np.bincount(codes, weights=n)[codes]
+            deviation = np.where(n > 0, n * (total / n - segment_mean) ** 2, 0)
+        work[f"{metric}_m2"] = work[f"{metric}_m2"].to_numpy(dtype=float) + deviation
+    if not keys:
+        return work.sum().to_frame().T
+    return work.groupby(list(keys), observed=True, dropna=dropna).sum().reset_index()
+
+
+def moments_from_aggregates(aggregates, metric):
+    """
+    Derive the count, mean and sample variance of a metric from combined aggregates.
+
+    Returns:
+    tuple: Arrays of the counts of non-missing values, means and variances.
+    """
+    n = aggregates[f"{metric}_n"].to_numpy(dtype=float)
+    total = aggregates[f"{metric}_sum"].to_numpy(dtype=float)
+    m2 = aggregates[f"{metric}_m2"].to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = total / n
+        variance = m2 / (n - 1)
+    return n, mean, variance
+
+
+def tests_from_aggregates(aggregates, chi_squared_features=SEGMENT_KEYS, t_test_features=('Province', 'Gender'),
+                          metric='TotalClaims', correction='fdr_bh', alpha=0.05):
+    """
+    Run risk-difference hypothesis tests from per-segment aggregates instead of rows.
+
+    Chi-squared tests compare claim incidence (``metric`` > 0) across the groups of each
+    feature; t-tests compare the mean of ``metric`` between every pair of groups.
+
+    Parameters:
+    aggregates (pd.DataFrame): Aggregates in the layout of ``aggregate_segments``.
+    chi_squared_features (list): Features whose groups are compared by chi-squared tests.
+    t_test_features (list): Features whose pairs of groups are compared by t-tests.
+    metric (str): The aggregated metric tested.
+    correction (str): Multiple-testing correction passed to ``adjust_pvalues``.
+    alpha (float): Significance level applied to the adjusted p-values.
+
+    Returns:
+    pd.DataFrame: One row per test, in the layout of ``ABHypothesisTesting.run_batch``.
+    """
+    rows = []
+    for feature in chi_squared_features:
+        counts = aggregates.groupby(feature, observed=True)[['count', f"{metric}_positive"]].sum()
+        table = np.column_stack([counts[f"{metric}_positive"], counts['count'] - counts[f"{metric}_positive"]])
+        table = table[:, table.sum(axis=0) > 0]
+        chi2, dof = chi2_statistic(table)
+        p_value = stats.chi2.sf(chi2, dof) if dof > 0 else np.nan
+        rows.append({'test': 'chi_squared', 'feature': feature, 'target': metric, 'group_a': None,
+                     'group_b': None, 'statistic': chi2, 'dof': float(dof), 'p_value': p_value})
+    for feature in t_test_features:
+        groups = combine_aggregates(aggregates, [feature], [metric], dropna=True).set_index(feature)
+        n, mean, variance = moments_from_aggregates(groups, metric)
+        first, second = np.triu_indices(len(groups), k=1)
+        t_stat, dof, p_value = ttest_from_moments(n[first], mean[first], variance[first],
+                                                  n[second], mean[second], variance[second])
+        for i, j, t, d, p in zip(first, second, t_stat, dof, p_value):
+            rows.append({'test': 't_test', 'feature': feature, 'target': metric, 'group_a': groups.index[i],
+                         'group_b': groups.index[j], 'statistic': t, 'dof': d, 'p_value': p})
+    results = pd.DataFrame(rows)
+    results['p_adjusted'] = adjust_pvalues(results['p_value'].to_numpy(), method=correction)
+    results['reject'] = results['p_adjusted'] < alpha
+    return results
+
+
+class IncrementalStore:
+    def __init__(self, root, delimiter='|', chunksize=DEFAULT_CHUNKSIZE, deduplicate=False, duplicate_subset=None):
+        """
+        Initialize a month-partitioned store of cleaned data with running segment aggregates.
+
+        Each monthly slice is cleaned on its own and written to ``<root>/partitions/month=YYYY-MM``.
+        Aggregates per (Province, PostalCode, Gender, month) are kept in
+        ``<root>/aggregates.parquet``, so loss ratios and hypothesis tests refresh from the
+        aggregates instead of reprocessing the full history.
+
+        With ``deduplicate=True`` the 64-bit fingerprint of every stored row is kept next to
+        its partition (see ``deduplication``), and rows already stored or repeated within
+        a slice are dropped when appending, without loading the stored rows.
+
+        Parameters:
+        root (str): Directory of the store.
+        delimiter (str): Delimiter of the monthly source files.
+        chunksize (int): Number of rows cleaned at a time.
+        deduplicate (bool): Drop duplicated rows across slices.
+        duplicate_subset (list): Columns rows are compared on. Every column when None.
+        """
+        self.root = root
+        self.delimiter = delimiter
+        self.chunksize = chunksize
+        self.deduplicate = deduplicate
+        self.duplicate_subset = duplicate_subset
+        self.partitions_dir = os.path.join(root, 'partitions')
+        self.aggregates_path = os.path.join(root, 'aggregates.parquet')
+        os.makedirs(self.partitions_dir, exist_ok=True)
+
+    def months(self):
+        """Return the months held in the store, in order."""
+        return sorted(name.split('=', 1)[1] for name in os.listdir(self.partitions_dir)
+                      if name.startswith('month='))
+
+    def append_month(self, file_path):
+        """
+        Clean a new slice of data, add it to the partitions and update the aggregates.
+
+        Months already in the store are replaced, so reprocessing a slice is idempotent.
+        When the store deduplicates, they are extended with the rows not stored yet instead.
+        The stored months are only changed once the whole slice has been cleaned.
+
+        Parameters:
+        file_path (str): Path of the delimited file with the new slice.
+
+        Returns:
+        list: The months written.
+        """
+        preprocessor = DataPreprocessor(file_path, delimiter=self.delimiter)
+        index = self.fingerprint_index() if self.deduplicate else None
+        # New parts are written to a staging directory and moved into place once the whole
+        # slice is cleaned, so a failed append leaves the stored months untouched
+        staging = os.path.join(self.root, 'staging')
+        shutil.rmtree(staging, ignore_errors=True)
+        parts, replaced, aggregates, fingerprints = {}, [], [], {}
+        for chunk in preprocessor.iter_chunks(chunksize=self.chunksize):
+            chunk = self._with_month(chunk)
+            if self.deduplicate:
+                chunk_fingerprints = row_fingerprints(chunk.drop(columns='month'), self.duplicate_subset,
+                                                      DATE_FORMATS)
+                keep = index.filter(chunk_fingerprints)
+                chunk, chunk_fingerprints = chunk[keep], chunk_fingerprints[keep]
+            for month, positions in chunk.groupby('month', observed=True).indices.items():
+                directory = os.path.join(staging, f"month={month}")
+                if month not in parts:
+                    existing = self._partition_dir(month)
+                    if self.deduplicate and os.path.isdir(existing):
+                        parts[month] = len(glob.glob(os.path.join(existing, '*.parquet')))
+                    else:
+                        parts[month] = 0
+                        replaced.append(month)
+                    os.makedirs(directory)
+                chunk.iloc[positions].drop(columns='month').to_parquet(
+                    os.path.join(directory, f"part-{parts[month]}.parquet"), index=False)
+                parts[month] += 1
+                if self.deduplicate:
+                    fingerprints.setdefault(month, []).append(chunk_fingerprints[positions])
+            aggregates.append(aggregate_segments(chunk, SEGMENT_KEYS + ['month'], AGGREGATE_METRICS))
+
+        for month in parts:
+            staged, directory = os.path.join(staging, f"month={month}"), self._partition_dir(month)
+            if month in replaced:
+                if os.path.isdir(directory):
+                    os.replace(directory, os.path.join(staging, f"replaced-month={month}"))
+                os.replace(staged, directory)
+            else:
+                for path in glob.glob(os.path.join(staged, '*.parquet')):
+                    os.replace(path, os.path.join(directory, os.path.basename(path)))
+        for month, arrays in fingerprints.items():
+            FingerprintIndex(self._fingerprint_path(month)).add(np.concatenate(arrays)).save()
+        if aggregates:
+            new = pd.concat(aggregates, ignore_index=True)
+            for key in SEGMENT_KEYS:
+                # Keys are stored as text so every slice has the same schema; missing keys stay missing
+                values = new[key].astype(object)
+                new[key] = values.where(values.isna(), values.astype(str))
+            existing = self.aggregates()
+            if existing is not None:
+                new = pd.concat([existing[~existing['month'].isin(replaced)], new], ignore_index=True)
+            new = combine_aggregates(new, SEGMENT_KEYS + ['month'], AGGREGATE_METRICS)
+            new.sort_values(['month'] + SEGMENT_KEYS).to_parquet(self.aggregates_path + '.tmp', index=False)
+            os.replace(self.aggregates_path + '.tmp', self.aggregates_path)
+        shutil.rmtree(staging, ignore_errors=True)
+        logging.info(f"Appended months {sorted(parts)} from {file_path}")
+        return sorted(parts)
+
+    def fingerprint_index(self):
+        """
+        Return a ``FingerprintIndex`` of the rows stored in every month.
+
+        A month stored without fingerprints, e.g. by a store that did not deduplicate, has
+        them rebuilt from its partition, one part at a time, and saved first.
+        """
+        index = FingerprintIndex()
+        for month in self.months():
+            month_index = FingerprintIndex(self._fingerprint_path(month))
+            if not os.path.exists(month_index.path):
+                for path in sorted(glob.glob(os.path.join(self._partition_dir(month), '*.parquet'))):
+                    month_index.add(row_fingerprints(read_columnar(path), self.duplicate_subset, DATE_FORMATS))
+                month_index.save()
+                logging.info(f"Rebuilt the fingerprints of month {month}")
+            index.add(month_index.fingerprints)
+        return index
+
+    def aggregates(self, months=None):
+        """Return the stored aggregates, optionally restricted to some months (None if empty)."""
+        if not os.path.exists(self.aggregates_path):
+            return None
+        aggregates = read_columnar(self.aggregates_path)
+        if months is not None:
+            aggregates = aggregates[aggregates['month'].isin(months)]
+        return aggregates
+
+    def load(self, months=None, columns=None):
+        """
+        Load the cleaned rows of some months from the partitions.
+
+        Parameters:
+        months (list): Months to load. All months are loaded when None.
+        columns (list): Columns to read. All columns are read when None.
+
+        Returns:
+        pd.DataFrame: The cleaned rows.
+        """
+        files = []
+        for month in (months if months is not None else self.months()):
+            files.extend(sorted(glob.glob(os.path.join(self._partition_dir(month), '*.parquet'))))
+        return concat_chunks(read_columnar(path, columns=columns) for path in files)
+
+    def loss_ratios(self, by=('Province',), months=None):
+        """
+        Compute loss ratios (TotalClaims / TotalPremium) from the aggregates.
+
+        Parameters:
+        by (tuple): Segment keys and/or 'month' to group by.
+        months (list): Months to include. All months when None.
+
+        Returns:
+        pd.DataFrame: Premium, claims, policy count and loss ratio per group.
+        """
+        rolled = self.aggregates(months).groupby(list(by))[
+            ['count', 'TotalPremium_sum', 'TotalClaims_sum']].sum()
+        rolled['LossRatio'] = rolled['TotalClaims_sum'] / rolled['TotalPremium_sum']
+        return rolled.rename(columns={'TotalPremium_sum': 'TotalPremium', 'TotalClaims_sum': 'TotalClaims'})
+
+    def hypothesis_results(self, chi_squared_features=SEGMENT_KEYS, t_test_features=('Province', 'Gender'),
+                           metric='TotalClaims', months=None, correction='fdr_bh', alpha=0.05):
+        """
+        Run the risk-difference hypothesis tests from the aggregates (see ``tests_from_aggregates``).
+
+        Returns:
+        pd.DataFrame: One row per test, in the layout of ``ABHypothesisTesting.run_batch``.
+        """
+        return tests_from_aggregates(self.aggregates(months), chi_squared_features, t_test_features, metric,
+                                     correction=correction, alpha=alpha)
+
+    def _partition_dir(self, month):
+        return os.path.join(self.partitions_dir, f"month={month}")
+
+    def _fingerprint_path(self, month):
+        return os.path.join(self._partition_dir(month), 'fingerprints.npy')
+
+    @staticmethod
+    def _with_month(chunk):
+        """Add the 'YYYY-MM' month key of each row."""
+        months = pd.to_datetime(chunk['TransactionMonth']).dt.strftime('%Y-%m')
+        return chunk.assign(month=months.fillna('unknown'))
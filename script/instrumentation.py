@@ -0,0 +1,259 @@
+# instrumentation.py
+#
+# Opt-in timing and memory instrumentation of the public methods of the analysis classes:
+#     import instrumentation
+#     instrumentation.enable('../logs/instrumentation.jsonl', trace_memory=True)
+# or set the INSTRUMENTATION_LOG environment variable to the path of the JSON-lines log.
+
+import cProfile
+import functools
+import inspect
+import json
+import os
+import resource
+import threading
+import time
+import tracemalloc
+import pandas as pd
+
+ENV_VARIABLE = 'INSTRUMENTATION_LOG'
+
+
+def peak_rss_mb():
+    """High-water mark of the resident memory of the current process, in MiB."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def current_rss_mb():
+    """Current resident memory of the process in MiB, or None where /proc is not available."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class RSSSampler:
+    def __init__(self, interval=0.01):
+        """
+        Sample the resident memory of the process in a background thread while in a ``with`` block.
+
+        ``growth_mb`` is the peak of the samples above the resident memory at the start of
+        the block. Where the current resident memory cannot be read, it falls back to the
+        growth of the process high-water mark, which is 0 when an earlier peak was higher.
+
+        Parameters:
+        interval (float): Seconds between samples.
+        """
+        self.interval = interval
+        self.growth_mb = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self._peak = max(self._peak, current_rss_mb())
+
+    def __enter__(self):
+        self._start = current_rss_mb()
+        self._start_high_water = peak_rss_mb()
+        if self._start is not None:
+            self._peak = self._start
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._thread is None:
+            self.growth_mb = peak_rss_mb() - self._start_high_water
+            return
+        self._stop.set()
+        self._thread.join()
+        self._peak = max(self._peak, current_rss_mb())
+        self.growth_mb = self._peak - self._start
+
+
+def _shape(value):
+    """Rows and columns of a DataFrame, Series or array, None for anything else."""
+    if len(getattr(value, 'shape', ())) == 2:
+        return tuple(int(n) for n in value.shape)
+    if isinstance(value, pd.Series):
+        return int(len(value)), 1
+    return None
+
+
+class Recorder:
+    def __init__(self):
+        """Collect instrumentation records while enabled; every method runs untouched otherwise."""
+        self.enabled = False
+        self.records = []
+        self.log_path = None
+        self.profile_dir = None
+        self.trace_memory = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profile_count = 0
+
+    def enable(self, log_path=None, profile_dir=None, trace_memory=False):
+        """
+        Start recording.
+
+        Parameters:
+        log_path (str): JSON-lines file the records are appended to. Records are only kept
+            in ``records`` when None.
+        profile_dir (str): Directory receiving a cProfile ``.prof`` file per outermost call.
+        trace_memory (bool): Track Python allocations with tracemalloc ('peak_traced_mb').
+            Slows the instrumented code down noticeably.
+        """
+        self.log_path = log_path
+        self.profile_dir = profile_dir
+        self.trace_memory = trace_memory
+        if log_path is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+        if profile_dir is not None:
+            os.makedirs(profile_dir, exist_ok=True)
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.enabled = True
+
+    def disable(self):
+        """Stop recording, and stop tracemalloc if it was started by ``enable``."""
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.enabled = False
+        self.trace_memory = False
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def start(self, name, instance):
+        """Open a measurement; returns the frame to pass to ``stop``."""
+        stack = self._stack()
+        frame = {'event': name, 'depth': len(stack), 'shape_in': _shape(getattr(instance, 'data', None)),
+                 'memory': RSSSampler().__enter__(), 'child_peak': 0, 'profiler': None}
+        if self.trace_memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1]['child_peak'] = max(stack[-1]['child_peak'], peak)
+            tracemalloc.reset_peak()
+            frame['traced_start'] = current
+        if self.profile_dir is not None and not stack:
+            frame['profiler'] = cProfile.Profile()
+            frame['profiler'].enable()
+        stack.append(frame)
+        frame['wall'], frame['cpu'] = time.perf_counter(), time.process_time()
+        return frame
+
+    def stop(self, frame, instance, result=None, shape_out=None, error=None):
+        """Close a measurement and emit its record."""
+        wall, cpu = time.perf_counter() - frame['wall'], time.process_time() - frame['cpu']
+        stack = self._stack()
+        # Generators are measured until exhausted, so their frame is not always on top
+        stack.remove(frame)
+        if frame['profiler'] is not None:
+            frame['profiler'].disable()
+        frame['memory'].__exit__(None, None, None)
+        shape_out = shape_out or _shape(result) or _shape(getattr(instance, 'data', None))
+        record = {
+            'event': frame['event'], 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'depth': frame['depth'],
+            'wall_seconds': wall, 'cpu_seconds': cpu, 'peak_rss_mb': peak_rss_mb(),
+            'rss_growth_mb': frame['memory'].growth_mb,
+            'rows_in': frame['shape_in'][0] if frame['shape_in'] else None,
+            'columns_in': frame['shape_in'][1] if frame['shape_in'] else None,
+            'rows_out': shape_out[0] if shape_out else None,
+            'columns_out': shape_out[1] if shape_out else None,
+        }
+        if 'traced_start' in frame and tracemalloc.is_tracing():
+            peak = max(frame['child_peak'], tracemalloc.get_traced_memory()[1])
+            record['peak_traced_mb'] = (peak - frame['traced_start']) / 2 ** 20
+            if stack:
+                stack[-1]['child_peak'] = max(stack[-1]['child_peak'], peak)
+        if error is not None:
+            record['error'] = repr(error)
+        with self._lock:
+            if frame['profiler'] is not None:
+                self._profile_count += 1
+                record['profile'] = os.path.join(self.profile_dir, f"{frame['event']}-{self._profile_count}.prof")
+                frame['profiler'].dump_stats(record['profile'])
+            self.records.append(record)
+            if self.log_path is not None:
+                with open(self.log_path, 'a') as f:
+                    f.write(json.dumps(record) + '\n')
+        return record
+
+
+RECORDER = Recorder()
+enable = RECORDER.enable
+disable = RECORDER.disable
+
+
+def _instrument_function(name, func):
+    """Wrap one method so that its calls are measured while the recorder is enabled."""
+    if inspect.isgeneratorfunction(func):
+        @functools.wraps(func)
+        def generator_wrapper(*args, **kwargs):
+            if not RECORDER.enabled:
+                yield from func(*args, **kwargs)
+                return
+            instance = args[0] if args else None
+            frame = RECORDER.start(name, instance)
+            rows, columns, error = 0, None, None
+            try:
+                for item in func(*args, **kwargs):
+                    shape = _shape(item)
+                    if shape:
+                        rows, columns = rows + shape[0], shape[1]
+                    yield item
+            except GeneratorExit:
+                raise
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                RECORDER.stop(frame, instance, shape_out=(rows, columns) if columns is not None else None,
+                              error=error)
+        return generator_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not RECORDER.enabled:
+            return func(*args, **kwargs)
+        instance = args[0] if args else None
+        frame = RECORDER.start(name, instance)
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            RECORDER.stop(frame, instance, error=e)
+            raise
+        RECORDER.stop(frame, instance, result=result)
+        return result
+    return wrapper
+
+
+def instrumented(cls):
+    """
+    Class decorator measuring every public method (and classmethod) of the class.
+
+    Each call records the wall time, CPU time, the process' peak RSS and the growth of
+    its resident memory during the call (see ``RSSSampler``), the
+    rows and columns of ``self.data`` (or of the returned DataFrame) before and after,
+    and, with ``trace_memory``, the peak of Python allocations during the call. Nothing
+    is measured until ``enable`` is called or ``INSTRUMENTATION_LOG`` is set.
+    """
+    for attribute, value in list(vars(cls).items()):
+        if attribute.startswith('_'):
+            continue
+        name = f"{cls.__name__}.{attribute}"
+        if isinstance(value, classmethod):
+            setattr(cls, attribute, classmethod(_instrument_function(name, value.__func__)))
+        elif isinstance(value, staticmethod):
+            setattr(cls, attribute, staticmethod(_instrument_function(name, value.__func__)))
+        elif inspect.isfunction(value):
+            setattr(cls, attribute, _instrument_function(name, value))
+    return cls
+
+
+if os.environ.get(ENV_VARIABLE):
+    enable(os.environ[ENV_VARIABLE])
@@ -0,0 +1,173 @@
+# model_artifacts.py
+
+import json
+import os
+import platform
+import re
+import time
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from xgboost import XGBRegressor
+from feature_encoding import value_kind
+
+ARTIFACT_FORMAT_VERSION = 1
+LATEST_FILE = 'LATEST'
+
+
+def _slug(name):
+    """File-name friendly form of a model name."""
+    return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
+
+
+def save_artifacts(encoder, models, directory, version=None, metrics=None):
+    """
+    Save a fitted encoder and models as a versioned artifact directory.
+
+    The encoder and scikit-learn models are stored with joblib, XGBoost models in
+    XGBoost's native UBJSON format, and a ``manifest.json`` records the input schema
+    (the input columns and the kind of their values at training), the feature names
+    and the files of every model. ``<directory>/LATEST`` is updated
+    to point at the new version.
+
+    Parameters:
+    encoder (FeatureEncoder): The fitted encoder.
+    models (dict): Model name to fitted model.
+    directory (str): Root directory of the artifact versions.
+    version (str): Version name. A timestamp is used when None.
+    metrics (dict): Optional evaluation metrics to record in the manifest.
+
+    Returns:
+    str: The path of the saved version.
+
+    Raises:
+    ValueError: If the encoder uses features computed from the targets, which new policies do not have.
+    """
+    if getattr(encoder, 'target_features', False):
+        raise ValueError("The encoder uses features computed from the targets; "
+                         "prepare the data with target_features=False to save models for scoring.")
+    version = version or time.strftime('%Y%m%d-%H%M%S')
+    path = os.path.join(directory, version)
+    os.makedirs(path, exist_ok=True)
+    joblib.dump(encoder, os.path.join(path, 'encoder.joblib'))
+
+    model_entries = {}
+    for name, model in models.items():
+        if isinstance(model, XGBRegressor):
+            file_name = f"{_slug(name)}.ubj"
+            model.save_model(os.path.join(path, file_name))
+            kind = 'xgboost'
+        else:
+            file_name = f"{_slug(name)}.joblib"
+            joblib.dump(model, os.path.join(path, file_name))
+            kind = 'joblib'
+        model_entries[name] = {'file': file_name, 'format': kind, 'class': type(model).__name__}
+
+    manifest = {
+        'format_version': ARTIFACT_FORMAT_VERSION,
+        'version': version,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'input_columns': encoder.input_columns_,
+        'input_dtypes': {column: encoder.input_dtypes_[column] for column in encoder.input_columns_},
+        'feature_names': encoder.feature_names_,
+        'dtype': np.dtype(encoder.dtype).name,
+        'models': model_entries,
+        'metrics': metrics or {},
+        'library_versions': {'python': platform.python_version(), 'numpy': np.__version__,
+                             'pandas': pd.__version__, 'scikit-learn': sklearn.__version__},
+    }
+    with open(os.path.join(path, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2, default=float)
+    with open(os.path.join(directory, LATEST_FILE), 'w') as f:
+        f.write(version)
+    return path
+
+
+class PremiumScorer:
+    def __init__(self, encoder, models, manifest):
+        """
+        Initialize a scoring object from a fitted encoder and models.
+
+        Parameters:
+        encoder (FeatureEncoder): The fitted encoder.
+        models (dict): Model name to fitted model.
+        manifest (dict): The manifest the artifacts were saved with.
+        """
+        self.encoder = encoder
+        self.models = models
+        self.manifest = manifest
+
+    def transform(self, data):
+        """
+        Encode new policies with the fitted transforms.
+
+        Numeric features may be read as text, since they are parsed as numbers, but a
+        categorical feature must hold the same kind of values as at training: codes read
+        as integers do not match categories learned as text. A column without any values,
+        as a chunk of a file may have, matches every kind.
+
+        Raises:
+        ValueError: If columns of the input schema are missing or hold the wrong kind of values.
+        """
+        missing = [column for column in self.manifest['input_columns'] if column not in data.columns]
+        if missing:
+            raise ValueError(f"Missing input columns: {missing}")
+        categorical = set(self.encoder.categories_)
+        mismatched = {}
+        for column, expected in self.manifest.get('input_dtypes', {}).items():
+            if data[column].isna().all():
+                continue
+            kind = value_kind(data[column])
+            if kind != expected and not (column not in categorical and {kind, expected} == {'numeric', 'text'}):
+                mismatched[column] = f"{kind} instead of {expected}"
+        if mismatched:
+            raise ValueError(f"Input columns with the wrong kind of values: {mismatched}")
+        return self.encoder.transform(data)
+
+    def predict(self, data, model=None):
+        """
+        Predict premiums for new policies.
+
+        Parameters:
+        data (pd.DataFrame): Policies with the input columns of the manifest.
+        model (str): Name of the model to use. Defaults to the first saved model.
+
+        Returns:
+        np.ndarray: The predictions.
+        """
+        model = model or next(iter(self.models))
+        return self.models[model].predict(self.transform(data))
+
+
+def load_artifacts(directory, version=None):
+    """
+    Rebuild a ``PremiumScorer`` from saved artifacts.
+
+    Parameters:
+    directory (str): Root directory of the artifact versions.
+    version (str): Version to load. The version in ``LATEST`` is loaded when None.
+
+    Returns:
+    PremiumScorer: The scoring object.
+    """
+    if version is None:
+        with open(os.path.join(directory, LATEST_FILE)) as f:
+            version = f.read().strip()
+    path = os.path.join(directory, version)
+    with open(os.path.join(path, 'manifest.json')) as f:
+        manifest = json.load(f)
+    if manifest['format_version'] != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format version: {manifest['format_version']}")
+
+    encoder = joblib.load(os.path.join(path, 'encoder.joblib'))
+    models = {}
+    for name, entry in manifest['models'].items():
+        file_path = os.path.join(path, entry['file'])
+        if entry['format'] == 'xgboost':
+            model = XGBRegressor()
+            model.load_model(file_path)
+        else:
+            model = joblib.load(file_path)
+        models[name] = model
+    return PremiumScorer(encoder, models, manifest)
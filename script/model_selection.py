@@ -0,0 +1,262 @@
+# model_selection.py
+
+import hashlib
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import KFold, ParameterGrid
+from feature_encoding import FeatureEncoder, target_values
+from training import candidate_models
+
+
+def data_fingerprint(data):
+    """Content hash of a DataFrame that depends on the row order, used to tell whether cached folds are stale."""
+    row_hashes = pd.util.hash_pandas_object(data, index=False).to_numpy()
+    return hashlib.sha256(row_hashes.tobytes()).hexdigest()[:16]
+
+
+class FoldCache:
+    def __init__(self, directory, n_splits=5, random_state=42):
+        """
+        Initialize an on-disk cache of the encoded matrices of every cross-validation fold.
+
+        Each fold's encoder is fitted on its training rows only, and the encoded training
+        and validation matrices are saved once as .npy files. Search workers open them
+        memory-mapped, so candidates share the encoding work and the page cache.
+
+        Parameters:
+        directory (str): Directory of the cached folds.
+        n_splits (int): Number of folds.
+        random_state (int): Seed of the fold assignment and of the row order used for subsampling.
+        """
+        self.directory = directory
+        self.n_splits = n_splits
+        self.random_state = random_state
+        self.meta_path = os.path.join(directory, 'folds.json')
+
+    def build(self, data, target='TotalPremium', encoder_params=None):
+        """
+        Encode and save every fold, unless folds of the same data and settings are cached.
+
+        Parameters:
+        data (pd.DataFrame): The cleaned data.
+        target (str): The target column.
+        encoder_params (dict): Keyword arguments of the ``FeatureEncoder``.
+
+        Returns:
+        FoldCache: The cache itself.
+        """
+        meta = {'fingerprint': data_fingerprint(data), 'rows': len(data), 'n_splits': self.n_splits,
+                'random_state': self.random_state, 'target': target, 'encoder_params': encoder_params or {}}
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path) as f:
+                if json.load(f) == meta:
+                    return self
+
+        os.makedirs(self.directory, exist_ok=True)
+        y = target_values(data, target).to_numpy()
+        rng = np.random.default_rng(self.random_state)
+        folds = KFold(n_splits=self.n_splits, shuffle=True, random_state=self.random_state)
+        for fold, (train_rows, valid_rows) in enumerate(folds.split(np.empty((len(data), 1)))):
+            # Shuffle the training rows once so every sample fraction is a prefix of the file
+            train_rows = rng.permutation(train_rows)
+            encoder = FeatureEncoder(**(encoder_params or {}))
+            X_train = encoder.fit_transform(data.iloc[train_rows])
+            arrays = {'X_train': X_train.to_numpy(), 'y_train': y[train_rows],
+                      'X_valid': encoder.transform(data.iloc[valid_rows]).to_numpy(), 'y_valid': y[valid_rows]}
+            for name, array in arrays.items():
+                np.save(self._path(fold, name), array)
+            with open(self._path(fold, 'features', '.json'), 'w') as f:
+                json.dump(encoder.feature_names_, f)
+        with open(self.meta_path, 'w') as f:
+            json.dump(meta, f)
+        return self
+
+    def fingerprint(self):
+        """
+        Identify the cached folds by the data and settings they were built from.
+
+        Returns:
+        str: A digest of the cache's metadata, or None if no folds are cached.
+        """
+        if not os.path.exists(self.meta_path):
+            return None
+        with open(self.meta_path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()[:16]
+
+    def load(self, fold, fraction=1.0):
+        """
+        Open the cached matrices of a fold.
+
+        Parameters:
+        fold (int): Index of the fold.
+        fraction (float): Share of the training rows to use.
+
+        Returns:
+        tuple: X_train, y_train, X_valid and y_valid, the matrices as DataFrames.
+        """
+        with open(self._path(fold, 'features', '.json')) as f:
+            columns = json.load(f)
+        arrays = {name: np.load(self._path(fold, name), mmap_mode='r')
+                  for name in ('X_train', 'y_train', 'X_valid', 'y_valid')}
+        n_train = max(1, int(math.ceil(len(arrays['y_train']) * fraction)))
+        X_train = pd.DataFrame(arrays['X_train'][:n_train], columns=columns, copy=False)
+        X_valid = pd.DataFrame(arrays['X_valid'], columns=columns, copy=False)
+        return X_train, arrays['y_train'][:n_train], X_valid, arrays['y_valid']
+
+    def _path(self, fold, name, extension='.npy'):
+        return os.path.join(self.directory, f"fold{fold}_{name}{extension}")
+
+
+def _run_trial(task):
+    """Fit one candidate on one fold at one sample fraction and score it on the fold's validation rows."""
+    directory, n_splits, folds, model, params, fold, fraction = task
+    X_train, y_train, X_valid, y_valid = FoldCache(directory, n_splits).load(fold, fraction)
+    estimator = candidate_models(n_jobs=1)[model].set_params(**params)
+    start = time.perf_counter()
+    estimator.fit(X_train, y_train)
+    y_pred = estimator.predict(X_valid)
+    return {'folds': folds, 'model': model, 'params': params, 'fold': fold, 'fraction': fraction, 'rows': len(y_train),
+            'RMSE': float(np.sqrt(mean_squared_error(y_valid, y_pred))),
+            'MAE': float(mean_absolute_error(y_valid, y_pred)), 'R2': float(r2_score(y_valid, y_pred)),
+            'seconds': time.perf_counter() - start}
+
+
+def _trial_key(folds, model, params, fold, fraction):
+    return (folds, model, json.dumps(params, sort_keys=True), fold, round(fraction, 10))
+
+
+def halving_fractions(min_fraction, factor):
+    """The sample fractions of the successive-halving rungs, ending at 1."""
+    fractions = [1.0]
+    while fractions[0] / factor >= min_fraction:
+        fractions.insert(0, fractions[0] / factor)
+    return fractions
+
+
+class HyperparameterSearch:
+    def __init__(self, fold_cache, model, param_grid, results_path, factor=3, min_fraction=1.0,
+                 scoring='RMSE', n_jobs=None):
+        """
+        Initialize a cross-validated hyperparameter search with successive halving.
+
+        Every candidate of the grid is scored on all folds using a ``min_fraction`` share
+        of the training rows; the best ``1 / factor`` of the candidates move on to a
+        ``factor`` times larger share, until the survivors are scored on full folds. Each
+        finished (candidate, fold, fraction) trial is appended to ``results_path`` as a JSON
+        line, and trials already in the file are not run again, so an interrupted search
+        resumes where it stopped.
+
+        Parameters:
+        fold_cache (FoldCache): The built fold cache.
+        model (str): Name of the model in ``training.candidate_models``.
+        param_grid (dict or list): Grid of parameters, as for scikit-learn's ``ParameterGrid``.
+        results_path (str): Path of the JSON-lines trial log.
+        factor (int): Share of candidates kept per rung is ``1 / factor``.
+        min_fraction (float): Sample fraction of the first rung. 1.0 disables halving.
+        scoring (str): 'RMSE', 'MAE' (lower is better) or 'R2' (higher is better).
+        n_jobs (int): Number of worker processes. 1 runs in the current process and None
+            uses every CPU.
+        """
+        self.fold_cache = fold_cache
+        self.folds = fold_cache.fingerprint()
+        self.model = model
+        self.candidates = list(ParameterGrid(param_grid))
+        self.results_path = results_path
+        self.factor = factor
+        self.min_fraction = min_fraction
+        self.scoring = scoring
+        self.n_jobs = n_jobs or os.cpu_count()
+
+    def completed_trials(self):
+        """
+        Return the trials logged in ``results_path``, keyed by (folds, model, params, fold, fraction).
+
+        'folds' is the ``FoldCache.fingerprint`` the trial was scored on, so trials of other
+        data or split settings logged in the same file are never reused.
+
+        A last line cut short by an interrupted run is ignored; its trial is run again.
+        """
+        trials = {}
+        if os.path.exists(self.results_path):
+            with open(self.results_path) as f:
+                lines = [line for line in f if line.strip()]
+            for i, line in enumerate(lines):
+                try:
+                    trial = json.loads(line)
+                except json.JSONDecodeError:
+                    if i < len(lines) - 1:
+                        raise
+                    continue
+                trials[_trial_key(trial.get('folds'), trial['model'], trial['params'], trial['fold'],
+                                  trial['fraction'])] = trial
+        return trials
+
+    def run(self):
+        """
+        Run the search, resuming from the logged trials.
+
+        Returns:
+        pd.DataFrame: The mean validation scores of every candidate at every rung it reached,
+        best candidates of the last rung first.
+        """
+        self.folds = self.fold_cache.fingerprint()
+        trials = self.completed_trials()
+        survivors = list(self.candidates)
+        summaries = []
+        fractions = halving_fractions(self.min_fraction, self.factor)
+        for rung, fraction in enumerate(fractions):
+            tasks = [(self.fold_cache.directory, self.fold_cache.n_splits, self.folds, self.model, params, fold,
+                      fraction)
+                     for params in survivors for fold in range(self.fold_cache.n_splits)
+                     if _trial_key(self.folds, self.model, params, fold, fraction) not in trials]
+            for trial in self._execute(tasks):
+                trials[_trial_key(trial.get('folds'), trial['model'], trial['params'], trial['fold'],
+                                  trial['fraction'])] = trial
+
+            scores = []
+            for params in survivors:
+                folds = [trials[_trial_key(self.folds, self.model, params, fold, fraction)]
+                         for fold in range(self.fold_cache.n_splits)]
+                scores.append({'rung': rung, 'fraction': fraction, 'params': params,
+                               **{metric: np.mean([trial[metric] for trial in folds])
+                                  for metric in ('RMSE', 'MAE', 'R2', 'seconds')}})
+            scores = pd.DataFrame(scores).sort_values(self.scoring, ascending=self.scoring != 'R2', kind='stable')
+            summaries.append(scores)
+            if rung < len(fractions) - 1:
+                survivors = list(scores['params'].iloc[:max(1, len(survivors) // self.factor)])
+        return pd.concat(summaries[::-1], ignore_index=True)
+
+    def _execute(self, tasks):
+        """
+        Run trials, appending each one to the log as soon as it finishes.
+
+        Every trial is flushed and synced to disk before the next one is logged, and a
+        partial last line left by an interrupted run is cut off first, so that an
+        interruption loses at most the trial being written.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.results_path)), exist_ok=True)
+        with open(self.results_path, 'a+b') as log:
+            log.seek(0)
+            content = log.read()
+            if content and not content.endswith(b'\n'):
+                log.truncate(content.rfind(b'\n') + 1)
+
+            def write(trial):
+                log.write((json.dumps(trial) + '\n').encode())
+                log.flush()
+                os.fsync(log.fileno())
+                return trial
+
+            if self.n_jobs == 1:
+                for task in tasks:
+                    yield write(_run_trial(task))
+            else:
+                with ProcessPoolExecutor(max_workers=self.n_jobs) as executor:
+                    for future in as_completed([executor.submit(_run_trial, task) for task in tasks]):
+                        yield write(future.result())
@@ -0,0 +1,204 @@
+# out_of_core.py
+
+import os
+import time
+import numpy as np
+import xgboost as xgb
+from sklearn.linear_model import SGDRegressor
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from feature_encoding import FeatureEncoder, target_values
+from instrumentation import RSSSampler, peak_rss_mb
+from score_policies import iter_policy_chunks
+
+DEFAULT_CHUNKSIZE = 200_000
+
+
+def file_chunks(file_path, chunksize=DEFAULT_CHUNKSIZE, delimiter=',', columns=None):
+    """
+    Return a re-iterable source of chunks of a cleaned dataset (delimited text or Parquet).
+
+    Returns:
+    callable: A function returning a fresh iterator of DataFrames at every call.
+    """
+    return lambda: iter_policy_chunks(file_path, chunksize=chunksize, delimiter=delimiter, columns=columns)
+
+
+def split_chunk(chunk, chunk_index, holdout_fraction=0.3, seed=42):
+    """
+    Split a chunk into training and holdout rows.
+
+    The split depends only on the seed and the chunk's position, so every pass over the
+    source puts the same rows in the holdout.
+
+    Returns:
+    tuple: The training rows and the holdout rows.
+    """
+    holdout = np.random.default_rng([seed, chunk_index]).random(len(chunk)) < holdout_fraction
+    return chunk[~holdout], chunk[holdout]
+
+
+def _training_chunks(source, holdout_fraction, seed):
+    for i, chunk in enumerate(source()):
+        train, _ = split_chunk(chunk, i, holdout_fraction, seed)
+        if len(train):
+            yield train
+
+
+def fit_encoder(source, encoder=None):
+    """Fit a ``FeatureEncoder`` chunk by chunk over a source."""
+    encoder = encoder or FeatureEncoder()
+    for chunk in source():
+        encoder.partial_fit(chunk)
+    return encoder
+
+
+class EncodedChunkIter(xgb.DataIter):
+    def __init__(self, source, encoder, target='TotalPremium', holdout_fraction=0.3, seed=42, cache_prefix=None):
+        """
+        Feed encoded training chunks to XGBoost's external-memory DMatrix.
+
+        Parameters:
+        source (callable): Returns a fresh iterator of raw chunks.
+        encoder (FeatureEncoder): The fitted encoder.
+        target (str): The target column.
+        holdout_fraction (float): Share of the rows held out for evaluation.
+        seed (int): Seed of the holdout split.
+        cache_prefix (str): Path prefix of XGBoost's on-disk page cache.
+        """
+        self.source = source
+        self.encoder = encoder
+        self.target = target
+        self.holdout_fraction = holdout_fraction
+        self.seed = seed
+        self._chunks = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        if self._chunks is None:
+            self._chunks = _training_chunks(self.source, self.holdout_fraction, self.seed)
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            return False
+        input_data(data=self.encoder.transform(chunk), label=target_values(chunk, self.target).to_numpy())
+        return True
+
+    def reset(self):
+        self._chunks = None
+
+
+def train_xgboost(source, encoder, cache_dir, target='TotalPremium', holdout_fraction=0.3, seed=42,
+                  num_boost_round=100, params=None):
+    """
+    Train XGBoost on a chunked source with external memory.
+
+    Only one encoded chunk is in memory at a time; XGBoost keeps its quantized pages in
+    ``cache_dir``.
+
+    Returns:
+    XGBRegressor: The trained model, usable like an in-memory one.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    data_iter = EncodedChunkIter(source, encoder, target, holdout_fraction, seed,
+                                 cache_prefix=os.path.join(cache_dir, 'xgb'))
+    dtrain = xgb.ExtMemQuantileDMatrix(data_iter)
+    params = {'objective': 'reg:squarederror', 'tree_method': 'hist', 'seed': 42, **(params or {})}
+    booster = xgb.train(params, dtrain, num_boost_round=num_boost_round)
+    model = xgb.XGBRegressor()
+    model.load_model(bytearray(booster.save_raw('ubj')))
+    return model
+
+
+def train_sgd(source, encoder, target='TotalPremium', holdout_fraction=0.3, seed=42, epochs=5, sgd_params=None):
+    """
+    Train a standardized linear model with stochastic gradient descent, chunk by chunk.
+
+    A first pass fits the scaler, then ``epochs`` passes update the regressor with ``partial_fit``.
+
+    Returns:
+    Pipeline: The scaler and the regressor.
+    """
+    scaler = StandardScaler()
+    for chunk in _training_chunks(source, holdout_fraction, seed):
+        scaler.partial_fit(encoder.transform(chunk))
+    regressor = SGDRegressor(random_state=42, **(sgd_params or {}))
+    for _ in range(epochs):
+        for chunk in _training_chunks(source, holdout_fraction, seed):
+            X = scaler.transform(encoder.transform(chunk))
+            regressor.partial_fit(X, target_values(chunk, target).to_numpy())
+    return make_pipeline(scaler, regressor)
+
+
+def evaluate_holdout(models, source, encoder, target='TotalPremium', holdout_fraction=0.3, seed=42):
+    """
+    Compute MSE, MAE and R2 of every model on the holdout rows, accumulated chunk by chunk.
+
+    The variance of the target is merged from the centered sums of squares of the chunks
+    (Chan et al.), so R2 stays accurate when the target is large relative to its spread.
+
+    Returns:
+    dict: Model name to metrics, in the layout of ``StatisticalModeling.results``.
+
+    Raises:
+    ValueError: If the source has no holdout rows.
+    """
+    totals = {name: np.zeros(2) for name in models}
+    n, y_mean, y_m2 = 0, 0.0, 0.0
+    for i, chunk in enumerate(source()):
+        _, holdout = split_chunk(chunk, i, holdout_fraction, seed)
+        if not len(holdout):
+            continue
+        X = encoder.transform(holdout)
+        y = target_values(holdout, target).to_numpy()
+        chunk_mean = y.mean()
+        delta, total = chunk_mean - y_mean, n + len(y)
+        y_m2 += ((y - chunk_mean) ** 2).sum() + delta ** 2 * n * len(y) / total
+        y_mean += delta * len(y) / total
+        n = total
+        for name, model in models.items():
+            error = y - model.predict(X)
+            totals[name] += [(error ** 2).sum(), np.abs(error).sum()]
+    if not n:
+        raise ValueError("The source has no holdout rows to evaluate the models on.")
+    return {name: {'MSE': sq / n, 'MAE': absolute / n, 'R2': 1 - sq / y_m2}
+            for name, (sq, absolute) in totals.items()}
+
+
+def train_out_of_core(source, cache_dir, target='TotalPremium', holdout_fraction=0.3, seed=42,
+                      num_boost_round=100, xgb_params=None, sgd_epochs=5):
+    """
+    Fit the encoder, the external-memory XGBoost model and the SGD linear model on a chunked source.
+
+    Parameters:
+    source (callable): Returns a fresh iterator of cleaned chunks, e.g. ``file_chunks(path)``.
+    cache_dir (str): Directory of XGBoost's page cache.
+    target (str): The target column.
+    holdout_fraction (float): Share of the rows held out for evaluation.
+    seed (int): Seed of the holdout split.
+    num_boost_round (int): Number of boosting rounds.
+    xgb_params (dict): Extra XGBoost training parameters.
+    sgd_epochs (int): Number of passes of the SGD regressor.
+
+    Returns:
+    tuple: The encoder, the models and the wall time, CPU time and memory of each step
+    (see ``training.fit_and_measure``).
+    """
+    report = {}
+
+    def timed(name, train):
+        wall, cpu = time.perf_counter(), time.process_time()
+        with RSSSampler() as memory:
+            result = train()
+        report[name] = {'wall_seconds': time.perf_counter() - wall, 'cpu_seconds': time.process_time() - cpu,
+                        'fit_rss_mb': memory.growth_mb, 'peak_rss_mb': peak_rss_mb()}
+        return result
+
+    encoder = timed('Encoder', lambda: fit_encoder(source))
+    models = {
+        'SGD Linear Regression': timed('SGD Linear Regression', lambda: train_sgd(
+            source, encoder, target, holdout_fraction, seed, epochs=sgd_epochs)),
+        'XGBoost': timed('XGBoost', lambda: train_xgboost(
+            source, encoder, cache_dir, target, holdout_fraction, seed, num_boost_round=num_boost_round,
+            params=xgb_params)),
+    }
+    return encoder, models, report
@@ -0,0 +1,231 @@
+# outlier_stats.py
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_QUANTILES = (0.01, 0.25, 0.5, 0.75, 0.95, 0.99, 0.9972)
+RANGE_QUANTILES = (0.01, 0.99)
+
+
+class QuantileSketch:
+    def __init__(self, max_centroids=1000):
+        """
+        Initialize a mergeable, fixed-size sketch of a numeric distribution.
+
+        The sketch keeps at most ``max_centroids`` bins, each with the smallest value,
+        the largest value and the number of values it covers. Bins are sized on the
+        t-digest arcsine scale, so they are narrow in the tails where the outlier
+        quantiles live. Sketches built on separate chunks can be merged.
+
+        Parameters:
+        max_centroids (int): Maximum number of bins kept after compression.
+        """
+        self.max_centroids = max_centroids
+        self.lows = np.empty(0)
+        self.highs = np.empty(0)
+        self.weights = np.empty(0)
+
+    @property
+    def count(self):
+        """Number of values added to the sketch."""
+        return self.weights.sum()
+
+    def update(self, values):
+        """Add an array of values to the sketch. NaN values are ignored."""
+        values = np.asarray(values, dtype=float)
+        values, counts = np.unique(values[~np.isnan(values)], return_counts=True)
+        self._add(values, values, counts.astype(float))
+        return self
+
+    def merge(self, other):
+        """Merge another sketch into this one."""
+        self._add(other.lows, other.highs, other.weights)
+        return self
+
+    def _add(self, lows, highs, weights):
+        lows = np.concatenate([self.lows, lows])
+        highs = np.concatenate([self.highs, highs])
+        weights = np.concatenate([self.weights, weights])
+        order = np.argsort(lows + highs, kind='stable')
+        self.lows, self.highs, self.weights = lows[order], highs[order], weights[order]
+        if len(self.weights) > self.max_centroids:
+            self._compress()
+
+    def _compress(self):
+        cumulative = np.cumsum(self.weights)
+        q = (cumulative - self.weights / 2) / cumulative[-1]
+        scale = np.arcsin(np.clip(2 * q - 1, -1, 1)) / np.pi + 0.5
+        bins = np.minimum((scale * self.max_centroids).astype(np.int64), self.max_centroids - 1)
+        starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+        self.lows = np.minimum.reduceat(self.lows, starts)
+        self.highs = np.maximum.reduceat(self.highs, starts)
+        self.weights = np.add.reduceat(self.weights, starts)
+
+    def quantile(self, q):
+        """
+        Estimate quantiles, interpolating linearly inside the bin holding each rank.
+
+        Parameters:
+        q (float or array-like): Quantiles in [0, 1].
+
+        Returns:
+        np.ndarray: The estimated values.
+        """
+        q = np.atleast_1d(np.asarray(q, dtype=float))
+        if not len(self.weights):
+            return np.full(q.shape, np.nan)
+        ends = np.cumsum(self.weights)
+        starts = ends - self.weights
+        rank = q * (ends[-1] - 1)
+        index = np.minimum(np.searchsorted(ends, rank, side='right'), len(ends) - 1)
+        span = np.maximum(self.weights[index] - 1, 1)
+        fraction = np.clip((rank - starts[index]) / span, 0, 1)
+        return self.lows[index] + fraction * (self.highs[index] - self.lows[index])
+
+    def count_below(self, x):
+        """Estimate the number of values strictly below ``x``."""
+        width = self.highs - self.lows
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fraction = np.where(width > 0, (x - self.lows) / width, (self.lows < x).astype(float))
+        return float(np.sum(self.weights * np.clip(fraction, 0, 1)))
+
+    def count_above(self, x):
+        """Estimate the number of values strictly above ``x``."""
+        width = self.highs - self.lows
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fraction = np.where(width > 0, (self.highs - x) / width, (self.highs > x).astype(float))
+        return float(np.sum(self.weights * np.clip(fraction, 0, 1)))
+
+
+class OutlierStatsAccumulator:
+    def __init__(self, columns, quantiles=DEFAULT_QUANTILES, range_quantiles=RANGE_QUANTILES,
+                 iqr_factor=1.5, max_centroids=1000):
+        """
+        Accumulate approximate outlier statistics over a stream of DataFrame chunks.
+
+        Moments, extremes and positive counts are exact; quantiles, IQR bounds and
+        outlier counts come from a ``QuantileSketch`` per column.
+
+        Parameters:
+        columns (list): Numeric columns to summarize.
+        quantiles (tuple): Quantiles to report.
+        range_quantiles (tuple): Lower and upper quantiles delimiting the kept range.
+        iqr_factor (float): Multiplier of the IQR used for the outlier bounds.
+        max_centroids (int): Size of each quantile sketch.
+        """
+        self.columns = list(columns)
+        self.quantiles = quantiles
+        self.range_quantiles = range_quantiles
+        self.iqr_factor = iqr_factor
+        self.sketches = {column: QuantileSketch(max_centroids) for column in self.columns}
+        self.moments = {column: np.zeros(6) for column in self.columns}
+
+    def update(self, chunk):
+        """Add a chunk of data to the statistics."""
+        for column in self.columns:
+            values = chunk[column].to_numpy(dtype=float)
+            values = values[~np.isnan(values)]
+            self.sketches[column].update(values)
+            if len(values):
+                self.moments[column] = _merge_moments(self.moments[column], _moments(values))
+        return self
+
+    def result(self):
+        """
+        Return the accumulated statistics in the same layout as ``outlier_statistics``.
+
+        The union of rows outside the quantile range needs the full rows and is
+        reported as None.
+        """
+        rows = {}
+        for column in self.columns:
+            sketch = self.sketches[column]
+            count, mean, m2, minimum, maximum, positive = self.moments[column]
+            values = sketch.quantile(_all_quantiles(self.quantiles, self.range_quantiles))
+            rows[column] = _summarize(
+                count, mean, np.sqrt(m2 / (count - 1)) if count > 1 else np.nan, minimum, maximum,
+                positive, values, self.quantiles, self.range_quantiles, self.iqr_factor,
+                lambda bound: sketch.count_below(bound), lambda bound: sketch.count_above(bound))
+        return {'columns': pd.DataFrame.from_dict(rows, orient='index'), 'rows_outside_range': None}
+
+
+def outlier_statistics(data, columns, quantiles=DEFAULT_QUANTILES, range_quantiles=RANGE_QUANTILES,
+                       iqr_factor=1.5, approximate=False, max_centroids=1000):
+    """
+    Compute quantiles, IQR bounds and outlier counts for numeric columns.
+
+    Each column is converted to a NumPy array once; all quantiles come from a single
+    ``np.nanquantile`` call and the outlier counts from boolean masks, so no filtered
+    copies of the DataFrame are built.
+
+    Parameters:
+    data (pd.DataFrame): The data to summarize.
+    columns (list): Numeric columns to summarize.
+    quantiles (tuple): Quantiles to report.
+    range_quantiles (tuple): Lower and upper quantiles delimiting the kept range.
+    iqr_factor (float): Multiplier of the IQR used for the outlier bounds.
+    approximate (bool): Use a quantile sketch instead of exact quantiles.
+    max_centroids (int): Size of the quantile sketch in approximate mode.
+
+    Returns:
+    dict: 'columns' is a DataFrame indexed by column with the count, mean, std, min, max,
+    number of positive values, every quantile (``q<value>``), the IQR bounds, the IQR
+    outlier count and the count outside the quantile range; 'rows_outside_range' is the
+    number of rows outside the quantile range in any column (None in approximate mode).
+    """
+    if approximate:
+        accumulator = OutlierStatsAccumulator(columns, quantiles, range_quantiles, iqr_factor, max_centroids)
+        return accumulator.update(data).result()
+
+    rows = {}
+    outside_range = np.zeros(len(data), dtype=bool)
+    for column in columns:
+        values = data[column].to_numpy(dtype=float)
+        valid = values[~np.isnan(values)]
+        count = len(valid)
+        computed = np.quantile(valid, _all_quantiles(quantiles, range_quantiles)) if count else \
+            np.full(len(quantiles) + 4, np.nan)
+        rows[column] = _summarize(
+            count, valid.mean() if count else np.nan, valid.std(ddof=1) if count > 1 else np.nan,
+            valid.min() if count else np.nan, valid.max() if count else np.nan, np.count_nonzero(valid > 0),
+            computed, quantiles, range_quantiles, iqr_factor,
+            lambda bound: np.count_nonzero(valid < bound), lambda bound: np.count_nonzero(valid > bound))
+        outside_range |= (values < rows[column]['range_lower']) | (values > rows[column]['range_upper'])
+    return {'columns': pd.DataFrame.from_dict(rows, orient='index'),
+            'rows_outside_range': int(outside_range.sum())}
+
+
+def _all_quantiles(quantiles, range_quantiles):
+    """Requested quantiles followed by the range quantiles and the quartiles."""
+    return np.array(list(quantiles) + list(range_quantiles) + [0.25, 0.75])
+
+
+def _summarize(count, mean, std, minimum, maximum, positive, computed, quantiles, range_quantiles,
+               iqr_factor, count_below, count_above):
+    """Assemble the statistics of one column from its moments and computed quantiles."""
+    row = {'count': count, 'mean': mean, 'std': std, 'min': minimum, 'max': maximum, 'n_positive': positive}
+    row.update({f"q{q:g}": value for q, value in zip(quantiles, computed)})
+    range_lower, range_upper, q1, q3 = computed[len(quantiles):]
+    iqr = q3 - q1
+    row.update(range_lower=range_lower, range_upper=range_upper, iqr=iqr,
+               iqr_lower=q1 - iqr_factor * iqr, iqr_upper=q3 + iqr_factor * iqr)
+    row['n_outside_range'] = count_below(range_lower) + count_above(range_upper)
+    row['n_iqr_outliers'] = count_below(row['iqr_lower']) + count_above(row['iqr_upper'])
+    return row
+
+
+def _moments(values):
+    """Count, mean, sum of squared deviations, min, max and positive count of an array."""
+    mean = values.mean()
+    return np.array([len(values), mean, np.sum((values - mean) ** 2), values.min(), values.max(),
+                     np.count_nonzero(values > 0)])
+
+
+def _merge_moments(left, right):
+    """Combine two moment vectors with Chan's parallel update."""
+    if left[0] == 0:
+        return right
+    n = left[0] + right[0]
+    delta = right[1] - left[1]
+    return np.array([n, left[1] + delta * right[0] / n, left[2] + right[2] + delta ** 2 * left[0] * right[0] / n,
+                     min(left[3], right[3]), max(left[4], right[4]), left[5] + right[5]])
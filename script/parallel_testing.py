@@ -0,0 +1,153 @@
+# parallel_testing.py
+
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import scipy
+
+SUPPORTED_TESTS = ('student', 'welch', 'fisher', 'permutation')
+
+# Column arrays visible to the test functions, set in each worker by _attach_columns
+_COLUMNS = {}
+
+
+class MemmapColumns:
+    def __init__(self, arrays):
+        """
+        Write column arrays to memory-mapped .npy files in a temporary directory.
+
+        Worker processes open the files with ``mmap_mode='r'``, so they share the
+        operating system's page cache instead of each receiving a pickled copy.
+
+        Parameters:
+        arrays (dict): Column name to NumPy array.
+        """
+        self.directory = tempfile.mkdtemp(prefix='ab_columns_')
+        self.paths = {}
+        for i, (name, array) in enumerate(arrays.items()):
+            path = os.path.join(self.directory, f"column_{i}.npy")
+            np.save(path, array)
+            self.paths[name] = path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Delete the memory-mapped files."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def _attach_columns(paths):
+    """Open the memory-mapped column arrays in the current process."""
+    global _COLUMNS
+    _COLUMNS = {name: np.load(path, mmap_mode='r') for name, path in paths.items()}
+
+
+def _permutation_pvalue(a, b, n_permutations, rng, max_cells=10_000_000):
+    """Two-sided permutation p-value of the difference in means, in batches of permutations."""
+    pooled = np.concatenate([a, b])
+    batch_size = max(1, min(n_permutations, max_cells // len(pooled)))
+    observed = abs(a.mean() - b.mean())
+    total = pooled.sum()
+    exceed = 0
+    for start in range(0, n_permutations, batch_size):
+        size = min(batch_size, n_permutations - start)
+        permuted = rng.permuted(np.broadcast_to(pooled, (size, len(pooled))), axis=1)
+        sum_a = permuted[:, :len(a)].sum(axis=1)
+        diffs = np.abs(sum_a / len(a) - (total - sum_a) / len(b))
+        exceed += np.count_nonzero(diffs >= observed - 1e-12 * max(observed, 1))
+    return (exceed + 1) / (n_permutations + 1)
+
+
+def _run_test(task):
+    """Run one test on the attached column arrays and return its statistic and p-value."""
+    test, segment, code_a, code_b, metric, seed, n_permutations = task
+    codes = _COLUMNS[segment]
+    values = _COLUMNS[metric]
+    a = values[codes == code_a]
+    b = values[codes == code_b]
+    a = a[~np.isnan(a)]
+    b = b[~np.isnan(b)]
+    if test == 'fisher':
+        table = [[np.count_nonzero(a > 0), np.count_nonzero(a <= 0)],
+                 [np.count_nonzero(b > 0), np.count_nonzero(b <= 0)]]
+        statistic, p_value = scipy.stats.fisher_exact(table)
+        return float(statistic), float(p_value)
+    if len(a) < 2 or len(b) < 2:
+        return np.nan, np.nan
+    statistic, p_value = scipy.stats.ttest_ind(a, b, equal_var=(test == 'student'))
+    if test == 'permutation':
+        p_value = _permutation_pvalue(a, b, n_permutations, np.random.default_rng(seed))
+    return float(statistic), float(p_value)
+
+
+def run_tests(data, specs, n_jobs=None, seed=0, n_permutations=10000):
+    """
+    Run independent two-group tests, optionally across a pool of worker processes.
+
+    Segment columns are factorized to integer codes and metric columns converted to
+    float64 once; the arrays are shared with the workers as memory-mapped files.
+    Results come back in the order of ``specs`` and every permutation test draws from
+    its own seed spawned from ``seed``, so the output does not depend on ``n_jobs``.
+
+    Parameters:
+    data (pd.DataFrame): The dataset.
+    specs (list): (test, segment_column, (group_a, group_b), metric) tuples where test is
+        'student' or 'welch' (t-tests), 'fisher' (Fisher's exact test on whether
+        ``metric`` is positive) or 'permutation' (difference in means).
+    n_jobs (int): Number of worker processes. 1 runs in the current process and None
+        uses every CPU.
+    seed (int): Seed of the permutation tests.
+    n_permutations (int): Number of permutations per permutation test.
+
+    Returns:
+    pd.DataFrame: One row per spec with the test, the tested columns and groups, the
+    statistic (t, odds ratio) and the p-value.
+    """
+    for test, *_ in specs:
+        if test not in SUPPORTED_TESTS:
+            raise ValueError(f"Unsupported test: {test}")
+    arrays, categories = {}, {}
+    for _, segment, _, metric in specs:
+        if segment not in arrays:
+            codes, uniques = pd.factorize(data[segment])
+            arrays[segment] = codes.astype(np.int32)
+            categories[segment] = {value: code for code, value in enumerate(uniques)}
+        if metric not in arrays:
+            arrays[metric] = data[metric].to_numpy(dtype=np.float64)
+    seeds = np.random.SeedSequence(seed).spawn(len(specs))
+    tasks = [(test, segment, categories[segment].get(a, -2), categories[segment].get(b, -2), metric,
+              child_seed, n_permutations)
+             for (test, segment, (a, b), metric), child_seed in zip(specs, seeds)]
+
+    n_jobs = n_jobs or os.cpu_count()
+    if n_jobs == 1:
+        global _COLUMNS
+        _COLUMNS = arrays
+        try:
+            results = [_run_test(task) for task in tasks]
+        finally:
+            _COLUMNS = {}
+    else:
+        with MemmapColumns(arrays) as columns:
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_attach_columns,
+                                     initargs=(columns.paths,)) as executor:
+                chunksize = max(1, len(tasks) // (4 * n_jobs))
+                results = list(executor.map(_run_test, tasks, chunksize=chunksize))
+
+    statistics, p_values = zip(*results) if results else ((), ())
+    return pd.DataFrame({
+        'test': [spec[0] for spec in specs],
+        'feature': [spec[1] for spec in specs],
+        'target': [spec[3] for spec in specs],
+        'group_a': [spec[2][0] for spec in specs],
+        'group_b': [spec[2][1] for spec in specs],
+        'statistic': list(statistics),
+        'p_value': list(p_values),
+    })
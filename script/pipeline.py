@@ -0,0 +1,274 @@
+# pipeline.py
+
+import ast
+import hashlib
+import inspect
+import json
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import joblib
+from AB_hypothesis_testing import ABHypothesisTesting
+from data_cache import file_digest
+from data_preprocessing import DataPreprocessor
+from statistical_modeling import StatisticalModeling
+
+
+def _source_digest(func):
+    """Digest of a function's source code, so editing a step invalidates its cached output."""
+    try:
+        source = inspect.getsource(func)
+    except (OSError, TypeError):
+        source = f"{func.__module__}.{getattr(func, '__qualname__', repr(func))}"
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def _imported_modules(path):
+    """
+    Paths of the modules in the directory of ``path`` that it imports, directly or indirectly.
+
+    Imports are read from the source, so imports inside functions are found too.
+    """
+    directory = os.path.dirname(path)
+    found, stack = set(), [path]
+    while stack:
+        current = stack.pop()
+        if current in found:
+            continue
+        found.add(current)
+        with open(current) as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                candidate = os.path.join(directory, name.split('.')[0] + '.py')
+                if os.path.exists(candidate):
+                    stack.append(candidate)
+    return found
+
+
+def _code_digest(func):
+    """
+    Digest of a step's code: the function's source and the modules of the project it calls into.
+
+    The classes and functions the step refers to are resolved to their modules, and the
+    content of those modules and of the project modules they import is hashed, so editing
+    e.g. ``DataPreprocessor`` invalidates the cached output of the steps that use it.
+    """
+    func_module = inspect.getmodule(func)
+    local_directories = {os.path.dirname(os.path.abspath(__file__))}
+    if getattr(func_module, '__file__', None):
+        local_directories.add(os.path.dirname(os.path.abspath(func_module.__file__)))
+    paths = set()
+    for name in getattr(getattr(func, '__code__', None), 'co_names', ()):
+        module = inspect.getmodule(getattr(func, '__globals__', {}).get(name))
+        path = getattr(module, '__file__', None)
+        if module is not func_module and path and os.path.dirname(os.path.abspath(path)) in local_directories:
+            paths |= _imported_modules(os.path.abspath(path))
+    payload = {'source': _source_digest(func), 'modules': {os.path.basename(path): file_digest(path)
+                                                           for path in sorted(paths)}}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+class Step:
+    def __init__(self, name, func, inputs=(), files=(), config=None, version=1):
+        """
+        A node of the pipeline.
+
+        The step is run as ``func(*upstream_outputs, **config)`` with the outputs of the
+        ``inputs`` steps in order, and is fingerprinted by its name, version, config, the
+        source code of ``func`` and of the project modules it uses (see ``_code_digest``),
+        the content of ``files`` and the fingerprints of its inputs.
+
+        Parameters:
+        name (str): Unique name of the step.
+        func (callable): The function producing the step's output.
+        inputs (tuple): Names of the upstream steps.
+        files (tuple): Paths of input files whose content the output depends on.
+        config (dict): Keyword arguments of ``func``; must be JSON serializable.
+        version (int): Bump to invalidate cached outputs by hand.
+        """
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.files = tuple(files)
+        self.config = dict(config or {})
+        self.version = version
+
+
+class Pipeline:
+    def __init__(self, cache_dir, max_workers=None):
+        """
+        Initialize a DAG of steps whose outputs are cached on disk.
+
+        A step whose fingerprint matches a cached output is not run; its output is loaded
+        instead, so changing a config or an input file reruns only the affected step and
+        the steps downstream of it. Steps whose inputs are ready run concurrently in a
+        thread pool, which keeps the data shared in memory between steps; the heavy work
+        of pandas, NumPy, scikit-learn and XGBoost releases the GIL.
+
+        Parameters:
+        cache_dir (str): Directory of the cached step outputs.
+        max_workers (int): Number of steps run at the same time. Every CPU when None.
+        """
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers or os.cpu_count()
+        self.steps = {}
+        self.report = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def add(self, name, func, inputs=(), files=(), config=None, version=1):
+        """
+        Add a step (see ``Step``).
+
+        Raises:
+        ValueError: If the name is taken or an input step has not been added yet.
+
+        Returns:
+        Pipeline: The pipeline itself, for chaining.
+        """
+        if name in self.steps:
+            raise ValueError(f"Duplicate step: {name}")
+        missing = [step for step in inputs if step not in self.steps]
+        if missing:
+            raise ValueError(f"Unknown input steps of {name}: {missing}")
+        self.steps[name] = Step(name, func, inputs, files, config, version)
+        return self
+
+    def fingerprints(self):
+        """Return the fingerprint of every step, in the order they were added."""
+        fingerprints = {}
+        for name, step in self.steps.items():
+            payload = {'name': name, 'version': step.version, 'config': step.config,
+                       'source': _code_digest(step.func),
+                       'files': {path: file_digest(path) for path in step.files},
+                       'inputs': [fingerprints[upstream] for upstream in step.inputs]}
+            fingerprints[name] = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:32]
+        return fingerprints
+
+    def cache_path(self, name, fingerprint):
+        return os.path.join(self.cache_dir, f"{name}-{fingerprint}.joblib")
+
+    def run(self, targets=None, force=()):
+        """
+        Run the steps needed for ``targets``, reusing cached outputs.
+
+        Parameters:
+        targets (list): Steps to produce. Every step when None.
+        force (tuple): Steps to rerun even if a cached output exists.
+
+        Returns:
+        dict: Step name to output, for the targets and the steps they depend on. Cached
+        steps whose outputs are only needed by cached steps are not loaded.
+        """
+        fingerprints = self.fingerprints()
+        needed = self._ancestors(targets or list(self.steps))
+        fresh = {name for name in needed if name not in force
+                 and os.path.exists(self.cache_path(name, fingerprints[name]))}
+        # A fresh step only has to be loaded if a target or a step that reruns consumes it
+        to_run = [name for name in self.steps if name in needed and name not in fresh]
+        to_load = {name for name in fresh if name in (targets or self.steps)} | \
+            {upstream for name in to_run for upstream in self.steps[name].inputs if upstream in fresh}
+        self.report = {}
+        outputs = {}
+        for name in to_load:
+            start = time.perf_counter()
+            outputs[name] = joblib.load(self.cache_path(name, fingerprints[name]))
+            self.report[name] = {'status': 'cached', 'seconds': time.perf_counter() - start}
+
+        pending = list(to_run)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            running = {}
+            while pending or running:
+                for name in [name for name in pending if all(upstream in outputs for upstream in self.steps[name].inputs)]:
+                    pending.remove(name)
+                    running[executor.submit(self._run_step, name, fingerprints[name], outputs)] = name
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    outputs[name], self.report[name] = future.result()
+        return outputs
+
+    def _run_step(self, name, fingerprint, outputs):
+        step = self.steps[name]
+        start = time.perf_counter()
+        output = step.func(*[outputs[upstream] for upstream in step.inputs], **step.config)
+        seconds = time.perf_counter() - start
+        path = self.cache_path(name, fingerprint)
+        joblib.dump(output, path + '.tmp')
+        os.replace(path + '.tmp', path)
+        logging.info(f"Pipeline step {name} ran in {seconds:.2f}s")
+        return output, {'status': 'ran', 'seconds': seconds}
+
+    def _ancestors(self, targets):
+        """The targets and every step they depend on."""
+        needed, stack = set(), list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in self.steps:
+                raise ValueError(f"Unknown step: {name}")
+            if name not in needed:
+                needed.add(name)
+                stack.extend(self.steps[name].inputs)
+        return needed
+
+
+def clean_data(file_path, delimiter='|', chunksize=None):
+    """Pipeline step: load and clean the raw data."""
+    preprocessor = DataPreprocessor(file_path, delimiter=delimiter)
+    preprocessor.load_data(chunksize=chunksize)
+    if chunksize is None:
+        preprocessor.handle_missing_values()
+        preprocessor.remove_negative_values()
+        preprocessor.strip_whitespace()
+    return preprocessor.data
+
+
+def hypothesis_tests(data, chi_squared_specs=(), t_test_specs=(), correction='fdr_bh', alpha=0.05):
+    """Pipeline step: run the batch of hypothesis tests on the cleaned data."""
+    return ABHypothesisTesting(data).run_batch([tuple(spec) for spec in chi_squared_specs],
+                                               [tuple(spec) for spec in t_test_specs],
+                                               correction=correction, alpha=alpha)
+
+
+def fit_models(data, build_params=None):
+    """Pipeline step: encode the cleaned data, train and evaluate the models."""
+    modeling = StatisticalModeling(data)
+    modeling.prepare_data()
+    modeling.build_models(**(build_params or {}))
+    modeling.evaluate_models()
+    return {'encoder': modeling.encoder, 'models': modeling.models, 'results': modeling.results,
+            'segment_results': modeling.segment_results, 'training_report': modeling.training_report}
+
+
+def analysis_pipeline(file_path, cache_dir, delimiter='|', chunksize=None, chi_squared_specs=(), t_test_specs=(),
+                      build_params=None, max_workers=None):
+    """
+    Build the standard workflow: cleaning, then hypothesis tests and model training in parallel.
+
+    Parameters:
+    file_path (str): Path of the raw data.
+    cache_dir (str): Directory of the cached step outputs.
+    delimiter (str): Delimiter of the raw data.
+    chunksize (int): Clean the data in chunks of that many rows when given.
+    chi_squared_specs (list): (feature, target) pairs for ``ABHypothesisTesting.run_batch``.
+    t_test_specs (list): (segment_column, group_pairs, metric) triples for ``run_batch``.
+    build_params (dict): Keyword arguments of ``StatisticalModeling.build_models``.
+    max_workers (int): Number of steps run at the same time.
+
+    Returns:
+    Pipeline: The pipeline with the steps 'clean', 'hypothesis_tests' and 'models'.
+    """
+    return (Pipeline(cache_dir, max_workers=max_workers)
+            .add('clean', clean_data, files=[file_path],
+                 config={'file_path': file_path, 'delimiter': delimiter, 'chunksize': chunksize})
+            .add('hypothesis_tests', hypothesis_tests, inputs=['clean'],
+                 config={'chi_squared_specs': [list(spec) for spec in chi_squared_specs],
+                         't_test_specs': [list(spec) for spec in t_test_specs]})
+            .add('models', fit_models, inputs=['clean'], config={'build_params': build_params or {}}))
@@ -0,0 +1,269 @@
+# resampling.py
+
+import warnings
+import numpy as np
+import pandas as pd
+import scipy.sparse
+import scipy.stats
+from AB_hypothesis_testing import adjust_pvalues
+
+STATISTICS = ('loss_ratio', 'severity', 'frequency')
+
+# Poisson(1) quantiles of 2**16 equally likely uniform draws: indexing the table with random
+# uint16 values is several times faster than sampling the Poisson distribution directly
+_POISSON_TABLE = scipy.stats.poisson.ppf((np.arange(2 ** 16) + 0.5) / 2 ** 16, 1.0).astype(np.float64)
+
+
+def ratio_inputs(data, statistic, claims='TotalClaims', premium='TotalPremium'):
+    """
+    Express a statistic as the ratio of two sums over a subset of rows.
+
+    'loss_ratio' is sum(claims) / sum(premium) over every row, 'severity' the mean claim
+    amount over the rows with a claim, and 'frequency' the share of rows with a claim.
+
+    Parameters:
+    data (pd.DataFrame): The dataset.
+    statistic (str): One of ``STATISTICS``.
+    claims (str): The claims column.
+    premium (str): The premium column.
+
+    Returns:
+    tuple: The boolean mask of the rows used, and the numerator and denominator arrays of those rows.
+    """
+    claim_values = data[claims].to_numpy(dtype=np.float64)
+    if statistic == 'loss_ratio':
+        premium_values = data[premium].to_numpy(dtype=np.float64)
+        mask = ~np.isnan(claim_values) & ~np.isnan(premium_values)
+        return mask, claim_values[mask], premium_values[mask]
+    if statistic == 'severity':
+        mask = claim_values > 0
+        return mask, claim_values[mask], np.ones(np.count_nonzero(mask))
+    if statistic == 'frequency':
+        mask = ~np.isnan(claim_values)
+        return mask, (claim_values[mask] > 0).astype(np.float64), np.ones(np.count_nonzero(mask))
+    raise ValueError(f"Unsupported statistic: {statistic}")
+
+
+def poisson_weight_batches(n_rows, n_resamples, seed=0, block_rows=65_536, max_cells=20_000_000):
+    """
+    Generate Poisson(1) bootstrap weights in batches of bounded size.
+
+    Each row enters each resample with an independent Poisson(1) weight instead of
+    being drawn with replacement, so no resample indices are materialized. Rows are
+    split in blocks, and each block draws from its own generator spawned from ``seed``,
+    so the weights do not depend on ``max_cells``.
+
+    Parameters:
+    n_rows (int): Number of rows.
+    n_resamples (int): Number of bootstrap resamples.
+    seed (int): Seed of the resampling.
+    block_rows (int): Number of rows per block. Changing it changes the random draws.
+    max_cells (int): Maximum size of a weight matrix, which bounds the memory used.
+
+    Yields:
+    tuple: The row slice, the resample slice and the (resamples x rows) weight matrix.
+    """
+    starts = range(0, n_rows, block_rows)
+    generators = [np.random.default_rng(child) for child in np.random.SeedSequence(seed).spawn(len(starts))]
+    for start, rng in zip(starts, generators):
+        stop = min(start + block_rows, n_rows)
+        batch_size = max(1, min(n_resamples, max_cells // (stop - start)))
+        for first in range(0, n_resamples, batch_size):
+            last = min(first + batch_size, n_resamples)
+            weights = _POISSON_TABLE[rng.integers(0, 2 ** 16, (last - first, stop - start), dtype=np.uint16)]
+            yield slice(start, stop), slice(first, last), weights
+
+
+def poisson_weighted_sums(values, n_resamples=10_000, seed=0, block_rows=65_536, max_cells=20_000_000):
+    """
+    Bootstrap the column sums of a matrix with Poisson(1) row weights (see ``poisson_weight_batches``).
+
+    Any statistic that is a function of column sums, such as a mean, a ratio or a sum of
+    squared errors, can then be computed for every resample at once.
+
+    Parameters:
+    values (np.ndarray): Array of shape (rows, columns).
+    n_resamples (int): Number of bootstrap resamples.
+    seed (int): Seed of the resampling.
+    block_rows (int): Number of rows per block.
+    max_cells (int): Maximum size of a weight matrix.
+
+    Returns:
+    np.ndarray: The resampled column sums, of shape (n_resamples, columns).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    sums = np.zeros((n_resamples, values.shape[1]))
+    for rows, resamples, weights in poisson_weight_batches(len(values), n_resamples, seed, block_rows, max_cells):
+        sums[resamples] += weights @ values[rows]
+    return sums
+
+
+def poisson_bootstrap(codes, numerator, denominator, n_segments, n_resamples=10_000, seed=0, block_rows=65_536,
+                      max_cells=20_000_000):
+    """
+    Bootstrap a ratio of sums in every segment at once with Poisson(1) row weights.
+
+    The weights of a block of rows (see ``poisson_weight_batches``) form a (resamples x
+    rows) matrix whose product with the sparse (rows x segments) matrix of numerators and
+    denominators updates the sums of every resample of every segment.
+
+    Parameters:
+    codes (np.ndarray): Segment code of each row, in [0, n_segments).
+    numerator (np.ndarray): Numerator value of each row.
+    denominator (np.ndarray): Denominator value of each row.
+    n_segments (int): Number of segments.
+    n_resamples (int): Number of bootstrap resamples.
+    seed (int): Seed of the resampling.
+    block_rows (int): Number of rows per block. Changing it changes the random draws.
+    max_cells (int): Maximum size of a weight matrix, which bounds the memory used.
+
+    Returns:
+    np.ndarray: The resampled ratios, of shape (n_resamples, n_segments).
+    """
+    sums = np.zeros((n_resamples, 2 * n_segments))
+    indicator, block = None, None
+    for rows, resamples, weights in poisson_weight_batches(len(codes), n_resamples, seed, block_rows, max_cells):
+        if block != rows.start:
+            size = rows.stop - rows.start
+            indicator = scipy.sparse.csr_matrix(
+                (np.column_stack([numerator[rows], denominator[rows]]).ravel(),
+                 (np.repeat(np.arange(size), 2), (2 * codes[rows, None] + np.array([0, 1])).ravel())),
+                shape=(size, 2 * n_segments))
+            block = rows.start
+        sums[resamples] += weights @ indicator
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return sums[:, 0::2] / sums[:, 1::2]
+
+
+def permutation_pvalue(numerator_a, denominator_a, numerator_b, denominator_b, n_permutations, rng,
+                       max_cells=10_000_000):
+    """
+    Two-sided permutation p-value of the difference between two ratios of sums, in batches of permutations.
+
+    Returns:
+    tuple: The observed difference (a - b) and the p-value.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        observed = numerator_a.sum() / denominator_a.sum() - numerator_b.sum() / denominator_b.sum()
+    if not np.isfinite(observed):
+        return observed, np.nan
+    # The statistic is symmetric, so the smaller group is the one drawn in each permutation
+    if len(numerator_a) > len(numerator_b):
+        numerator_a, denominator_a, numerator_b, denominator_b = numerator_b, denominator_b, numerator_a, denominator_a
+    numerator = np.concatenate([numerator_a, numerator_b])
+    denominator = np.concatenate([denominator_a, denominator_b])
+    total_numerator, total_denominator = numerator.sum(), denominator.sum()
+    n_a, n_rows = len(numerator_a), len(numerator)
+    batch_size = max(1, min(n_permutations, max_cells // max(n_a, 1)))
+    threshold = abs(observed) - 1e-12 * max(abs(observed), 1)
+    exceed = 0
+    for start in range(0, n_permutations, batch_size):
+        size = min(batch_size, n_permutations - start)
+        # Only the members of the smaller group are drawn, so a permutation costs O(n_a) rather than O(n_rows)
+        members = np.stack([rng.choice(n_rows, n_a, replace=False, shuffle=False) for _ in range(size)])
+        sum_numerator, sum_denominator = numerator[members].sum(axis=1), denominator[members].sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            diffs = np.abs(sum_numerator / sum_denominator
+                           - (total_numerator - sum_numerator) / (total_denominator - sum_denominator))
+        exceed += np.count_nonzero(diffs >= threshold)
+    return observed, (exceed + 1) / (n_permutations + 1)
+
+
+def _segment_codes(data, segment_column):
+    """Integer code of the segment of each row (-1 when missing) and the segment labels."""
+    if isinstance(segment_column, str):
+        return pd.factorize(data[segment_column], sort=True)
+    return pd.MultiIndex.from_frame(data[list(segment_column)]).factorize(sort=True)
+
+
+def bootstrap_segments(data, segment_column, statistic='loss_ratio', n_resamples=10_000, confidence=0.95, seed=0,
+                       claims='TotalClaims', premium='TotalPremium', block_rows=65_536, max_cells=20_000_000):
+    """
+    Compute percentile bootstrap confidence intervals of a statistic in every segment.
+
+    Parameters:
+    data (pd.DataFrame): The dataset.
+    segment_column (str or list): The column, or columns, defining the segments.
+    statistic (str): 'loss_ratio', 'severity' or 'frequency' (see ``ratio_inputs``).
+    n_resamples (int): Number of bootstrap resamples.
+    confidence (float): Confidence level of the intervals.
+    seed (int): Seed of the resampling; the same seed gives the same intervals.
+    claims (str): The claims column.
+    premium (str): The premium column.
+    block_rows (int): Number of rows per block (see ``poisson_bootstrap``).
+    max_cells (int): Maximum size of a weight matrix.
+
+    Returns:
+    pd.DataFrame: Per segment, the number of rows used, the estimate, the bootstrap
+    standard error and the lower and upper bounds of the interval.
+    """
+    mask, numerator, denominator = ratio_inputs(data, statistic, claims, premium)
+    codes, labels = _segment_codes(data, segment_column)
+    codes = codes[mask]
+    valid = codes >= 0
+    codes, numerator, denominator = codes[valid], numerator[valid], denominator[valid]
+    n_segments = len(labels)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        estimate = (np.bincount(codes, weights=numerator, minlength=n_segments)
+                    / np.bincount(codes, weights=denominator, minlength=n_segments))
+        resampled = poisson_bootstrap(codes, numerator, denominator, n_segments, n_resamples=n_resamples, seed=seed,
+                                      block_rows=block_rows, max_cells=max_cells)
+        resampled[~np.isfinite(resampled)] = np.nan
+    tail = (1 - confidence) / 2
+    with warnings.catch_warnings():
+        # Segments without any usable rows get NaN bounds
+        warnings.simplefilter('ignore', RuntimeWarning)
+        lower, upper = np.nanquantile(resampled, [tail, 1 - tail], axis=0)
+        std_error = np.nanstd(resampled, axis=0, ddof=1)
+    return pd.DataFrame({'n': np.bincount(codes, minlength=n_segments), 'estimate': estimate,
+                         'std_error': std_error, 'ci_lower': lower, 'ci_upper': upper},
+                        index=pd.Index(labels, name=segment_column) if isinstance(segment_column, str) else labels)
+
+
+def permutation_segments(data, segment_column, statistic='loss_ratio', group_pairs=None, n_permutations=10_000,
+                         seed=0, correction='fdr_bh', alpha=0.05, claims='TotalClaims', premium='TotalPremium',
+                         max_cells=10_000_000):
+    """
+    Run permutation tests of the difference of a statistic between segments.
+
+    Every test draws from its own seed spawned from ``seed``, so results are reproducible
+    and do not depend on which other tests are run alongside. The cost of a test grows
+    with the number of rows of its two groups times ``n_permutations``.
+
+    Parameters:
+    data (pd.DataFrame): The dataset.
+    segment_column (str): The column defining the segments.
+    statistic (str): 'loss_ratio', 'severity' or 'frequency' (see ``ratio_inputs``).
+    group_pairs (list): (a, b) pairs of segments to compare. When None, every segment is
+        compared with all the other rows ('rest').
+    n_permutations (int): Number of permutations per test.
+    seed (int): Seed of the permutations.
+    correction (str): Multiple-testing correction passed to ``adjust_pvalues``.
+    alpha (float): Significance level applied to the adjusted p-values.
+    claims (str): The claims column.
+    premium (str): The premium column.
+    max_cells (int): Maximum size of a permutation matrix.
+
+    Returns:
+    pd.DataFrame: One row per test, in the layout of ``ABHypothesisTesting.run_batch``,
+    with the observed difference a - b as the statistic.
+    """
+    mask, numerator, denominator = ratio_inputs(data, statistic, claims, premium)
+    segments = data[segment_column].to_numpy()[mask]
+    if group_pairs is None:
+        group_pairs = [(segment, 'rest') for segment in pd.unique(segments[pd.notna(segments)])]
+    seeds = np.random.SeedSequence(seed).spawn(len(group_pairs))
+    rows = []
+    for (a, b), child_seed in zip(group_pairs, seeds):
+        in_a = segments == a
+        in_b = ~in_a & pd.notna(segments) if b == 'rest' else segments == b
+        difference, p_value = permutation_pvalue(numerator[in_a], denominator[in_a], numerator[in_b],
+                                                 denominator[in_b], n_permutations,
+                                                 np.random.default_rng(child_seed), max_cells=max_cells)
+        rows.append({'test': 'permutation', 'feature': segment_column, 'target': statistic, 'group_a': a,
+                     'group_b': b, 'statistic': difference, 'dof': np.nan, 'p_value': p_value})
+    results = pd.DataFrame(rows, columns=['test', 'feature', 'target', 'group_a', 'group_b', 'statistic', 'dof',
+                                          'p_value'])
+    results['p_adjusted'] = adjust_pvalues(results['p_value'].to_numpy(), method=correction)
+    results['reject'] = results['p_adjusted'] < alpha
+    return results
@@ -0,0 +1,149 @@
+# score_policies.py
+#
+# Score a book of policies with saved model artifacts:
+#     python score_policies.py --models ../models --input policies.txt --output predictions.parquet
+
+import argparse
+import os
+import time
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from model_artifacts import load_artifacts
+
+DEFAULT_CHUNKSIZE = 200_000
+
+
+def iter_policy_chunks(input_path, chunksize=DEFAULT_CHUNKSIZE, delimiter='|', columns=None):
+    """
+    Stream policies from a delimited text file or a Parquet file in chunks.
+
+    Parameters:
+    input_path (str): Path of the policies file.
+    chunksize (int): Number of rows per chunk.
+    delimiter (str): Delimiter of text files.
+    columns (list): Columns to read. All columns are read when None.
+
+    Yields:
+    pd.DataFrame: The chunks of policies.
+    """
+    if input_path.endswith('.parquet'):
+        parquet_file = pq.ParquetFile(input_path, memory_map=True)
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    else:
+        usecols = None if columns is None else (lambda column: column in columns)
+        yield from pd.read_csv(input_path, delimiter=delimiter, chunksize=chunksize, usecols=usecols,
+                               low_memory=False)
+
+
+class PredictionWriter:
+    def __init__(self, output_path):
+        """
+        Write prediction chunks incrementally to a CSV or Parquet file.
+
+        Parameters:
+        output_path (str): Path of the output file; '.parquet' writes Parquet, anything else CSV.
+        """
+        self.output_path = output_path
+        self._parquet_writer = None
+        self._wrote_header = False
+
+    def write(self, predictions):
+        """Append a DataFrame of predictions to the output."""
+        if self.output_path.endswith('.parquet'):
+            table = pa.Table.from_pandas(predictions, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.output_path, table.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            predictions.to_csv(self.output_path, mode='a' if self._wrote_header else 'w',
+                               header=not self._wrote_header, index=False)
+            self._wrote_header = True
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def score_file(scorer, input_path, output_path, model=None, chunksize=DEFAULT_CHUNKSIZE, delimiter='|',
+               id_columns=(), n_threads=None):
+    """
+    Score every policy of a file in chunks and write the predictions as they are produced.
+
+    Only the columns of the model's input schema (plus ``id_columns``) are read; each
+    chunk is encoded into a float32 block and predicted in one call, so memory is
+    bounded by ``chunksize``.
+
+    Parameters:
+    scorer (PremiumScorer): The loaded artifacts.
+    input_path (str): Path of the policies (delimited text or Parquet).
+    output_path (str): Path of the predictions (CSV or Parquet).
+    model (str): Name of the model to use. Defaults to the first saved model.
+    chunksize (int): Number of policies per chunk.
+    delimiter (str): Delimiter of text input files.
+    id_columns (tuple): Columns copied from the input next to the predictions.
+    n_threads (int): Number of threads used by tree models during the call. All cores when None.
+
+    Returns:
+    dict: The number of rows scored, the elapsed seconds and the rows per second.
+    """
+    model = model or next(iter(scorer.models))
+    estimator = scorer.models[model]
+    threaded = 'n_jobs' in estimator.get_params()
+    previous_n_jobs = estimator.get_params()['n_jobs'] if threaded else None
+    if threaded:
+        estimator.set_params(n_jobs=n_threads or os.cpu_count())
+
+    columns = list(dict.fromkeys(list(id_columns) + scorer.manifest['input_columns']))
+    rows = 0
+    start = time.perf_counter()
+    try:
+        with PredictionWriter(output_path) as writer:
+            for chunk in iter_policy_chunks(input_path, chunksize=chunksize, delimiter=delimiter, columns=columns):
+                if not len(chunk):
+                    continue
+                predictions = chunk[list(id_columns)].reset_index(drop=True)
+                predictions['PredictedPremium'] = estimator.predict(scorer.transform(chunk)).astype('float32')
+                writer.write(predictions)
+                rows += len(chunk)
+            if not rows:
+                # An empty book still gets an output file, with the header only
+                writer.write(pd.DataFrame(columns=list(id_columns)).assign(
+                    PredictedPremium=pd.Series(dtype='float32')))
+    finally:
+        # The estimator belongs to the caller's scorer; leave its thread setting as it was
+        if threaded:
+            estimator.set_params(n_jobs=previous_n_jobs)
+    elapsed = time.perf_counter() - start
+    return {'rows': rows, 'seconds': elapsed, 'rows_per_second': rows / elapsed if elapsed else float('inf')}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Score a book of policies with saved model artifacts.')
+    parser.add_argument('--models', required=True, help='Directory of the saved artifact versions.')
+    parser.add_argument('--version', help='Artifact version to load. Defaults to the latest.')
+    parser.add_argument('--input', required=True, help='Policies as delimited text or Parquet.')
+    parser.add_argument('--output', required=True, help='Predictions file (.csv or .parquet).')
+    parser.add_argument('--model', help='Name of the model to use. Defaults to the first saved model.')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--delimiter', default='|')
+    parser.add_argument('--id-columns', nargs='*', default=[], help='Input columns copied to the output.')
+    parser.add_argument('--threads', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    scorer = load_artifacts(args.models, version=args.version)
+    summary = score_file(scorer, args.input, args.output, model=args.model, chunksize=args.chunksize,
+                         delimiter=args.delimiter, id_columns=args.id_columns, n_threads=args.threads)
+    print(f"Scored {summary['rows']:,} policies in {summary['seconds']:.2f}s "
+          f"({summary['rows_per_second']:,.0f} rows/s) -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
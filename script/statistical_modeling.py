@@ -1,14 +1,51 @@
 import os
 import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import OneHotEncoder, LabelEncoder
-from sklearn.linear_model import LinearRegression
-from sklearn.ensemble import RandomForestRegressor
-from xgboost import XGBRegressor
-from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
-import shap
 import numpy as np
+from data_cache import DataCache, read_columnar
+from feature_encoding import (CATEGORICAL_FEATURES, NUMERIC_SAMPLE_SIZE, TARGET_COLUMNS, FeatureEncoder,
+                              is_numeric_text, target_values)
+from instrumentation import instrumented
 
+# scikit-learn, XGBoost, SHAP and pyarrow take seconds to import, so they are imported
+# by the methods that use them rather than when this module is loaded.
+
+
+def model_columns(schema, sample=None):
+    """
+    Select the columns the models can use from a Parquet schema.
+
+    ``prepare_data`` uses numeric columns, the encoded categorical features, the targets
+    and text columns holding numbers (e.g. CapitalOutstanding), so only these carry
+    information into the models.
+
+    Parameters:
+    schema (pa.Schema): The schema of the stored dataset.
+    sample (pd.DataFrame): The first rows of the text columns, used to find those holding
+        numbers. Text columns are left out when None.
+
+    Returns:
+    list: The column names to read.
+    """
+    import pyarrow as pa
+
+    columns = []
+    for field in schema:
+        numeric = (pa.types.is_integer(field.type) or pa.types.is_floating(field.type)
+                   or pa.types.is_boolean(field.type) or pa.types.is_decimal(field.type))
+        numeric_text = sample is not None and field.name in sample.columns and is_numeric_text(sample[field.name])
+        if numeric or numeric_text or field.name in CATEGORICAL_FEATURES or field.name in TARGET_COLUMNS:
+            columns.append(field.name)
+    return columns
+
+
+def _text_columns(schema):
+    """Names of the string columns of a schema."""
+    import pyarrow as pa
+
+    return [field.name for field in schema if pa.types.is_string(field.type) or pa.types.is_large_string(field.type)]
+
+
+@instrumented
 class StatisticalModeling:
     def __init__(self, data):
         """
@@ -23,98 +60,303 @@ class StatisticalModeling:
             self.X_test = None
             self.y_train = None
             self.y_test = None
+            self.encoder = None
             self.models = {}
             self.results = {}
+            self.training_report = {}
+            self.search_results = {}
+            self.importances = None
+            self.test_segments = None
+            self.train_rows = None
+            self.test_rows = None
+            self.predictions = None
+            self.segment_results = None
         except Exception as e:
             print(f"Error initializing data: {e}")
 
-    def prepare_data(self):
+    @classmethod
+    def from_file(cls, file_path, columns='model', cache_dir=None):
+        """
+        Create an instance from a cleaned dataset stored as CSV, Parquet or Feather.
+
+        CSV files are parsed once and cached as Parquet under ``cache_dir``, keyed by the
+        file content, so repeat runs skip CSV parsing. Columnar files are memory-mapped.
+        Text columns are kept as model columns when their first rows hold numbers, as
+        ``FeatureEncoder`` uses them as numeric features.
+        
+        Parameters:
+        file_path (str): Path of the cleaned dataset.
+        columns (list or str): Columns to load. 'model' loads only the columns the models
+            use, None loads every column.
+        cache_dir (str): Directory of the Parquet cache for CSV sources.
+
+        Returns:
+        StatisticalModeling: The initialized instance.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if file_path.endswith('.csv'):
+            cache = DataCache(cache_dir) if cache_dir is not None else None
+            key = cache.key(file_path, {'stage': 'csv', 'low_memory': False}) if cache else None
+            if cache is None or not cache.exists(key):
+                data = pd.read_csv(file_path, low_memory=False)
+                if cache is None or not cache.save(key, data):
+                    if columns == 'model':
+                        columns = model_columns(pa.Schema.from_pandas(data.head(0), preserve_index=False), data)
+                    return cls(data if columns is None else data[columns])
+            file_path = cache.path(key)
+        if columns == 'model':
+            if file_path.endswith('.parquet'):
+                schema = pq.read_schema(file_path)
+                batches = pq.ParquetFile(file_path).iter_batches(batch_size=NUMERIC_SAMPLE_SIZE,
+                                                                 columns=_text_columns(schema))
+                sample = next(batches, None)
+            else:
+                reader = pa.ipc.open_file(file_path)
+                schema = reader.schema
+                sample = reader.get_batch(0).select(_text_columns(schema)) if reader.num_record_batches else None
+            columns = model_columns(schema, None if sample is None else sample.to_pandas())
+        return cls(read_columnar(file_path, columns=columns))
+
+    def prepare_data(self, sparse=False, target_features=True):
         """
-        Prepare the data by handling missing values, feature engineering, encoding categorical data, and train-test split.
+        Prepare the data by feature engineering, encoding categorical data, and train-test split.
+        
+        The features are encoded by a ``FeatureEncoder`` into a float32 design matrix
+        without copying the cleaned data; the fitted encoder is kept in ``self.encoder``
+        so new data can be encoded the same way. The positions of the training and test
+        rows in the data are kept in ``self.train_rows`` and ``self.test_rows``, and the
+        Province and Gender of the test rows in ``self.test_segments`` for the segment
+        breakdowns of ``evaluate_models``.
+        
+        Parameters:
+        sparse (bool): Produce a CSR design matrix instead of a DataFrame.
+        target_features (bool): Use the 'ClaimsPerPremium' feature computed from the targets.
+            Disable it for models saved to score new policies, whose claims are unknown.
         """
+        from sklearn.model_selection import train_test_split
+        from evaluation import SEGMENT_COLUMNS
+
         try:
-            # Feature Engineering
-            self.data['ClaimsPerPremium'] = self.data['TotalClaims'] / self.data['TotalPremium']
-            self.data['ClaimsPerPremium'] = self.data['ClaimsPerPremium'].replace([np.inf, -np.inf], 0)
-            self.data['ClaimsPerPremium'] = self.data['ClaimsPerPremium'].fillna(0)
-
-            # Encoding Categorical Data
-            categorical_features = ['Province', 'PostalCode', 'Gender']
-            for feature in categorical_features:
-                if self.data[feature].nunique() > 10:
-                    # Use Label Encoding for features with many unique values
-                    encoder = LabelEncoder()
-                    self.data[feature] = encoder.fit_transform(self.data[feature])
-                else:
-                    # Use OneHot Encoding for features with fewer unique values
-                    encoder = OneHotEncoder(sparse_output=False)
-                    encoded_features = pd.DataFrame(encoder.fit_transform(self.data[[feature]]))
-                    encoded_features.columns = encoder.get_feature_names_out([feature])
-                    self.data = pd.concat([self.data.drop(feature, axis=1), encoded_features], axis=1)
-
-            # Ensure all columns are numeric
-            self.data = self.data.apply(pd.to_numeric, errors='coerce')
-
-            # Handle infinity or extremely large values
-            self.data.replace([np.inf, -np.inf], 0, inplace=True)
-            self.data = self.data.applymap(lambda x: 0 if np.abs(x) > 1e10 else x)
-
-            # Handle NaN values by filling with zero
-            self.data.fillna(0, inplace=True)
+            self.encoder = FeatureEncoder(sparse=sparse, target_features=target_features)
+            X = self.encoder.fit_transform(self.data)
+            y = target_values(self.data, 'TotalPremium')  # or 'TotalClaims' depending on the target variable
 
             # Train-Test Split
-            X = self.data.drop(['TotalPremium', 'TotalClaims'], axis=1)
-            y = self.data['TotalPremium']  # or 'TotalClaims' depending on the target variable
-            self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(X, y, test_size=0.3, random_state=42)
+            self.X_train, self.X_test, self.y_train, self.y_test, self.train_rows, self.test_rows = train_test_split(
+                X, y, np.arange(len(y)), test_size=0.3, random_state=42)
+            segment_columns = [column for column in SEGMENT_COLUMNS if column in self.data.columns]
+            self.test_segments = self.data[segment_columns].iloc[self.test_rows].reset_index(drop=True)
+            self.predictions = None
         except Exception as e:
             print(f"Error preparing data: {e}")
 
-    def build_models(self):
+    def build_models(self, parallel=False, n_jobs=-1, early_stopping_rounds=None, n_estimators=None,
+                     validation_fraction=0.1, tree_method='hist'):
         """
         Build and train the models: Linear Regression, Random Forest, and XGBoost.
+        
+        With ``parallel`` the three models are trained concurrently in separate worker
+        processes. With ``early_stopping_rounds`` XGBoost holds out ``validation_fraction``
+        of the training rows and stops once the validation error stops improving. The wall
+        time, CPU time and memory of every fit are recorded in ``self.training_report``.
+        The cached test-set predictions are discarded, so ``evaluate_models`` predicts again.
+        
+        Parameters:
+        parallel (bool): Train the models concurrently.
+        n_jobs (int): Threads per model (-1 for every core; split between models when parallel).
+        early_stopping_rounds (int): Rounds without improvement before XGBoost stops. None disables it.
+        n_estimators (int): Maximum number of boosting rounds of XGBoost.
+        validation_fraction (float): Share of the training rows held out for early stopping.
+        tree_method (str): XGBoost tree method.
+
+        Raises:
+        ValueError: If ``early_stopping_rounds`` is set without a positive ``validation_fraction``.
         """
+        from training import candidate_models, train_models, validate_early_stopping
+
+        validate_early_stopping(early_stopping_rounds, validation_fraction)
+        self.predictions = None
         try:
-            # Linear Regression
-            lr = LinearRegression()
-            lr.fit(self.X_train, self.y_train)
-            self.models['Linear Regression'] = lr
-
-            # Random Forest
-            rf = RandomForestRegressor(random_state=42)
-            rf.fit(self.X_train, self.y_train)
-            self.models['Random Forest'] = rf
-
-            # XGBoost
-            xgb = XGBRegressor(random_state=42)
-            xgb.fit(self.X_train, self.y_train)
-            self.models['XGBoost'] = xgb
+            if parallel and n_jobs == -1:
+                n_jobs = max(1, (os.cpu_count() or 1) // 3)
+            estimators = candidate_models(n_jobs=n_jobs, tree_method=tree_method, n_estimators=n_estimators,
+                                          early_stopping_rounds=early_stopping_rounds)
+            models, self.training_report = train_models(estimators, self.X_train, self.y_train,
+                                                        validation_fraction=validation_fraction, parallel=parallel)
+            self.models.update(models)
         except Exception as e:
             print(f"Error building models: {e}")
 
-    def evaluate_models(self):
+    @classmethod
+    def train_out_of_core(cls, file_path, cache_dir, chunksize=200_000, delimiter=',', holdout_fraction=0.3,
+                          num_boost_round=100, sgd_epochs=5):
+        """
+        Train on a cleaned dataset too large for memory, reading it chunk by chunk.
+        
+        The encoder is fitted in one streaming pass, XGBoost trains from an external-memory
+        DMatrix and the linear model is an SGD regressor updated with ``partial_fit``. A
+        fixed share of the rows of every chunk is held out and used for ``self.results``.
+        The random forest has no incremental form and is not trained.
+        
+        Parameters:
+        file_path (str): Path of the cleaned dataset (CSV or Parquet).
+        cache_dir (str): Directory of XGBoost's on-disk page cache.
+        chunksize (int): Number of rows read at a time.
+        delimiter (str): Delimiter of CSV files.
+        holdout_fraction (float): Share of the rows held out for evaluation.
+        num_boost_round (int): Number of boosting rounds.
+        sgd_epochs (int): Number of passes of the SGD regressor.
+        
+        Returns:
+        StatisticalModeling: An instance without in-memory data, with the encoder, models and results set.
+        """
+        from out_of_core import evaluate_holdout, file_chunks, train_out_of_core
+
+        modeling = cls(None)
+        try:
+            source = file_chunks(file_path, chunksize=chunksize, delimiter=delimiter)
+            modeling.encoder, modeling.models, modeling.training_report = train_out_of_core(
+                source, cache_dir, holdout_fraction=holdout_fraction, num_boost_round=num_boost_round,
+                sgd_epochs=sgd_epochs)
+            modeling.results = evaluate_holdout(modeling.models, source, modeling.encoder,
+                                                holdout_fraction=holdout_fraction)
+        except Exception as e:
+            print(f"Error training out of core: {e}")
+        return modeling
+
+    def tune_model(self, model, param_grid, directory, n_splits=5, factor=3, min_fraction=1.0,
+                   scoring='RMSE', n_jobs=None):
+        """
+        Cross-validate a grid of hyperparameters for one model, with successive halving.
+        
+        The encoded folds are cached under ``<directory>/folds`` and the trials logged in
+        ``<directory>/<model>_trials.jsonl``, so re-running resumes an interrupted search.
+        Logged trials are tied to the folds they were scored on; after the data or
+        ``n_splits`` change, the folds are rebuilt and every trial is run again. The cached
+        test-set predictions are discarded, as the models may be refit with the best parameters.
+        
+        Parameters:
+        model (str): 'Linear Regression', 'Random Forest' or 'XGBoost'.
+        param_grid (dict or list): Grid of parameters of the model.
+        directory (str): Directory of the fold cache and the trial log.
+        n_splits (int): Number of folds.
+        factor (int): Share of candidates kept at each halving rung is ``1 / factor``.
+        min_fraction (float): Share of the training rows used by the first rung.
+        scoring (str): 'RMSE', 'MAE' or 'R2'.
+        n_jobs (int): Number of worker processes. None uses every CPU.
+        
+        Returns:
+        dict: The best parameters, also kept in ``self.search_results[model]`` with the scores.
+        """
+        from model_selection import FoldCache, HyperparameterSearch
+
+        self.predictions = None
+        try:
+            folds = FoldCache(os.path.join(directory, 'folds'), n_splits=n_splits).build(self.data)
+            trials_path = os.path.join(directory, f"{model.lower().replace(' ', '_')}_trials.jsonl")
+            scores = HyperparameterSearch(folds, model, param_grid, trials_path, factor=factor,
+                                          min_fraction=min_fraction, scoring=scoring, n_jobs=n_jobs).run()
+            best_params = scores['params'].iloc[0]
+            self.search_results[model] = {'best_params': best_params, 'scores': scores}
+            return best_params
+        except Exception as e:
+            print(f"Error tuning {model}: {e}")
+
+    def evaluate_models(self, n_resamples=1000, confidence=0.95, seed=0):
         """
         Evaluate the models using appropriate metrics for regression.
+        
+        Each model predicts the test rows once; the predictions are cached in a
+        ``PredictionStore`` (``self.predictions``), from which MSE, MAE and R2, their
+        bootstrap confidence intervals and the per-Province and per-Gender metrics
+        (``self.segment_results``) are computed without predicting again.
+        
+        Parameters:
+        n_resamples (int): Number of bootstrap resamples of the test rows. 0 skips the intervals.
+        confidence (float): Confidence level of the intervals.
+        seed (int): Seed of the bootstrap.
         """
+        from evaluation import PredictionStore
+
         try:
+            if self.predictions is None:
+                self.predictions = PredictionStore(self.y_test, self.test_segments)
             for name, model in self.models.items():
-                y_pred = model.predict(self.X_test)
-                mse = mean_squared_error(self.y_test, y_pred)
-                mae = mean_absolute_error(self.y_test, y_pred)
-                r2 = r2_score(self.y_test, y_pred)
-                self.results[name] = {'MSE': mse, 'MAE': mae, 'R2': r2}
+                self.predictions.predict(name, model, self.X_test)
+            names = list(self.models)
+            metrics = self.predictions.metrics(names)
+            if n_resamples:
+                metrics = metrics.join(self.predictions.bootstrap_intervals(
+                    names, n_resamples=n_resamples, confidence=confidence, seed=seed))
+            for name, row in metrics.iterrows():
+                self.results[name] = {key: float(value) for key, value in row.items()}
+            if self.test_segments is not None and len(self.test_segments.columns):
+                self.segment_results = self.predictions.segment_metrics(list(self.test_segments.columns), names)
         except Exception as e:
             print(f"Error evaluating models: {e}")
 
-    def feature_importance(self):
+    def feature_importance(self, sample_size=2000, background_size=200, strata='Province',
+                           output_path=None, html=False, html_dir=None, batch_size=20_000, n_jobs=1,
+                           approximate=None):
         """
         Analyze feature importance using SHAP values.
+        
+        XGBoost is explained exactly with its native contributions, the forests of
+        scikit-learn with SHAP's TreeExplainer (Saabas attributions unless ``approximate``
+        is False) and the linear model with its closed-form contributions, on a
+        sample of the test rows stratified by ``strata``. Rows are sampled by position, so
+        sparse design matrices work too; the sampled rows are explained as a dense block.
+        The mean absolute SHAP value of every feature and model is kept in
+        ``self.importances`` and, when ``output_path`` is given, written to it.
+        
+        Parameters:
+        sample_size (int): Number of test rows explained. Every test row when None.
+        background_size (int): Number of training rows used as the background distribution.
+        strata (str): Column of the data the samples are stratified by. None for simple random samples.
+        output_path (str): CSV file of the aggregated importances. Nothing is written when None.
+        html (bool): Also save an interactive SHAP force plot per model as 'shap_summary_<model>.html'.
+        html_dir (str): Directory of the force plots. Defaults to the directory of ``output_path``.
+        batch_size (int): Number of rows explained at a time.
+        n_jobs (int): Number of worker processes for the batches.
+        approximate (bool): Use fast Saabas attributions for tree models instead of exact SHAP values.
+            None approximates only the scikit-learn forests, whose deep trees make exact SHAP slow.
+
+        Raises:
+        ValueError: If ``html`` is set without ``html_dir`` or ``output_path``.
         """
+        import shap
+        from feature_attribution import importance_summary, shap_contributions, stratified_sample
+
+        if html and html_dir is None:
+            if output_path is None:
+                raise ValueError("html needs html_dir or output_path to place the force plots.")
+            html_dir = os.path.dirname(os.path.abspath(output_path))
         try:
+            def sample(X, rows, size):
+                labels = None if strata is None else self.data[strata].iloc[rows].reset_index(drop=True)
+                positions = stratified_sample(pd.RangeIndex(X.shape[0]), labels, size).to_numpy()
+                if isinstance(X, pd.DataFrame):
+                    return X.iloc[positions]
+                return pd.DataFrame(X[positions].toarray(), index=self.data.index[rows[positions]],
+                                    columns=self.encoder.feature_names_)
+
+            X_explain = sample(self.X_test, self.test_rows, sample_size)
+            background = sample(self.X_train, self.train_rows, background_size)
+            summaries = []
             for name, model in self.models.items():
-                explainer = shap.Explainer(model, self.X_train)
-                shap_values = explainer(self.X_test)
-                shap.summary_plot(shap_values, self.X_test, show=False)
-                shap.save_html(f'shap_summary_{name}.html', shap_values)
+                values, base_value = shap_contributions(model, X_explain, background, batch_size=batch_size,
+                                                        n_jobs=n_jobs, approximate=approximate)
+                summaries.append(importance_summary(values, X_explain.columns).assign(model=name))
+                if html:
+                    plot = shap.plots.force(base_value, values, X_explain, show=False)
+                    shap.save_html(os.path.join(html_dir, f'shap_summary_{name}.html'), plot)
+            self.importances = pd.concat(summaries, ignore_index=True)[
+                ['model', 'feature', 'mean_abs_shap', 'mean_shap', 'std_shap']]
+            if output_path is not None:
+                self.importances.to_csv(output_path, index=False)
+            return self.importances
         except Exception as e:
             print(f"Error analyzing feature importance: {e}")
 
@@ -128,20 +370,47 @@ class StatisticalModeling:
                 print(f"MSE: {metrics['MSE']}")
                 print(f"MAE: {metrics['MAE']}")
                 print(f"R2: {metrics['R2']}")
+                if 'R2_ci_lower' in metrics:
+                    print("CI: " + ", ".join(f"{key} [{metrics[f'{key}_ci_lower']:.4g}, {metrics[f'{key}_ci_upper']:.4g}]"
+                                             for key in ('MSE', 'MAE', 'R2')))
+                if name in self.training_report:
+                    training = self.training_report[name]
+                    print(f"Training: {training['wall_seconds']:.2f}s wall, {training['cpu_seconds']:.2f}s CPU, "
+                          f"{training['fit_rss_mb']:.0f} MiB RSS growth during the fit")
                 print("-" * 30)
         except Exception as e:
             print(f"Error reporting results: {e}")
 
+    def save_artifacts(self, directory, version=None):
+        """
+        Save the fitted encoder and models as versioned artifacts for scoring.
+        
+        The data must be prepared with ``target_features=False``, as new policies have no claims.
+        
+        Parameters:
+        directory (str): Root directory of the artifact versions.
+        version (str): Version name. A timestamp is used when None.
+        
+        Returns:
+        str: The path of the saved version, loadable with ``model_artifacts.load_artifacts``.
+        """
+        from model_artifacts import save_artifacts
+
+        try:
+            return save_artifacts(self.encoder, self.models, directory, version=version, metrics=self.results)
+        except Exception as e:
+            print(f"Error saving artifacts: {e}")
+
 # Example usage
 if __name__ == "__main__":
     try:
-        data = pd.read_csv('../src/data/cleaned_data.csv', low_memory=False)
-        model = StatisticalModeling(data)
-        model.prepare_data()
+        model = StatisticalModeling.from_file('../src/data/cleaned_data.csv', cache_dir='../src/data/cache')
+        model.prepare_data(target_features=False)
         model.build_models()
         model.evaluate_models()
-        model.feature_importance()
+        model.feature_importance(output_path='../src/data/shap_importance.csv')
         model.report_results()
+        model.save_artifacts('../models')
         print("Modeling complete.")
     except FileNotFoundError as e:
         print(f"Data file not found: {e}")
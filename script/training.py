@@ -0,0 +1,151 @@
+# training.py
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from xgboost import XGBRegressor
+from instrumentation import RSSSampler, peak_rss_mb
+from parallel_testing import MemmapColumns
+
+
+def candidate_models(n_jobs=-1, tree_method='hist', n_estimators=None, early_stopping_rounds=None):
+    """
+    Build the untrained candidate models.
+
+    Parameters:
+    n_jobs (int): Threads used by the random forest and XGBoost (-1 for every core).
+    tree_method (str): XGBoost tree method; 'hist' bins features into histograms.
+    n_estimators (int): Number of boosting rounds of XGBoost. XGBoost's default when None.
+    early_stopping_rounds (int): Rounds without validation improvement before XGBoost stops.
+
+    Returns:
+    dict: Model name to estimator.
+    """
+    xgb_params = {'random_state': 42, 'tree_method': tree_method, 'early_stopping_rounds': early_stopping_rounds,
+                  'n_jobs': os.cpu_count() if n_jobs == -1 else n_jobs}
+    if n_estimators is not None:
+        xgb_params['n_estimators'] = n_estimators
+    return {
+        'Linear Regression': LinearRegression(),
+        'Random Forest': RandomForestRegressor(random_state=42, n_jobs=n_jobs),
+        'XGBoost': XGBRegressor(**xgb_params),
+    }
+
+
+def validate_early_stopping(early_stopping_rounds, validation_fraction):
+    """
+    Check the early-stopping options before any model is trained.
+
+    Raises:
+    ValueError: If ``validation_fraction`` is outside [0, 1), or if early stopping is
+        requested without validation rows.
+    """
+    if not 0 <= (validation_fraction or 0) < 1:
+        raise ValueError(f"validation_fraction must be in [0, 1), got {validation_fraction}")
+    if early_stopping_rounds is not None and not validation_fraction:
+        raise ValueError("early_stopping_rounds needs a validation_fraction above 0 to hold out validation rows")
+
+
+def fit_and_measure(name, estimator, X_train, y_train, fit_params=None):
+    """
+    Fit one estimator and measure the wall time, CPU time and memory of the fit.
+
+    Returns:
+    tuple: The name, the fitted estimator and a report dict with 'wall_seconds',
+    'cpu_seconds', 'fit_rss_mb' (the peak resident memory of the fit above the memory
+    before it, see ``RSSSampler``), 'peak_rss_mb' (the high-water mark of the whole
+    process, including earlier work) and, for early-stopped models, 'best_iteration'.
+    """
+    wall, cpu = time.perf_counter(), time.process_time()
+    with RSSSampler() as memory:
+        estimator.fit(X_train, y_train, **(fit_params or {}))
+    report = {'wall_seconds': time.perf_counter() - wall, 'cpu_seconds': time.process_time() - cpu,
+              'fit_rss_mb': memory.growth_mb, 'peak_rss_mb': peak_rss_mb(),
+              'rows': X_train.shape[0], 'features': X_train.shape[1]}
+    if getattr(estimator, 'best_iteration', None) is not None and fit_params and 'eval_set' in fit_params:
+        report['best_iteration'] = int(estimator.best_iteration)
+    return name, estimator, report
+
+
+def _take(X, rows):
+    """Select rows by position from a DataFrame, Series, array or sparse matrix."""
+    return X.iloc[rows] if isinstance(X, (pd.DataFrame, pd.Series)) else X[rows]
+
+
+def _fit_task(name, estimator, X_train, y_train, validation_rows):
+    """
+    Fit one estimator, holding out ``validation_rows`` as the evaluation set of
+    early-stopped XGBoost models.
+    """
+    fit_params = None
+    if validation_rows is not None and isinstance(estimator, XGBRegressor) \
+            and estimator.get_params().get('early_stopping_rounds') is not None:
+        fit_rows, valid_rows = validation_rows
+        fit_params = {'eval_set': [(_take(X_train, valid_rows), _take(y_train, valid_rows))], 'verbose': False}
+        X_train, y_train = _take(X_train, fit_rows), _take(y_train, fit_rows)
+    return fit_and_measure(name, estimator, X_train, y_train, fit_params)
+
+
+def _fit_from_memmap(name, estimator, paths, columns, validation_rows):
+    """Worker entry point: open the shared training arrays and fit one estimator."""
+    X_train = pd.DataFrame(np.load(paths['X_train'], mmap_mode='r'), columns=columns, copy=False)
+    y_train = np.load(paths['y_train'], mmap_mode='r')
+    return _fit_task(name, estimator, X_train, y_train, validation_rows)
+
+
+def train_models(estimators, X_train, y_train, validation_fraction=0.1, parallel=False, max_workers=None,
+                 random_state=42):
+    """
+    Train candidate models serially or concurrently, one worker process per model.
+
+    XGBoost models configured with ``early_stopping_rounds`` are fitted on all but a
+    held-out ``validation_fraction`` of the rows, which serves as their evaluation set;
+    the other models use every row. In parallel mode dense training data is shared with
+    the workers as memory-mapped arrays instead of being pickled, and each model is
+    fitted in a fresh process so its process high-water mark is its own.
+
+    Parameters:
+    estimators (dict): Model name to untrained estimator.
+    X_train: The training features (DataFrame, array or sparse matrix).
+    y_train: The training target.
+    validation_fraction (float): Share of the rows held out for early stopping.
+    parallel (bool): Train the models concurrently.
+    max_workers (int): Number of worker processes. One per model when None.
+    random_state (int): Seed of the validation split.
+
+    Returns:
+    tuple: Dicts of model name to fitted model and to training report, in input order.
+
+    Raises:
+    ValueError: If an XGBoost model uses early stopping and no rows are held out.
+    """
+    for estimator in estimators.values():
+        if isinstance(estimator, XGBRegressor):
+            validate_early_stopping(estimator.get_params().get('early_stopping_rounds'), validation_fraction)
+    rows = np.random.default_rng(random_state).permutation(X_train.shape[0])
+    n_valid = int(round(len(rows) * validation_fraction)) if validation_fraction else 0
+    validation_rows = (np.sort(rows[n_valid:]), np.sort(rows[:n_valid])) if n_valid else None
+
+    if not parallel:
+        results = [_fit_task(name, estimator, X_train, y_train, validation_rows)
+                   for name, estimator in estimators.items()]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers or len(estimators), max_tasks_per_child=1) as executor:
+            if isinstance(X_train, pd.DataFrame):
+                arrays = {'X_train': X_train.to_numpy(), 'y_train': np.asarray(y_train)}
+                with MemmapColumns(arrays) as shared:
+                    futures = [executor.submit(_fit_from_memmap, name, estimator, shared.paths,
+                                               list(X_train.columns), validation_rows)
+                               for name, estimator in estimators.items()]
+                    results = [future.result() for future in futures]
+            else:
+                futures = [executor.submit(_fit_task, name, estimator, X_train, y_train, validation_rows)
+                           for name, estimator in estimators.items()]
+                results = [future.result() for future in futures]
+    models = {name: estimator for name, estimator, _ in results}
+    reports = {name: report for name, _, report in results}
+    return models, reports
@@ -0,0 +1,38 @@
+# synthetic.py
+#
+# Small synthetic datasets shared by the test modules.
+
+import numpy as np
+import pandas as pd
+
+
+def make_policies(rows, seed=0):
+    """Build a small synthetic cleaned dataset."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Province': rng.choice(['Gauteng', 'Western Cape', 'Limpopo'], rows),
+        'PostalCode': rng.integers(1000, 1030, rows),
+        'Gender': rng.choice(['Male', 'Female'], rows),
+        'kilowatts': rng.normal(90, 20, rows),
+        'SumInsured': rng.gamma(2, 50000, rows),
+        'TotalPremium': rng.gamma(2, 50, rows),
+        'TotalClaims': np.where(rng.random(rows) < 0.9, 0, rng.exponential(1000, rows)),
+    })
+
+
+def make_month(month, rows, seed):
+    """Build a cleaned-looking monthly slice with every critical column filled."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'TransactionMonth': f"{month}-01 00:00:00",
+        'Province': rng.choice(['Gauteng', 'Western Cape', 'Limpopo'], rows),
+        'PostalCode': rng.choice([2000, 7100, 699], rows),
+        'Gender': rng.choice(['Male', 'Female'], rows),
+        'TotalPremium': rng.gamma(2.0, 50.0, rows),
+        'TotalClaims': np.where(rng.random(rows) < 0.8, 0.0, rng.exponential(500.0, rows)),
+        'NewVehicle': 'More than 6 months', 'Bank': 'ABSA', 'AccountType': 'Current account',
+        'MaritalStatus': 'Single', 'mmcode': 44069150.0, 'VehicleType': 'Passenger Vehicle',
+        'make': 'TOYOTA', 'VehicleIntroDate': '6/2002', 'NumberOfDoors': 4.0, 'bodytype': 'S/D',
+        'kilowatts': 75.0, 'cubiccapacity': 1600.0, 'Cylinders': 4.0, 'Model': 'COROLLA',
+        'CapitalOutstanding': 0.0
+    })
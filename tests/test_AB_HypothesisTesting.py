@@ -1,12 +1,14 @@
 import sys
 import os
 import unittest
+import numpy as np
 import pandas as pd
+import scipy.stats as stats
 
 # Adjust the path to include the directory where AB_hypothesis_testing.py is located
 sys.path.append(os.path.abspath('../script'))
 
-from AB_hypothesis_testing import ABHypothesisTesting
+from AB_hypothesis_testing import ABHypothesisTesting, GroupMoments, adjust_pvalues
 
 class TestABHypothesisTesting(unittest.TestCase):
     @classmethod
@@ -76,5 +78,66 @@ class TestABHypothesisTesting(unittest.TestCase):
         except Exception as e:
             self.fail(f"test_t_test raised an exception: {e}")
 
+    def test_run_batch_matches_single_tests(self):
+        """
+        Test that run_batch reproduces the single-test p-values.
+        """
+        results = self.analyzer.run_batch(
+            chi_squared_specs=[('Province', 'TotalClaims'), ('Gender', 'TotalClaims')],
+            t_test_specs=[('PostalCode', [('X', 'Y')], 'TotalPremium'), ('Gender', None, 'TotalClaims')],
+            correction=None)
+        self.assertEqual(len(results), 4)
+        self.assertAlmostEqual(results.loc[0, 'p_value'], self.analyzer.chi_squared_test('Province', 'TotalClaims'))
+        self.assertAlmostEqual(results.loc[1, 'p_value'], self.analyzer.chi_squared_test('Gender', 'TotalClaims'))
+        expected = stats.ttest_ind(self.df.loc[self.df['PostalCode'] == 'X', 'TotalPremium'],
+                                   self.df.loc[self.df['PostalCode'] == 'Y', 'TotalPremium']).pvalue
+        self.assertAlmostEqual(results.loc[2, 'p_value'], expected)
+        self.assertEqual((results.loc[3, 'group_a'], results.loc[3, 'group_b']), ('Female', 'Male'))
+
+    def test_adjust_pvalues(self):
+        """
+        Test the multiple-testing corrections against hand-computed values.
+        """
+        p_values = np.array([0.01, 0.04, 0.03, np.nan])
+        np.testing.assert_allclose(adjust_pvalues(p_values, 'bonferroni')[:3], [0.03, 0.12, 0.09])
+        np.testing.assert_allclose(adjust_pvalues(p_values, 'holm')[:3], [0.03, 0.06, 0.06])
+        np.testing.assert_allclose(adjust_pvalues(p_values, 'fdr_bh')[:3], [0.03, 0.04, 0.04])
+        self.assertTrue(np.isnan(adjust_pvalues(p_values)[3]))
+
+    def test_run_parallel_is_deterministic(self):
+        """
+        Test that run_parallel gives the same ordered results in-process and in a pool.
+        """
+        rng = np.random.default_rng(0)
+        data = pd.DataFrame({'PostalCode': rng.integers(0, 4, 400),
+                             'TotalClaims': np.where(rng.random(400) < 0.7, 0.0, rng.exponential(100.0, 400))})
+        analyzer = ABHypothesisTesting(data)
+        specs = [(test, 'PostalCode', (a, a + 1), 'TotalClaims')
+                 for a in range(3) for test in ('welch', 'fisher', 'permutation')]
+        serial = analyzer.run_parallel(specs, n_jobs=1, n_permutations=500)
+        pooled = analyzer.run_parallel(specs, n_jobs=2, n_permutations=500)
+        pd.testing.assert_frame_equal(serial, pooled)
+        expected = stats.ttest_ind(data.loc[data['PostalCode'] == 0, 'TotalClaims'],
+                                   data.loc[data['PostalCode'] == 1, 'TotalClaims'], equal_var=False).pvalue
+        self.assertAlmostEqual(serial.loc[0, 'p_value'], expected)
+        self.assertTrue(0 < serial.loc[2, 'p_value'] <= 1)
+
+    def test_t_test_from_chunks(self):
+        """
+        Test that the streaming t-test matches scipy on the full data.
+        """
+        rng = np.random.default_rng(1)
+        data = pd.DataFrame({'Gender': rng.choice(['Male', 'Female'], 1000),
+                             'TotalClaims': rng.lognormal(3, 1, 1000) + 1e6})
+        male = data.loc[data['Gender'] == 'Male', 'TotalClaims']
+        female = data.loc[data['Gender'] == 'Female', 'TotalClaims']
+        for equal_var in (True, False):
+            chunks = (data.iloc[start:start + 128] for start in range(0, len(data), 128))
+            p_value = self.analyzer.t_test_from_chunks(chunks, 'Gender', 'Male', 'Female', 'TotalClaims', equal_var)
+            self.assertAlmostEqual(p_value, stats.ttest_ind(male, female, equal_var=equal_var).pvalue)
+        summary = GroupMoments('Gender', 'TotalClaims').update(data).summary()
+        self.assertAlmostEqual(summary.loc['Male', 'sum'], male.sum(), places=3)
+        self.assertAlmostEqual(summary.loc['Male', 'var'], male.var(), places=6)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.abspath('../script'))
+from AB_hypothesis_testing import ABHypothesisTesting, GroupMoments
+from aggregate_cube import AggregateCube
+from synthetic import make_month
+
+class TestAggregateCube(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.data = pd.concat([make_month('2015-03', 500, seed=0), make_month('2015-04', 500, seed=1)],
+                              ignore_index=True)
+        self.data['make'] = np.random.default_rng(2).choice(['TOYOTA', 'VW', 'FORD'], len(self.data))
+        self.cube = AggregateCube.from_data(self.data)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_rollup_matches_rows(self):
+        rolled = self.cube.rollup(['Province'])
+        grouped = self.data.groupby('Province')
+        np.testing.assert_allclose(rolled['TotalClaims'], grouped['TotalClaims'].sum())
+        np.testing.assert_allclose(rolled['TotalPremium_var'], grouped['TotalPremium'].var())
+        np.testing.assert_allclose(rolled['LossRatio'],
+                                   grouped['TotalClaims'].sum() / grouped['TotalPremium'].sum())
+        total = self.cube.rollup()
+        self.assertEqual(total['count'].iloc[0], len(self.data))
+
+    def test_drill_down_with_filters(self):
+        drilled = self.cube.rollup(['month', 'make'], Province='Gauteng')
+        rows = self.data[self.data['Province'] == 'Gauteng'].assign(month=lambda d: d['TransactionMonth'].str[:7])
+        expected = rows.groupby(['month', 'make'])['TotalPremium'].sum()
+        np.testing.assert_allclose(drilled['TotalPremium'], expected)
+
+    def test_chunks_and_saved_cube_match(self):
+        chunked = AggregateCube.from_chunks([self.data.iloc[:300], self.data.iloc[300:]])
+        path = os.path.join(self.tmp_dir, 'cube.parquet')
+        chunked.save(path)
+        loaded = AggregateCube.load(path)
+        self.assertEqual(loaded.dimensions, self.cube.dimensions)
+        pd.testing.assert_frame_equal(loaded.rollup(['PostalCode', 'Gender']), self.cube.rollup(['PostalCode', 'Gender']))
+
+    def test_hypothesis_inputs_match_rows(self):
+        moments = GroupMoments('Province', 'TotalClaims').update(self.data)
+        from_cube = self.cube.group_moments('Province')
+        np.testing.assert_allclose(from_cube.t_test('Gauteng', 'Limpopo'), moments.t_test('Gauteng', 'Limpopo'))
+
+        table = self.cube.contingency_table('Gender')
+        expected = pd.crosstab(self.data['Gender'], self.data['TotalClaims'] > 0)
+        np.testing.assert_array_equal(table['positive'], expected[True])
+
+        results = self.cube.hypothesis_results(chi_squared_features=['Gender'], t_test_features=['Province'])
+        batch = ABHypothesisTesting(self.data.assign(HasClaim=self.data['TotalClaims'] > 0)).run_batch(
+            chi_squared_specs=[('Gender', 'HasClaim')], t_test_specs=[('Province', None, 'TotalClaims')])
+        np.testing.assert_allclose(results['p_value'], batch['p_value'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+import sys
+import os
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.abspath('../script'))
+from cleaning import strip_string_columns, clamp_extreme_values
+
+class TestCleaning(unittest.TestCase):
+    def setUp(self):
+        self.data = pd.DataFrame({
+            'Province': [' Gauteng', 'Gauteng ', None, 'Limpopo'],
+            'make': pd.Categorical([' VW', 'VW', 'FORD ', 'FORD ']),
+            'Mixed': ['  a ', 1, np.nan, 'b'],
+            'TotalPremium': [1e12, -1e11, np.inf, 5.0],
+            'Cylinders': [4, 6, 8, 4]
+        })
+
+    def test_strip_string_columns_matches_applymap(self):
+        expected = self.data.map(lambda x: x.strip() if isinstance(x, str) else x)
+        result = strip_string_columns(self.data)
+        pd.testing.assert_frame_equal(result.astype({'make': object}), expected.astype({'make': object}))
+        self.assertEqual(list(result['make'].cat.categories), ['FORD', 'VW'])
+        self.assertEqual(self.data.loc[0, 'Province'], ' Gauteng')
+
+    def test_strip_string_columns_all_missing(self):
+        data = pd.DataFrame({'a': [None, None], 'b': [' x', None]})
+        result = strip_string_columns(data)
+        self.assertTrue(result['a'].isna().all())
+        self.assertEqual(result['b'].tolist(), ['x', None])
+
+    def test_clamp_extreme_values(self):
+        result = clamp_extreme_values(self.data[['TotalPremium', 'Cylinders']])
+        self.assertEqual(result['TotalPremium'].tolist(), [0.0, 0.0, 0.0, 5.0])
+        self.assertEqual(result['Cylinders'].tolist(), [4, 6, 8, 4])
+        self.assertEqual(self.data.loc[0, 'TotalPremium'], 1e12)
+
+if __name__ == '__main__':
+    unittest.main()
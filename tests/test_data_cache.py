@@ -0,0 +1,67 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import pandas as pd
+sys.path.append(os.path.abspath('../script'))
+from data_cache import DataCache
+from statistical_modeling import StatisticalModeling
+
+class TestDataCache(unittest.TestCase):
+    def setUp(self):
+        """Create a temporary source file and cache directory."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.source = os.path.join(self.tmp_dir, 'cleaned_data.csv')
+        self.data = pd.DataFrame({
+            'Province': ['Gauteng', 'Limpopo', 'Gauteng'],
+            'PostalCode': [2000, 1000, 2000],
+            'Gender': ['Male', 'Female', 'Male'],
+            'make': ['TOYOTA', 'VW', 'FORD'],
+            'kilowatts': [75.0, 100.0, 120.0],
+            'CapitalOutstanding': ['119300', '0', 'unknown'],
+            'TotalPremium': [100.0, 200.0, 300.0],
+            'TotalClaims': [0.0, 50.0, 0.0]
+        })
+        self.data.to_csv(self.source, index=False)
+        self.cache = DataCache(os.path.join(self.tmp_dir, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_key_depends_on_content_and_config(self):
+        key = self.cache.key(self.source, {'stage': 'raw'})
+        self.assertEqual(key, self.cache.key(self.source, {'stage': 'raw'}))
+        self.assertNotEqual(key, self.cache.key(self.source, {'stage': 'cleaned'}))
+        self.data.head(2).to_csv(self.source, index=False)
+        self.assertNotEqual(key, self.cache.key(self.source, {'stage': 'raw'}))
+
+    def test_get_or_create_parses_once(self):
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return pd.read_csv(self.source)
+
+        first = self.cache.get_or_create(self.source, loader)
+        second = self.cache.get_or_create(self.source, loader, columns=['TotalPremium'])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(first), 3)
+        self.assertEqual(list(second.columns), ['TotalPremium'])
+
+    def test_statistical_modeling_from_file_projects_model_columns(self):
+        cache_dir = os.path.join(self.tmp_dir, 'model_cache')
+        StatisticalModeling.from_file(self.source, cache_dir=cache_dir)
+        model = StatisticalModeling.from_file(self.source, cache_dir=cache_dir)
+        self.assertNotIn('make', model.data.columns)
+        self.assertIn('Province', model.data.columns)
+        self.assertIn('kilowatts', model.data.columns)
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+        # Text columns holding numbers are features too
+        self.assertIn('CapitalOutstanding', model.data.columns)
+        feather_path = os.path.join(self.tmp_dir, 'cleaned_data.feather')
+        self.data.to_feather(feather_path)
+        self.assertIn('CapitalOutstanding', StatisticalModeling.from_file(feather_path).data.columns)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,11 +2,12 @@ import unittest
 import pandas as pd
 import sys
 import os
+import shutil
 
 # Adjust the path to include the directory where AB_hypothesis_testing.py is located
 sys.path.append(os.path.abspath('../script'))
 
-from data_preprocessor import DataPreprocessor
+from data_preprocessing import DataPreprocessor
 
 class TestDataPreprocessor(unittest.TestCase):
     @classmethod
@@ -79,5 +80,51 @@ class TestDataPreprocessor(unittest.TestCase):
         self.assertTrue(os.path.exists(cleaned_file))
         os.remove(cleaned_file)
 
+    def test_load_data_chunked(self):
+        """Test streaming load with the declared schema and per-chunk cleaning."""
+        chunked_file = "test_data_chunked.csv"
+        self.sample_data.assign(Province=['Gauteng', 'Gauteng', 'Limpopo', ' Limpopo '],
+                                PostalCode=[2000, 2000, 1000, 1000],
+                                TransactionMonth='2015-03-01 00:00:00').to_csv(chunked_file, sep='|', index=False)
+        try:
+            preprocessor = DataPreprocessor(file_path=chunked_file)
+            preprocessor.load_data(chunksize=2)
+            data = preprocessor.data
+            self.assertEqual(len(data), 1)
+            self.assertEqual(data['Province'].dtype, 'category')
+            self.assertEqual(list(data['Province'].cat.categories), ['Limpopo'])
+            self.assertEqual(data['TotalPremium'].dtype, 'int16')
+            self.assertTrue(pd.api.types.is_datetime64_any_dtype(data['TransactionMonth']))
+        finally:
+            os.remove(chunked_file)
+
+    def test_load_data_chunked_fills_with_file_mode(self):
+        """Test that chunks are imputed with the mode of the whole file, even chunks without values."""
+        chunked_file = "test_data_modes.csv"
+        rows = self.sample_data.iloc[[3, 3, 3, 3]].reset_index(drop=True)
+        rows['NewVehicle'] = ['No', 'No', None, None]
+        rows.assign(TotalPremium=[1234567.89, 1, 2, 3]).to_csv(chunked_file, sep='|', index=False)
+        try:
+            preprocessor = DataPreprocessor(file_path=chunked_file)
+            preprocessor.load_data(chunksize=2)
+            data = preprocessor.data
+            self.assertEqual(data['NewVehicle'].tolist(), ['No'] * 4)
+            self.assertEqual(data['TotalPremium'].dtype, 'float64')
+            self.assertEqual(data['TotalPremium'].iloc[0], 1234567.89)
+        finally:
+            os.remove(chunked_file)
+
+    def test_load_data_cached(self):
+        """Test that a cached load returns the same data and supports column projection."""
+        cache_dir = "test_cache"
+        try:
+            self.preprocessor.load_data(cache_dir=cache_dir)
+            self.preprocessor.load_data(cache_dir=cache_dir, columns=[self.preprocessor.data.columns[0]])
+            self.assertEqual(len(self.preprocessor.data), 4)
+            self.assertEqual(len(self.preprocessor.data.columns), 1)
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
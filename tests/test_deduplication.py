@@ -0,0 +1,94 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.abspath('../script'))
+from data_preprocessing import DATE_FORMATS, DataPreprocessor, apply_schema
+from deduplication import FingerprintIndex, row_fingerprints
+from incremental import IncrementalStore
+from synthetic import make_month
+
+class TestDeduplication(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.data = make_month('2015-03', 300, seed=0)
+        self.data['PolicyID'] = np.arange(300)
+        self.path = os.path.join(self.tmp_dir, 'data.txt')
+        # 50 exact duplicates spread over the file
+        pd.concat([self.data, self.data.iloc[::6]]).to_csv(self.path, sep='|', index=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_fingerprints_ignore_chunk_typing(self):
+        data = self.data.assign(kilowatts=np.random.default_rng(1).normal(90, 20, len(self.data)))
+        typed = apply_schema(data.copy())
+        self.assertEqual(typed['kilowatts'].dtype, np.float32)
+        np.testing.assert_array_equal(row_fingerprints(typed, date_formats=DATE_FORMATS),
+                                      row_fingerprints(data, date_formats=DATE_FORMATS))
+        keys = row_fingerprints(self.data, subset=['PolicyID', 'TransactionMonth'])
+        self.assertEqual(len(np.unique(keys)), len(self.data))
+
+    def test_fingerprint_index(self):
+        index_path = os.path.join(self.tmp_dir, 'index.npy')
+        index = FingerprintIndex(index_path)
+        keep = index.filter(np.array([5, 3, 5, 9], dtype=np.uint64))
+        np.testing.assert_array_equal(keep, [True, True, False, True])
+        index.save()
+        loaded = FingerprintIndex(index_path)
+        np.testing.assert_array_equal(loaded.fingerprints, [3, 5, 9])
+        np.testing.assert_array_equal(loaded.filter(np.array([9, 1], dtype=np.uint64)), [False, True])
+
+    def test_check_duplicates_across_loads(self):
+        index_path = os.path.join(self.tmp_dir, 'index.npy')
+        preprocessor = DataPreprocessor(self.path)
+        preprocessor.load_data()
+        self.assertEqual(preprocessor.check_duplicates(drop=True, index_path=index_path), 50)
+        self.assertEqual(len(preprocessor.data), 300)
+        # A reload of the same rows, parsed chunk by chunk, is entirely duplicated
+        chunked = DataPreprocessor(self.path)
+        chunked.data = pd.concat(chunked.iter_chunks(chunksize=70, clean=False))
+        keys_path = os.path.join(self.tmp_dir, 'keys.npy')
+        for _ in range(2):
+            # Checking without dropping leaves the index unchanged
+            self.assertEqual(chunked.check_duplicates(subset=['PolicyID', 'TransactionMonth'],
+                                                      index_path=keys_path), 50)
+        self.assertFalse(os.path.exists(keys_path))
+        self.assertEqual(chunked.check_duplicates(index_path=index_path), 350)
+
+    def test_iter_chunks_drops_duplicates(self):
+        chunks = DataPreprocessor(self.path).iter_chunks(chunksize=70, drop_duplicates=True)
+        data = pd.concat(list(chunks))
+        self.assertEqual(len(data), 300)
+        self.assertEqual(sorted(data['PolicyID']), list(range(300)))
+
+    def test_incremental_store_deduplicates_loads(self):
+        store = IncrementalStore(os.path.join(self.tmp_dir, 'store'), chunksize=80, deduplicate=True,
+                                 duplicate_subset=['PolicyID', 'TransactionMonth'])
+        store.append_month(self.path)
+        late = make_month('2015-03', 40, seed=5).assign(PolicyID=np.arange(290, 330))
+        late_path = os.path.join(self.tmp_dir, 'late.txt')
+        late.to_csv(late_path, sep='|', index=False)
+        self.assertEqual(store.append_month(late_path), ['2015-03'])
+        self.assertEqual(sorted(store.load()['PolicyID']), list(range(330)))
+        self.assertEqual(store.loss_ratios()['count'].sum(), 330)
+        self.assertEqual(len(store.fingerprint_index()), 330)
+
+    def test_incremental_store_rebuilds_missing_fingerprints(self):
+        root = os.path.join(self.tmp_dir, 'store')
+        IncrementalStore(root, chunksize=80).append_month(self.path)
+        store = IncrementalStore(root, chunksize=80, deduplicate=True,
+                                 duplicate_subset=['PolicyID', 'TransactionMonth'])
+        late = make_month('2015-03', 40, seed=5).assign(PolicyID=np.arange(290, 330))
+        late_path = os.path.join(self.tmp_dir, 'late.txt')
+        late.to_csv(late_path, sep='|', index=False)
+        store.append_month(late_path)
+        self.assertEqual(set(store.load()['PolicyID']), set(range(330)))
+        self.assertEqual(len(store.load()), 350 + 30)
+        self.assertEqual(len(store.fingerprint_index()), 330)
+
+if __name__ == '__main__':
+    unittest.main()
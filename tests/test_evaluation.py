@@ -0,0 +1,98 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+sys.path.append(os.path.abspath('../script'))
+from evaluation import PredictionStore
+from statistical_modeling import StatisticalModeling
+from synthetic import make_policies
+
+class CountingModel:
+    """Predicts a noisy copy of the target and counts its calls."""
+    def __init__(self, y, noise, seed):
+        self.values = np.asarray(y) + np.random.default_rng(seed).normal(0, noise, len(y))
+        self.calls = 0
+
+    def predict(self, X):
+        self.calls += 1
+        return self.values
+
+class TestPredictionStore(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.y = rng.gamma(2, 50, 800)
+        self.segments = pd.DataFrame({'Province': rng.choice(['Gauteng', 'Limpopo'], 800),
+                                      'Gender': rng.choice(['Male', 'Female'], 800)})
+        self.models = {'good': CountingModel(self.y, 10, 1), 'bad': CountingModel(self.y, 60, 2)}
+        self.store = PredictionStore(self.y, self.segments)
+        for name, model in self.models.items():
+            self.store.predict(name, model, None)
+
+    def test_metrics_and_cache(self):
+        metrics = self.store.metrics()
+        for name, model in self.models.items():
+            predictions = model.values.astype(np.float32)
+            self.assertAlmostEqual(metrics.loc[name, 'MSE'], mean_squared_error(self.y, predictions), places=6)
+            self.assertAlmostEqual(metrics.loc[name, 'MAE'], mean_absolute_error(self.y, predictions), places=6)
+            self.assertAlmostEqual(metrics.loc[name, 'R2'], r2_score(self.y, predictions), places=6)
+            self.store.predict(name, model, None)
+            self.assertEqual(model.calls, 1)
+
+    def test_segment_metrics(self):
+        segments = self.store.segment_metrics().set_index(['model', 'segment', 'group'])
+        mask = (self.segments['Gender'] == 'Female').to_numpy()
+        predictions = self.models['bad'].values.astype(np.float32)[mask]
+        row = segments.loc[('bad', 'Gender', 'Female')]
+        self.assertEqual(row['n'], mask.sum())
+        self.assertAlmostEqual(row['MAE'], mean_absolute_error(self.y[mask], predictions), places=6)
+        self.assertAlmostEqual(row['R2'], r2_score(self.y[mask], predictions), places=6)
+
+    def test_metrics_of_large_targets(self):
+        offset = 1e8
+        store = PredictionStore(self.y + offset, self.segments)
+        store.predict('bad', CountingModel(self.y + offset, 60, 2), None)
+        predictions = store.predictions['bad']
+        mask = (self.segments['Gender'] == 'Female').to_numpy()
+        row = store.segment_metrics(['Gender']).set_index('group').loc['Female']
+        self.assertAlmostEqual(row['R2'], r2_score(self.y[mask] + offset, predictions[mask]), places=6)
+        intervals = store.bootstrap_intervals(n_resamples=300, seed=1)
+        r2 = r2_score(self.y + offset, predictions)
+        self.assertLess(intervals.loc['bad', 'R2_ci_lower'], r2)
+        self.assertLess(r2, intervals.loc['bad', 'R2_ci_upper'])
+
+    def test_bootstrap_intervals_and_persistence(self):
+        intervals = self.store.bootstrap_intervals(n_resamples=300, seed=1)
+        metrics = self.store.metrics()
+        for metric in ['MSE', 'MAE', 'R2']:
+            self.assertTrue((intervals[f"{metric}_ci_lower"] < metrics[metric]).all())
+            self.assertTrue((metrics[metric] < intervals[f"{metric}_ci_upper"]).all())
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            self.store.save(tmp_dir)
+            loaded = PredictionStore.load(tmp_dir)
+            pd.testing.assert_frame_equal(loaded.bootstrap_intervals(n_resamples=300, seed=1), intervals)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+class TestEvaluateModels(unittest.TestCase):
+    def test_evaluate_models(self):
+        modeling = StatisticalModeling(make_policies(1200))
+        modeling.prepare_data()
+        modeling.build_models(n_jobs=1)
+        modeling.evaluate_models(n_resamples=200)
+        y_pred = modeling.models['XGBoost'].predict(modeling.X_test)
+        self.assertAlmostEqual(modeling.results['XGBoost']['MAE'], mean_absolute_error(modeling.y_test, y_pred),
+                               places=4)
+        self.assertLess(modeling.results['XGBoost']['R2_ci_lower'], modeling.results['XGBoost']['R2'])
+        expected = modeling.data.loc[modeling.y_test.index, 'Province'].reset_index(drop=True)
+        pd.testing.assert_series_equal(modeling.test_segments['Province'], expected)
+        self.assertEqual(set(modeling.segment_results['segment']), {'Province', 'Gender'})
+        modeling.build_models(n_jobs=1, n_estimators=10)
+        self.assertIsNone(modeling.predictions)
+
+if __name__ == '__main__':
+    unittest.main()
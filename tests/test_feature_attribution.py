@@ -0,0 +1,81 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.abspath('../script'))
+from feature_attribution import shap_contributions, stratified_sample
+from statistical_modeling import StatisticalModeling
+from synthetic import make_policies
+
+class TestFeatureAttribution(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.modeling = StatisticalModeling(make_policies(1500))
+        cls.modeling.prepare_data()
+        cls.modeling.build_models(n_jobs=1)
+
+    def test_contributions_are_additive(self):
+        X = self.modeling.X_test.iloc[:200]
+        for name, model in self.modeling.models.items():
+            values, base_value = shap_contributions(model, X, self.modeling.X_train, batch_size=64)
+            self.assertEqual(values.shape, X.shape)
+            np.testing.assert_allclose(values.sum(axis=1) + base_value, model.predict(X), rtol=1e-3, atol=1e-2,
+                                       err_msg=name)
+
+    def test_stratified_sample(self):
+        strata = pd.Series(['a'] * 900 + ['b'] * 100)
+        sample = stratified_sample(strata.index, strata, size=100)
+        self.assertEqual(len(sample), 100)
+        self.assertEqual((strata[sample] == 'b').sum(), 10)
+        self.assertTrue(sample.is_monotonic_increasing)
+
+    def test_feature_importance_output(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp_dir, 'importance.csv')
+            importances = self.modeling.feature_importance(sample_size=100, background_size=50, output_path=path)
+            saved = pd.read_csv(path)
+            self.assertEqual(list(saved.columns), ['model', 'feature', 'mean_abs_shap', 'mean_shap', 'std_shap'])
+            self.assertEqual(len(saved), 3 * self.modeling.X_test.shape[1])
+            self.assertEqual(len(importances), len(saved))
+            self.assertFalse(any(name.endswith('.html') for name in os.listdir('.')))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_feature_importance_html(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            with self.assertRaises(ValueError):
+                self.modeling.feature_importance(sample_size=20, background_size=20, html=True)
+            self.modeling.feature_importance(sample_size=20, background_size=20,
+                                             output_path=os.path.join(tmp_dir, 'importance.csv'), html=True)
+            self.assertEqual(sorted(name for name in os.listdir(tmp_dir) if name.endswith('.html')),
+                             sorted(f'shap_summary_{name}.html' for name in self.modeling.models))
+            self.assertFalse(any(name.endswith('.html') for name in os.listdir('.')))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_forests_are_approximated_by_default(self):
+        X = self.modeling.X_test.iloc[:50]
+        forest = self.modeling.models['Random Forest']
+        default, _ = shap_contributions(forest, X)
+        np.testing.assert_allclose(default, shap_contributions(forest, X, approximate=True)[0])
+        xgboost = self.modeling.models['XGBoost']
+        np.testing.assert_allclose(shap_contributions(xgboost, X)[0],
+                                   shap_contributions(xgboost, X, approximate=False)[0])
+
+    def test_feature_importance_sparse(self):
+        modeling = StatisticalModeling(make_policies(1500))
+        modeling.prepare_data(sparse=True)
+        modeling.build_models(n_jobs=1)
+        importances = modeling.feature_importance(sample_size=100, background_size=50)
+        self.assertFalse(os.path.exists('shap_importance.csv'))
+        self.assertEqual(len(importances), 3 * len(modeling.encoder.feature_names_))
+        self.assertEqual(set(importances['feature']), set(modeling.encoder.feature_names_))
+        self.assertTrue(np.isfinite(importances['mean_abs_shap']).all())
+
+if __name__ == '__main__':
+    unittest.main()
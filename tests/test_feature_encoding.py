@@ -0,0 +1,67 @@
+import unittest
+import sys
+import os
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.abspath('../script'))
+from feature_encoding import FeatureEncoder
+
+class TestFeatureEncoder(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(0)
+        cls.data = pd.DataFrame({
+            'Province': rng.choice(['Gauteng', 'Limpopo'], 50),
+            'PostalCode': rng.integers(0, 20, 50),
+            'Gender': rng.choice(['Male', 'Female'], 50),
+            'make': 'TOYOTA',
+            'CapitalOutstanding': rng.integers(0, 1000, 50).astype(str),
+            'kilowatts': np.r_[np.inf, 1e12, np.nan, rng.normal(90, 10, 47)],
+            'TotalPremium': rng.gamma(2.0, 50.0, 50),
+            'TotalClaims': np.r_[0.0, rng.exponential(100.0, 49)],
+        })
+
+    def test_dense_design_matrix(self):
+        encoder = FeatureEncoder()
+        X = encoder.fit_transform(self.data)
+        self.assertTrue((X.dtypes == np.float32).all())
+        self.assertEqual(list(X.columns), ['PostalCode', 'CapitalOutstanding', 'kilowatts', 'ClaimsPerPremium',
+                                           'Province_Gauteng', 'Province_Limpopo', 'Gender_Female', 'Gender_Male'])
+        self.assertEqual(X['kilowatts'].iloc[:3].tolist(), [0, 0, 0])
+        self.assertTrue((X[['Province_Gauteng', 'Province_Limpopo']].sum(axis=1) == 1).all())
+        self.assertEqual(X['PostalCode'].max(), self.data['PostalCode'].nunique() - 1)
+
+    def test_sparse_matches_dense_and_handles_unknown_categories(self):
+        dense = FeatureEncoder().fit(self.data)
+        sparse = FeatureEncoder(sparse=True).fit(self.data)
+        np.testing.assert_array_equal(sparse.transform(self.data).toarray(), dense.transform(self.data).to_numpy())
+        new = self.data.head(2).assign(Province='Free State', PostalCode=999)
+        encoded = dense.transform(new)
+        self.assertEqual(encoded[['Province_Gauteng', 'Province_Limpopo']].to_numpy().sum(), 0)
+        self.assertEqual(encoded['PostalCode'].tolist(), [-1, -1])
+
+    def test_partial_fit_matches_fit(self):
+        encoder = FeatureEncoder()
+        for start in range(0, 50, 7):
+            encoder.partial_fit(self.data.iloc[start:start + 7])
+        full = FeatureEncoder().fit(self.data)
+        self.assertEqual(encoder.feature_names_, full.feature_names_)
+        self.assertEqual(encoder.input_columns_, full.input_columns_)
+        pd.testing.assert_frame_equal(encoder.transform(self.data), full.transform(self.data))
+
+    def test_numeric_text_is_decided_once(self):
+        chunks = [self.data.iloc[:20].assign(CapitalOutstanding=None),
+                  self.data.iloc[20:35].assign(CapitalOutstanding='unknown'),
+                  self.data.iloc[35:]]
+        encoder = FeatureEncoder()
+        for chunk in chunks:
+            encoder.partial_fit(chunk)
+        # Decided on the first chunk with values, which holds no number
+        self.assertNotIn('CapitalOutstanding', encoder.feature_names_)
+        encoder = FeatureEncoder()
+        for chunk in [chunks[2], chunks[1]]:
+            encoder.partial_fit(chunk)
+        self.assertIn('CapitalOutstanding', encoder.feature_names_)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+import sys
+import os
+import json
+import subprocess
+import tempfile
+
+SCRIPT_DIR = os.path.abspath('../script')
+HEAVY_MODULES = ['xgboost', 'shap', 'matplotlib', 'sklearn', 'scipy.stats', 'numba']
+
+# Imports the script modules in a fresh interpreter, after pandas and numpy, which every
+# code path needs anyway, and reports the time taken and the heavy modules loaded
+PROBE = f"""
+import json, sys, time
+sys.path.append({SCRIPT_DIR!r})
+import numpy, pandas
+start = time.perf_counter()
+import data_preprocessing, AB_hypothesis_testing, statistical_modeling
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'loaded': [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+class TestImportTime(unittest.TestCase):
+    def test_import_budget(self):
+        output = subprocess.run([sys.executable, '-c', PROBE], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(SCRIPT_DIR))
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+        self.assertEqual(result['loaded'], [])
+        self.assertLess(result['seconds'], 1.0)
+
+    def test_logging_configured_on_use(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            log_path = os.path.join(tmp_dir, 'logs', 'preprocessing.log')
+            probe = f"import logging, sys; sys.path.append({SCRIPT_DIR!r}); import data_preprocessing; " \
+                    "print(len(logging.getLogger().handlers)); data_preprocessing.DataPreprocessor('x.txt'); " \
+                    "logging.info('configured')"
+            # Run from an unrelated directory: the log location must not depend on it
+            subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True, check=True, cwd=tmp_dir,
+                           env=dict(os.environ, DATA_PREPROCESSING_LOG=log_path))
+            with open(log_path) as f:
+                self.assertIn('configured', f.read())
+
+if __name__ == '__main__':
+    unittest.main()
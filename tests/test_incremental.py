@@ -0,0 +1,102 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.abspath('../script'))
+from incremental import IncrementalStore, aggregate_segments, combine_aggregates, moments_from_aggregates
+from synthetic import make_month
+
+class TestIncrementalStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.store = IncrementalStore(os.path.join(self.tmp_dir, 'store'), chunksize=150)
+        self.slices = {}
+        for i, month in enumerate(['2015-03', '2015-04']):
+            self.slices[month] = make_month(month, 400, seed=i)
+            self.slices[month].to_csv(os.path.join(self.tmp_dir, f"{month}.txt"), sep='|', index=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_append_months_matches_full_aggregates(self):
+        for month in self.slices:
+            self.assertEqual(self.store.append_month(os.path.join(self.tmp_dir, f"{month}.txt")), [month])
+        self.store.append_month(os.path.join(self.tmp_dir, '2015-04.txt'))
+        self.assertEqual(self.store.months(), ['2015-03', '2015-04'])
+        self.assertEqual(len(self.store.load()), 800)
+
+        full = pd.concat(self.slices.values(), ignore_index=True)
+        ratios = self.store.loss_ratios(by=('Province',))
+        expected = full.groupby('Province')[['TotalClaims', 'TotalPremium']].sum()
+        np.testing.assert_allclose(ratios['LossRatio'], expected['TotalClaims'] / expected['TotalPremium'],
+                                   rtol=1e-5)
+        self.assertEqual(self.store.aggregates()['count'].sum(), 800)
+
+    def test_hypothesis_results(self):
+        for month in self.slices:
+            self.store.append_month(os.path.join(self.tmp_dir, f"{month}.txt"))
+        results = self.store.hypothesis_results()
+        self.assertEqual((results['test'] == 'chi_squared').sum(), 3)
+        self.assertEqual((results['test'] == 't_test').sum(), 4)
+        self.assertTrue(results['p_value'].between(0, 1).all())
+
+    def test_aggregate_segments_are_mergeable(self):
+        data = self.slices['2015-03']
+        halves = pd.concat([aggregate_segments(data.iloc[:200], ['Gender'], ['TotalClaims']),
+                            aggregate_segments(data.iloc[200:], ['Gender'], ['TotalClaims'])])
+        combined = combine_aggregates(halves, ['Gender'], ['TotalClaims']).set_index('Gender')
+        whole = aggregate_segments(data, ['Gender'], ['TotalClaims']).set_index('Gender')
+        pd.testing.assert_frame_equal(combined, whole)
+
+    def test_moments_do_not_cancel(self):
+        # Amounts around 1e9 with a spread of 1: the sum of squares would keep no digit of the variance
+        data = pd.DataFrame({'Gender': np.tile(['Male', 'Female'], 500),
+                             'TotalPremium': 1e9 + np.random.default_rng(0).normal(0, 1, 1000)})
+        parts = pd.concat([aggregate_segments(data.iloc[i:i + 100], ['Gender'], ['TotalPremium'])
+                           for i in range(0, 1000, 100)])
+        for keys in (['Gender'], []):
+            combined = combine_aggregates(parts, keys, ['TotalPremium'])
+            _, mean, variance = moments_from_aggregates(combined, 'TotalPremium')
+            expected = data.groupby(keys)['TotalPremium'].var() if keys else pd.Series([data['TotalPremium'].var()])
+            np.testing.assert_allclose(variance, expected, rtol=1e-6)
+
+    def test_missing_metric_values_are_left_out(self):
+        data = self.slices['2015-03'].copy()
+        data.loc[::3, 'TotalClaims'] = np.nan
+        parts = pd.concat([aggregate_segments(data.iloc[:150], ['Gender'], ['TotalClaims']),
+                           aggregate_segments(data.iloc[150:], ['Gender'], ['TotalClaims'])])
+        combined = combine_aggregates(parts, ['Gender'], ['TotalClaims']).set_index('Gender').sort_index()
+        n, mean, variance = moments_from_aggregates(combined, 'TotalClaims')
+        grouped = data.groupby('Gender')['TotalClaims']
+        np.testing.assert_array_equal(n, grouped.count())
+        np.testing.assert_allclose(mean, grouped.mean())
+        np.testing.assert_allclose(variance, grouped.var())
+        self.assertEqual(combined['count'].sum(), len(data))
+
+    def test_missing_keys_stay_missing(self):
+        data = self.slices['2015-03'].copy()
+        data.loc[:49, 'Province'] = np.nan
+        path = os.path.join(self.tmp_dir, 'missing.txt')
+        data.to_csv(path, sep='|', index=False)
+        self.store.append_month(path)
+        aggregates = self.store.aggregates()
+        self.assertNotIn('nan', set(aggregates['Province'].dropna()))
+        self.assertEqual(aggregates.loc[aggregates['Province'].isna(), 'count'].sum(), 50)
+
+    def test_failed_append_keeps_stored_month(self):
+        path = os.path.join(self.tmp_dir, '2015-03.txt')
+        self.store.append_month(path)
+        stored = self.store.load(['2015-03'])
+        broken = os.path.join(self.tmp_dir, 'broken.txt')
+        with open(path) as source, open(broken, 'w') as f:
+            f.write(source.read() + 'not|enough|fields\n' + 'x|' * 40 + '\n')
+        with self.assertRaises(Exception):
+            self.store.append_month(broken)
+        pd.testing.assert_frame_equal(self.store.load(['2015-03']), stored)
+        self.assertEqual(self.store.loss_ratios()['count'].sum(), 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.abspath('../script'))
+import instrumentation
+from AB_hypothesis_testing import ABHypothesisTesting
+from data_preprocessing import DataPreprocessor
+from synthetic import make_month
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        instrumentation.RECORDER.records.clear()
+
+    def tearDown(self):
+        instrumentation.disable()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_disabled_by_default(self):
+        ABHypothesisTesting(pd.DataFrame({'g': ['a', 'b'] * 5, 'y': np.arange(10.0)})).t_test('a', 'b', 'y')
+        self.assertEqual(instrumentation.RECORDER.records, [])
+
+    def test_records_public_methods(self):
+        path = os.path.join(self.tmp_dir, 'raw.txt')
+        make_month('2015-03', 200, seed=0).to_csv(path, sep='|', index=False)
+        log_path = os.path.join(self.tmp_dir, 'instrumentation.jsonl')
+        instrumentation.enable(log_path, profile_dir=os.path.join(self.tmp_dir, 'profiles'), trace_memory=True)
+        preprocessor = DataPreprocessor(path)
+        preprocessor.load_data()
+        preprocessor.handle_missing_values()
+        instrumentation.disable()
+
+        with open(log_path) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([record['event'] for record in records],
+                         ['DataPreprocessor.load_data', 'DataPreprocessor.handle_missing_values'])
+        load, missing = records
+        self.assertEqual((load['rows_out'], missing['rows_in']), (200, 200))
+        self.assertEqual(missing['columns_in'] - missing['columns_out'], 0)
+        self.assertGreater(load['peak_traced_mb'], 0)
+        self.assertTrue(os.path.exists(load['profile']))
+        for key in ('wall_seconds', 'cpu_seconds', 'peak_rss_mb'):
+            self.assertGreaterEqual(load[key], 0)
+
+    def test_generators_and_nesting(self):
+        path = os.path.join(self.tmp_dir, 'raw.txt')
+        make_month('2015-03', 300, seed=0).to_csv(path, sep='|', index=False)
+        instrumentation.enable()
+        chunks = list(DataPreprocessor(path).iter_chunks(chunksize=100))
+        instrumentation.disable()
+        events = [(record['event'], record['depth']) for record in instrumentation.RECORDER.records]
+        self.assertEqual(len(chunks), 3)
+        # The per-chunk cleaning steps are nested under the streaming call
+        self.assertEqual(events.count(('DataPreprocessor.handle_missing_values', 1)), 3)
+        self.assertEqual(events[-1], ('DataPreprocessor.iter_chunks', 0))
+        self.assertEqual(instrumentation.RECORDER.records[-1]['rows_out'], 300)
+
+    def test_rss_growth_of_each_call(self):
+        @instrumentation.instrumented
+        class Allocating:
+            def allocate(self, size):
+                block = np.ones(size, dtype=np.uint8)
+                time.sleep(0.1)
+                del block
+
+        instrumentation.enable()
+        Allocating().allocate(128 * 2 ** 20)
+        Allocating().allocate(64 * 2 ** 20)
+        instrumentation.disable()
+        large, smaller = instrumentation.RECORDER.records
+        self.assertGreater(large['rss_growth_mb'], 100)
+        # The high-water mark is set by the earlier call, the growth of the smaller call is its own
+        self.assertGreaterEqual(smaller['peak_rss_mb'], large['rss_growth_mb'])
+        self.assertGreater(smaller['rss_growth_mb'], 50)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+import numpy as np
+sys.path.append(os.path.abspath('../script'))
+from model_artifacts import load_artifacts, save_artifacts
+from statistical_modeling import StatisticalModeling
+from synthetic import make_policies
+
+class TestModelArtifacts(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.model = StatisticalModeling(make_policies(600))
+        cls.model.prepare_data(target_features=False)
+        cls.model.build_models()
+        cls.model.evaluate_models()
+        cls.path = cls.model.save_artifacts(cls.tmp_dir, version='v1')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp_dir)
+
+    def test_manifest(self):
+        with open(os.path.join(self.path, 'manifest.json')) as f:
+            manifest = json.load(f)
+        self.assertEqual(manifest['version'], 'v1')
+        self.assertEqual(manifest['feature_names'], self.model.encoder.feature_names_)
+        self.assertEqual(manifest['models']['XGBoost']['format'], 'xgboost')
+        self.assertIn('R2', manifest['metrics']['Random Forest'])
+
+    def test_load_and_score_new_policies(self):
+        scorer = load_artifacts(self.tmp_dir, version='v1')
+        policies = make_policies(50, seed=1)
+        for name, model in self.model.models.items():
+            expected = model.predict(self.model.encoder.transform(policies))
+            np.testing.assert_allclose(scorer.predict(policies, model=name), expected, rtol=1e-5)
+        with self.assertRaises(ValueError):
+            scorer.predict(policies.drop(columns='kilowatts'))
+        with self.assertRaises(ValueError):
+            scorer.predict(policies.astype({'Province': 'category', 'Gender': 'category'}).assign(Gender=1))
+
+    def test_score_without_targets(self):
+        model = StatisticalModeling(make_policies(600).astype({'PostalCode': str}))
+        model.prepare_data(target_features=False)
+        model.build_models(n_jobs=1)
+        model.save_artifacts(self.tmp_dir, version='v2')
+        scorer = load_artifacts(self.tmp_dir, version='v2')
+        self.assertEqual(scorer.manifest['input_dtypes']['PostalCode'], 'text')
+        self.assertNotIn('TotalPremium', scorer.manifest['input_columns'])
+        self.assertNotIn('ClaimsPerPremium', model.encoder.feature_names_)
+        policies = make_policies(50, seed=1).drop(columns=['TotalPremium', 'TotalClaims'])
+        self.assertEqual(len(scorer.predict(policies.astype({'PostalCode': str}))), 50)
+        with self.assertRaises(ValueError):
+            scorer.predict(policies.astype({'PostalCode': 'category'}))
+
+    def test_refuse_target_features(self):
+        model = StatisticalModeling(make_policies(200))
+        model.prepare_data()
+        model.build_models(n_jobs=1)
+        with self.assertRaises(ValueError):
+            save_artifacts(model.encoder, model.models, self.tmp_dir, version='v3')
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir, 'v3')))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+sys.path.append(os.path.abspath('../script'))
+from model_selection import FoldCache, HyperparameterSearch, data_fingerprint, halving_fractions
+from statistical_modeling import StatisticalModeling
+from synthetic import make_policies
+
+class TestModelSelection(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.data = make_policies(1500)
+        self.folds = FoldCache(os.path.join(self.tmp_dir, 'folds'), n_splits=3).build(self.data)
+        self.grid = {'max_depth': [2, 4, 6], 'n_estimators': [10, 30]}
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_fold_cache_reused(self):
+        X_train, y_train, X_valid, y_valid = self.folds.load(0, fraction=0.5)
+        self.assertEqual(len(X_train), 500)
+        self.assertEqual(len(X_valid), 500)
+        modified = os.path.getmtime(self.folds._path(0, 'X_train'))
+        FoldCache(self.folds.directory, n_splits=3).build(self.data)
+        self.assertEqual(os.path.getmtime(self.folds._path(0, 'X_train')), modified)
+
+    def test_data_fingerprint_depends_on_row_order(self):
+        self.assertEqual(data_fingerprint(self.data), data_fingerprint(self.data.copy()))
+        self.assertNotEqual(data_fingerprint(self.data), data_fingerprint(self.data.iloc[::-1]))
+
+    def test_trials_of_rebuilt_folds_are_not_reused(self):
+        path = os.path.join(self.tmp_dir, 'trials.jsonl')
+        grid = {'max_depth': [2], 'n_estimators': [10]}
+        first = HyperparameterSearch(self.folds, 'XGBoost', grid, path, n_jobs=1).run()
+        FoldCache(self.folds.directory, n_splits=3).build(make_policies(1500, seed=1))
+        second = HyperparameterSearch(self.folds, 'XGBoost', grid, path, n_jobs=1).run()
+        with open(path) as f:
+            self.assertEqual(len(f.readlines()), 6)
+        self.assertNotEqual(first['RMSE'].iloc[0], second['RMSE'].iloc[0])
+
+    def test_successive_halving(self):
+        self.assertEqual(halving_fractions(0.1, 3), [1 / 9, 1 / 3, 1.0])
+        path = os.path.join(self.tmp_dir, 'trials.jsonl')
+        scores = HyperparameterSearch(self.folds, 'XGBoost', self.grid, path, factor=3, min_fraction=0.3,
+                                      n_jobs=1).run()
+        # 6 candidates on 3 folds at 1/3 of the rows, then the best 2 on full folds
+        self.assertEqual(list(scores.groupby('fraction').size()), [6, 2])
+        self.assertEqual(scores['fraction'].iloc[0], 1.0)
+        with open(path) as f:
+            self.assertEqual(len(f.readlines()), 24)
+
+    def test_resume(self):
+        path = os.path.join(self.tmp_dir, 'trials.jsonl')
+        first = HyperparameterSearch(self.folds, 'XGBoost', self.grid, path, n_jobs=1).run()
+        with open(path) as f:
+            lines = f.readlines()
+        with open(path, 'w') as f:
+            # An interrupted run leaves the trial being written cut short
+            f.writelines(lines[:10] + [lines[10][:25]])
+        resumed = HyperparameterSearch(self.folds, 'XGBoost', self.grid, path, n_jobs=2).run()
+        with open(path) as f:
+            self.assertEqual(len(f.readlines()), len(lines))
+        self.assertEqual(list(first['params']), list(resumed['params']))
+        self.assertAlmostEqual(first['RMSE'].iloc[0], resumed['RMSE'].iloc[0])
+
+    def test_tune_model(self):
+        modeling = StatisticalModeling(self.data)
+        best = modeling.tune_model('Random Forest', {'n_estimators': [5, 10]}, self.tmp_dir, n_splits=3, n_jobs=1)
+        self.assertIn(best['n_estimators'], [5, 10])
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_dir, 'random_forest_trials.jsonl')))
+
+if __name__ == '__main__':
+    unittest.main()
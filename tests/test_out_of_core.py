@@ -0,0 +1,63 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.abspath('../script'))
+from out_of_core import evaluate_holdout, file_chunks, split_chunk
+from statistical_modeling import StatisticalModeling
+from synthetic import make_policies
+
+class TestOutOfCore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'cleaned.csv')
+        policies = make_policies(5000)
+        policies['TotalPremium'] = policies['SumInsured'] / 1000 + policies['kilowatts']
+        policies.to_csv(self.path, index=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_holdout_split_is_stable(self):
+        chunks = list(file_chunks(self.path, chunksize=1000)())
+        self.assertEqual(len(chunks), 5)
+        train, holdout = split_chunk(chunks[1], 1)
+        again, _ = split_chunk(chunks[1], 1)
+        self.assertEqual(list(train.index), list(again.index))
+        self.assertEqual(len(train) + len(holdout), 1000)
+
+    def test_evaluate_holdout_of_large_target(self):
+        class Columns:
+            def transform(self, data):
+                return data
+
+        class Offset:
+            def predict(self, X):
+                return X['TotalPremium'].to_numpy() + 1
+
+        source = lambda: (chunk.assign(TotalPremium=chunk['TotalPremium'] + 1e9)
+                          for chunk in file_chunks(self.path, chunksize=1000)())
+        holdout = pd.concat(split_chunk(chunk, i)[1] for i, chunk in enumerate(source()))
+        y = holdout['TotalPremium'].to_numpy()
+        metrics = evaluate_holdout({'Offset': Offset()}, source, Columns())['Offset']
+        self.assertAlmostEqual(metrics['MSE'], 1)
+        self.assertAlmostEqual(metrics['R2'], 1 - len(y) / ((y - y.mean()) ** 2).sum(), places=9)
+        with self.assertRaises(ValueError):
+            evaluate_holdout({'Offset': Offset()}, source, Columns(), holdout_fraction=0)
+
+    def test_train_out_of_core(self):
+        modeling = StatisticalModeling.train_out_of_core(self.path, os.path.join(self.tmp_dir, 'cache'),
+                                                         chunksize=1000, num_boost_round=20, sgd_epochs=2)
+        self.assertEqual(set(modeling.models), {'SGD Linear Regression', 'XGBoost'})
+        self.assertIn('kilowatts', modeling.encoder.feature_names_)
+        self.assertGreater(modeling.results['XGBoost']['R2'], 0.9)
+        self.assertGreater(modeling.results['SGD Linear Regression']['R2'], 0.9)
+        self.assertIn('fit_rss_mb', modeling.training_report['XGBoost'])
+        predictions = modeling.models['XGBoost'].predict(modeling.encoder.transform(make_policies(10, seed=1)))
+        self.assertEqual(len(predictions), 10)
+
+if __name__ == '__main__':
+    unittest.main()
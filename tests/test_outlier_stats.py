@@ -0,0 +1,61 @@
+import unittest
+import sys
+import os
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.abspath('../script'))
+from outlier_stats import OutlierStatsAccumulator, QuantileSketch, outlier_statistics
+
+class TestOutlierStatistics(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(0)
+        claims = rng.lognormal(3, 2, 50_000)
+        claims[rng.random(50_000) < 0.7] = 0
+        cls.data = pd.DataFrame({'TotalPremium': rng.gamma(2.0, 50.0, 50_000), 'TotalClaims': claims})
+
+    def test_exact_statistics_match_pandas(self):
+        stats = outlier_statistics(self.data, ['TotalPremium', 'TotalClaims'])
+        summary = stats['columns']
+        for column in ['TotalPremium', 'TotalClaims']:
+            series = self.data[column]
+            q1, q3 = series.quantile(0.25), series.quantile(0.75)
+            iqr = q3 - q1
+            outliers = ((series < q1 - 1.5 * iqr) | (series > q3 + 1.5 * iqr)).sum()
+            self.assertAlmostEqual(summary.loc[column, 'q0.9972'], series.quantile(0.9972))
+            self.assertEqual(summary.loc[column, 'n_iqr_outliers'], outliers)
+            self.assertEqual(summary.loc[column, 'n_positive'], (series > 0).sum())
+        lower, upper = self.data.quantile(0.01), self.data.quantile(0.99)
+        outside = ((self.data < lower) | (self.data > upper)).any(axis=1).sum()
+        self.assertEqual(stats['rows_outside_range'], outside)
+
+    def test_approximate_statistics_are_close(self):
+        exact = outlier_statistics(self.data, ['TotalClaims'])['columns']
+        approximate = outlier_statistics(self.data, ['TotalClaims'], approximate=True)['columns']
+        for q in ['q0.5', 'q0.95', 'q0.99']:
+            self.assertAlmostEqual(approximate.loc['TotalClaims', q], exact.loc['TotalClaims', q],
+                                   delta=0.01 * exact.loc['TotalClaims', 'q0.99'])
+        self.assertAlmostEqual(approximate.loc['TotalClaims', 'mean'], exact.loc['TotalClaims', 'mean'])
+        self.assertIsNone(outlier_statistics(self.data, ['TotalClaims'], approximate=True)['rows_outside_range'])
+
+    def test_chunked_accumulation_matches_single_pass(self):
+        accumulator = OutlierStatsAccumulator(['TotalPremium'])
+        for start in range(0, len(self.data), 10_000):
+            accumulator.update(self.data.iloc[start:start + 10_000])
+        chunked = accumulator.result()['columns']
+        single = outlier_statistics(self.data, ['TotalPremium'], approximate=True)['columns']
+        self.assertEqual(chunked.loc['TotalPremium', 'count'], len(self.data))
+        self.assertAlmostEqual(chunked.loc['TotalPremium', 'std'], single.loc['TotalPremium', 'std'])
+        self.assertAlmostEqual(chunked.loc['TotalPremium', 'q0.99'], single.loc['TotalPremium', 'q0.99'],
+                               delta=0.01 * single.loc['TotalPremium', 'q0.99'])
+
+    def test_sketch_merge_and_point_masses(self):
+        left = QuantileSketch(max_centroids=50).update(np.zeros(1000))
+        right = QuantileSketch(max_centroids=50).update(np.arange(1, 101))
+        merged = left.merge(right)
+        self.assertEqual(merged.count, 1100)
+        self.assertEqual(merged.quantile(0.5)[0], 0)
+        self.assertEqual(merged.count_above(0), 100)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+import sys
+import os
+import shutil
+import importlib
+import tempfile
+import threading
+import time
+import pandas as pd
+sys.path.append(os.path.abspath('../script'))
+from pipeline import Pipeline, analysis_pipeline
+from synthetic import make_month
+
+CALLS = []
+
+def load(file_path):
+    CALLS.append('load')
+    return pd.read_csv(file_path)
+
+def total(data, column):
+    CALLS.append(f'total_{column}')
+    return data[column].sum()
+
+def slow_thread(data):
+    start = time.perf_counter()
+    time.sleep(0.2)
+    return threading.get_ident(), start, time.perf_counter()
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'data.csv')
+        pd.DataFrame({'a': [1, 2, 3], 'b': [4, 5, 6]}).to_csv(self.path, index=False)
+        CALLS.clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def build(self, column='a'):
+        return (Pipeline(os.path.join(self.tmp_dir, 'cache'))
+                .add('load', load, files=[self.path], config={'file_path': self.path})
+                .add('total', total, inputs=['load'], config={'column': column}))
+
+    def test_cached_steps_are_reused(self):
+        self.assertEqual(self.build().run()['total'], 6)
+        self.assertEqual(CALLS, ['load', 'total_a'])
+        pipeline = self.build()
+        self.assertEqual(pipeline.run(['total'])['total'], 6)
+        self.assertEqual(CALLS, ['load', 'total_a'])
+        self.assertEqual(pipeline.report['total']['status'], 'cached')
+        self.assertNotIn('load', pipeline.report)
+
+        # A config change reruns only the step it belongs to
+        self.assertEqual(self.build('b').run()['total'], 15)
+        self.assertEqual(CALLS, ['load', 'total_a', 'total_b'])
+
+        # An input file change reruns everything downstream of it
+        pd.DataFrame({'a': [10], 'b': [0]}).to_csv(self.path, index=False)
+        self.assertEqual(self.build().run()['total'], 10)
+        self.assertEqual(CALLS[-2:], ['load', 'total_a'])
+
+    def test_independent_branches_run_concurrently(self):
+        pipeline = (Pipeline(os.path.join(self.tmp_dir, 'cache'), max_workers=2)
+                    .add('load', load, files=[self.path], config={'file_path': self.path})
+                    .add('left', slow_thread, inputs=['load'])
+                    .add('right', slow_thread, inputs=['load'], version=2))
+        outputs = pipeline.run()
+        (left_thread, left_start, left_end), (right_thread, right_start, right_end) = outputs['left'], outputs['right']
+        self.assertNotEqual(left_thread, right_thread)
+        # The two branches were running at the same time
+        self.assertLess(left_start, right_end)
+        self.assertLess(right_start, left_end)
+
+    def test_dependency_changes_invalidate_steps(self):
+        module_dir = os.path.join(self.tmp_dir, 'modules')
+        os.makedirs(module_dir)
+        with open(os.path.join(module_dir, 'pipeline_dep.py'), 'w') as f:
+            f.write("def scale(value):\n    return value * 2\n")
+        with open(os.path.join(module_dir, 'pipeline_helper.py'), 'w') as f:
+            f.write("from pipeline_dep import scale\n\nclass Scaler:\n    factor = 2\n")
+        with open(os.path.join(module_dir, 'pipeline_steps.py'), 'w') as f:
+            f.write("from pipeline_helper import Scaler\n\ndef step():\n    return Scaler.factor\n")
+        sys.path.insert(0, module_dir)
+        try:
+            steps = importlib.import_module('pipeline_steps')
+            fingerprint = Pipeline(self.tmp_dir).add('step', steps.step).fingerprints()['step']
+            self.assertEqual(fingerprint, Pipeline(self.tmp_dir).add('step', steps.step).fingerprints()['step'])
+            with open(os.path.join(module_dir, 'pipeline_dep.py'), 'a') as f:
+                f.write("\n\ndef offset(value):\n    return value + 1\n")
+            self.assertNotEqual(fingerprint, Pipeline(self.tmp_dir).add('step', steps.step).fingerprints()['step'])
+        finally:
+            sys.path.remove(module_dir)
+            for name in ['pipeline_steps', 'pipeline_helper', 'pipeline_dep']:
+                sys.modules.pop(name, None)
+
+    def test_unknown_input(self):
+        with self.assertRaises(ValueError):
+            Pipeline(self.tmp_dir).add('total', total, inputs=['load'])
+
+    def test_analysis_pipeline(self):
+        make_month('2015-03', 600, seed=0).to_csv(self.path, sep='|', index=False)
+        pipeline = analysis_pipeline(self.path, os.path.join(self.tmp_dir, 'cache'),
+                                     chi_squared_specs=[('Province', 'Gender')],
+                                     t_test_specs=[('Gender', None, 'TotalClaims')],
+                                     build_params={'n_jobs': 1})
+        outputs = pipeline.run()
+        self.assertEqual(len(outputs['hypothesis_tests']), 2)
+        self.assertEqual(set(outputs['models']['models']), {'Linear Regression', 'Random Forest', 'XGBoost'})
+        pipeline.run()
+        self.assertEqual({step['status'] for step in pipeline.report.values()}, {'cached'})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import sys
+import os
+import time
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.abspath('../script'))
+from AB_hypothesis_testing import ABHypothesisTesting
+from resampling import bootstrap_segments, permutation_pvalue, permutation_segments
+
+def make_claims(rows, seed):
+    """Policies with mostly-zero, heavy-tailed claims and a riskier province."""
+    rng = np.random.default_rng(seed)
+    province = rng.choice(['Gauteng', 'Western Cape', 'Limpopo'], rows)
+    claim_rate = np.where(province == 'Gauteng', 0.2, 0.1)
+    return pd.DataFrame({
+        'Province': province,
+        'Gender': rng.choice(['Male', 'Female'], rows),
+        'TotalPremium': rng.gamma(2.0, 50.0, rows),
+        'TotalClaims': np.where(rng.random(rows) < claim_rate, rng.pareto(2.5, rows) * 300 + 100, 0.0),
+    })
+
+class TestResampling(unittest.TestCase):
+    def setUp(self):
+        self.data = make_claims(3000, seed=0)
+
+    def test_bootstrap_intervals(self):
+        intervals = bootstrap_segments(self.data, 'Province', n_resamples=400, seed=1)
+        grouped = self.data.groupby('Province')
+        expected = grouped['TotalClaims'].sum() / grouped['TotalPremium'].sum()
+        np.testing.assert_allclose(intervals['estimate'], expected)
+        self.assertTrue(((intervals['ci_lower'] < intervals['estimate'])
+                         & (intervals['estimate'] < intervals['ci_upper'])).all())
+        self.assertEqual(intervals['n'].sum(), len(self.data))
+
+    def test_bootstrap_is_seeded_and_batch_independent(self):
+        first = bootstrap_segments(self.data, ['Province', 'Gender'], 'severity', n_resamples=200, seed=3,
+                                   block_rows=500)
+        batched = bootstrap_segments(self.data, ['Province', 'Gender'], 'severity', n_resamples=200, seed=3,
+                                     block_rows=500, max_cells=7000)
+        pd.testing.assert_frame_equal(first, batched)
+        self.assertEqual(len(first), 6)
+
+    def test_permutation_pvalue(self):
+        rng = np.random.default_rng(0)
+        same = permutation_pvalue(rng.normal(size=200), np.ones(200), rng.normal(size=300), np.ones(300), 2000,
+                                  np.random.default_rng(1), max_cells=50_000)[1]
+        shifted = permutation_pvalue(rng.normal(1, size=200), np.ones(200), rng.normal(size=300), np.ones(300), 2000,
+                                     np.random.default_rng(1))[1]
+        self.assertGreater(same, 0.01)
+        self.assertLess(shifted, 0.001)
+
+    def test_permutation_cost_follows_the_smaller_group(self):
+        rng = np.random.default_rng(0)
+
+        def seconds(rows):
+            start = time.perf_counter()
+            permutation_pvalue(rng.normal(size=50), np.ones(50), rng.normal(size=rows), np.ones(rows), 500,
+                               np.random.default_rng(1))
+            return time.perf_counter() - start
+
+        seconds(1000)
+        # Permuting every row would make the 1000x larger population about 1000x slower
+        self.assertLess(seconds(1_000_000), 50 * max(seconds(1000), 0.001))
+
+    def test_permutation_segments(self):
+        results = ABHypothesisTesting(self.data).permutation_tests('Province', 'frequency', n_permutations=999)
+        self.assertEqual(set(results['group_b']), {'rest'})
+        self.assertTrue(results.set_index('group_a').loc['Gauteng', 'reject'])
+        pairs = permutation_segments(self.data, 'Province', 'severity', group_pairs=[('Gauteng', 'Limpopo')],
+                                     n_permutations=199, seed=5)
+        self.assertEqual(pairs['p_value'].iloc[0], permutation_segments(
+            self.data, 'Province', 'severity', group_pairs=[('Gauteng', 'Limpopo')], n_permutations=199,
+            seed=5)['p_value'].iloc[0])
+
+if __name__ == '__main__':
+    unittest.main()
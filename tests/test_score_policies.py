@@ -0,0 +1,74 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.abspath('../script'))
+from model_artifacts import load_artifacts
+from score_policies import score_file
+from statistical_modeling import StatisticalModeling
+from synthetic import make_policies
+
+class TestScorePolicies(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.mkdtemp()
+        model = StatisticalModeling(make_policies(600))
+        model.prepare_data(target_features=False)
+        model.build_models()
+        model.save_artifacts(os.path.join(cls.tmp_dir, 'models'))
+        cls.scorer = load_artifacts(os.path.join(cls.tmp_dir, 'models'))
+        cls.policies = make_policies(1000, seed=2).assign(PolicyID=np.arange(1000), make='TOYOTA')
+        cls.expected = cls.scorer.predict(cls.policies, model='XGBoost')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp_dir)
+
+    def test_score_text_file_to_csv(self):
+        input_path = os.path.join(self.tmp_dir, 'policies.txt')
+        output_path = os.path.join(self.tmp_dir, 'predictions.csv')
+        self.policies.to_csv(input_path, sep='|', index=False)
+        summary = score_file(self.scorer, input_path, output_path, model='XGBoost', chunksize=300,
+                             id_columns=['PolicyID'], n_threads=2)
+        predictions = pd.read_csv(output_path)
+        self.assertEqual(summary['rows'], 1000)
+        self.assertGreater(summary['rows_per_second'], 0)
+        self.assertEqual(predictions['PolicyID'].tolist(), list(range(1000)))
+        np.testing.assert_allclose(predictions['PredictedPremium'], self.expected, rtol=1e-4)
+
+    def test_score_parquet_file_to_parquet(self):
+        input_path = os.path.join(self.tmp_dir, 'policies.parquet')
+        output_path = os.path.join(self.tmp_dir, 'predictions.parquet')
+        self.policies.to_parquet(input_path, index=False)
+        score_file(self.scorer, input_path, output_path, model='XGBoost', chunksize=256)
+        predictions = pd.read_parquet(output_path)
+        self.assertEqual(list(predictions.columns), ['PredictedPremium'])
+        np.testing.assert_allclose(predictions['PredictedPremium'], self.expected, rtol=1e-4)
+
+    def test_score_chunk_without_categorical_values(self):
+        input_path = os.path.join(self.tmp_dir, 'missing_gender.txt')
+        output_path = os.path.join(self.tmp_dir, 'missing_gender.csv')
+        policies = self.policies.copy()
+        policies.loc[:299, 'Gender'] = np.nan
+        policies.to_csv(input_path, sep='|', index=False)
+        summary = score_file(self.scorer, input_path, output_path, model='XGBoost', chunksize=300)
+        self.assertEqual(summary['rows'], 1000)
+        np.testing.assert_allclose(pd.read_csv(output_path)['PredictedPremium'],
+                                   self.scorer.predict(policies, model='XGBoost'), rtol=1e-4)
+
+    def test_score_empty_file_keeps_model_threads(self):
+        input_path = os.path.join(self.tmp_dir, 'empty.txt')
+        output_path = os.path.join(self.tmp_dir, 'empty.csv')
+        self.policies.head(0).to_csv(input_path, sep='|', index=False)
+        n_jobs = self.scorer.models['XGBoost'].get_params()['n_jobs']
+        summary = score_file(self.scorer, input_path, output_path, model='XGBoost', id_columns=['PolicyID'],
+                             n_threads=3)
+        self.assertEqual(summary['rows'], 0)
+        self.assertEqual(list(pd.read_csv(output_path).columns), ['PolicyID', 'PredictedPremium'])
+        self.assertEqual(self.scorer.models['XGBoost'].get_params()['n_jobs'], n_jobs)
+
+if __name__ == '__main__':
+    unittest.main()
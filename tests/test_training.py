@@ -0,0 +1,64 @@
+import unittest
+import sys
+import os
+import time
+import numpy as np
+sys.path.append(os.path.abspath('../script'))
+from statistical_modeling import StatisticalModeling
+from training import candidate_models, fit_and_measure, train_models
+from synthetic import make_policies
+
+class TestTraining(unittest.TestCase):
+    def setUp(self):
+        self.modeling = StatisticalModeling(make_policies(2000))
+        self.modeling.prepare_data()
+
+    def test_parallel_matches_serial(self):
+        serial, _ = train_models(candidate_models(n_jobs=1), self.modeling.X_train, self.modeling.y_train)
+        parallel, report = train_models(candidate_models(n_jobs=1), self.modeling.X_train, self.modeling.y_train,
+                                        parallel=True)
+        self.assertEqual(list(parallel), ['Linear Regression', 'Random Forest', 'XGBoost'])
+        for name in serial:
+            np.testing.assert_allclose(serial[name].predict(self.modeling.X_test),
+                                       parallel[name].predict(self.modeling.X_test), rtol=1e-5)
+            self.assertGreater(report[name]['peak_rss_mb'], 0)
+            self.assertGreaterEqual(report[name]['fit_rss_mb'], 0)
+            self.assertGreaterEqual(report[name]['wall_seconds'], 0)
+
+    def test_build_models_early_stopping(self):
+        self.modeling.build_models(early_stopping_rounds=5, n_estimators=500, n_jobs=1)
+        report = self.modeling.training_report
+        self.assertEqual(set(self.modeling.models), {'Linear Regression', 'Random Forest', 'XGBoost'})
+        self.assertIn('best_iteration', report['XGBoost'])
+        self.assertLess(report['XGBoost']['best_iteration'], 500)
+        self.assertEqual(report['XGBoost']['rows'], round(len(self.modeling.X_train) * 0.9))
+        self.assertEqual(report['Random Forest']['rows'], len(self.modeling.X_train))
+
+    def test_early_stopping_needs_validation_rows(self):
+        with self.assertRaises(ValueError):
+            self.modeling.build_models(early_stopping_rounds=5, validation_fraction=0)
+        with self.assertRaises(ValueError):
+            train_models(candidate_models(n_jobs=1, early_stopping_rounds=5), self.modeling.X_train,
+                         self.modeling.y_train, validation_fraction=0)
+        self.assertEqual(self.modeling.models, {})
+
+    def test_fit_memory_is_measured_per_model(self):
+        class Allocating:
+            def __init__(self, size):
+                self.size = size
+
+            def fit(self, X, y):
+                block = np.ones(self.size, dtype=np.uint8)
+                time.sleep(0.1)
+                del block
+                return self
+
+        _, _, large = fit_and_measure('large', Allocating(128 * 2 ** 20), self.modeling.X_train, self.modeling.y_train)
+        _, _, small = fit_and_measure('small', Allocating(1), self.modeling.X_train, self.modeling.y_train)
+        self.assertGreater(large['fit_rss_mb'], 100)
+        # The process high-water mark still includes the earlier fit, the fit's own growth does not
+        self.assertGreaterEqual(small['peak_rss_mb'], large['fit_rss_mb'])
+        self.assertLess(small['fit_rss_mb'], 50)
+
+if __name__ == '__main__':
+    unittest.main()